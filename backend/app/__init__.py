@@ -13,10 +13,12 @@ db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
 
-def create_app(config_name='default'):
-    """创建Flask应用实例"""
+def create_app(config_name='default', overrides=None):
+    """创建Flask应用实例，overrides 中的配置项覆盖配置类中的值（如压测使用临时数据库）"""
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    if overrides:
+        app.config.update(overrides)
     config[config_name].init_app(app)
 
     # 创建上传目录
@@ -24,21 +26,41 @@ def create_app(config_name='default'):
     os.makedirs(upload_dir, exist_ok=True)
 
     # 初始化扩展
+    from app.services.database_service import DatabaseService
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = DatabaseService.engine_options(app.config)
     db.init_app(app)
+    with app.app_context():
+        DatabaseService.init_engine(db.engine, app.config)
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app)
     
     # 注册蓝图 - 基础版本
-    from app.routes import auth_bp, notes_bp
+    from app.routes import auth_bp, notes_bp, export_bp
 
     # 核心功能
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(notes_bp, url_prefix='/api/notes')
+    app.register_blueprint(export_bp, url_prefix='/api/export')
 
     # 添加健康检查路由
     @app.route('/api/health')
     def health_check():
-        return {'status': 'ok', 'message': 'Backend service is running'}, 200
+        from app.services.auth_service import AuthService
+        from app.services.event_stream import EventStream
+        from app.services.response_cache import ResponseCache
+        from app.services.taxonomy_service import TaxonomyService
+        return {
+            'status': 'ok',
+            'message': 'Backend service is running',
+            'cache': {
+                'responses': ResponseCache.stats(),
+                'taxonomy': TaxonomyService.cache_stats(),
+                'users': AuthService.cache_stats()
+            },
+            'events': EventStream.stats(),
+            'database': DatabaseService.stats(db.engine)
+        }, 200
 
     return app
\ No newline at end of file
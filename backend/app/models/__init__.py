@@ -1,2 +1,7 @@
 from app.models.user import User
-from app.models.note import Note, Tag, Category, NoteVersion
\ No newline at end of file
+from app.models.note import Note, Tag, Category, NoteVersion
+from app.models.stats import UserNoteStats, UserDailyNoteStats, UserTagStats, UserCategoryStats
+from app.models.file import FileBlob, UserFile, UploadSession
+from app.models.sync import NoteChange
+from app.models.reminder import ReminderDelivery
+from app.models.calendar import CalendarEvent
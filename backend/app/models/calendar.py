@@ -0,0 +1,67 @@
+from app import db
+from sqlalchemy import event
+from datetime import datetime, timedelta
+
+class CalendarEvent(db.Model):
+    """日历事件模型"""
+    __tablename__ = 'calendar_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text)
+    start_datetime = db.Column(db.DateTime, nullable=False)
+    end_datetime = db.Column(db.DateTime, nullable=False)
+    is_all_day = db.Column(db.Boolean, default=False, nullable=False)
+    location = db.Column(db.String(255))
+    category = db.Column(db.String(50))
+    priority = db.Column(db.String(20), default='medium')
+    color = db.Column(db.String(20))
+    is_recurring = db.Column(db.Boolean, default=False, nullable=False)
+    recurrence_rule = db.Column(db.String(255))
+
+    # 提醒设置；remind_at 为开始时间减去提前分钟数（未启用提醒或已删除时为空），保存时自动计算
+    reminder_enabled = db.Column(db.Boolean, default=False, nullable=False)
+    reminder_minutes = db.Column(db.Integer, default=15)
+    remind_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    is_deleted = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def compute_remind_at(self):
+        """计算提醒时间，未启用提醒或已删除时返回 None"""
+        if not self.reminder_enabled or self.is_deleted or self.start_datetime is None:
+            return None
+        return self.start_datetime - timedelta(minutes=self.reminder_minutes or 0)
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'start_datetime': self.start_datetime.isoformat(),
+            'end_datetime': self.end_datetime.isoformat(),
+            'is_all_day': self.is_all_day,
+            'location': self.location,
+            'category': self.category,
+            'priority': self.priority,
+            'color': self.color,
+            'is_recurring': self.is_recurring,
+            'recurrence_rule': self.recurrence_rule,
+            'reminder_enabled': self.reminder_enabled,
+            'reminder_minutes': self.reminder_minutes,
+            'remind_at': self.remind_at.isoformat() if self.remind_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<CalendarEvent {self.title}>'
+
+# 任何写入路径保存事件时都重新计算提醒时间，使 remind_at 与开始时间和提醒设置保持一致
+@event.listens_for(CalendarEvent, 'before_insert')
+@event.listens_for(CalendarEvent, 'before_update')
+def _update_remind_at(mapper, connection, target):
+    target.remind_at = target.compute_remind_at()
@@ -0,0 +1,80 @@
+from app import db
+from datetime import datetime
+
+class FileBlob(db.Model):
+    """按内容 SHA-256 存储的文件数据块（相同内容只保存一份）"""
+    __tablename__ = 'file_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, default=0, nullable=False)  # 引用该数据块的用户文件数
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FileBlob {self.sha256}>'
+
+class UserFile(db.Model):
+    """用户上传的文件，对外文件名映射到内容数据块"""
+    __tablename__ = 'user_files'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    filename = db.Column(db.String(64), nullable=False)  # URL 中使用的文件名
+    original_name = db.Column(db.String(255))
+    file_type = db.Column(db.String(20))
+    size = db.Column(db.BigInteger, nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('file_blobs.sha256'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    blob = db.relationship('FileBlob')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'filename', name='uq_user_files_user_filename'),
+        db.Index('ix_user_files_blob_sha256', 'blob_sha256'),
+    )
+
+    def to_dict(self):
+        """转换为字典（与上传接口返回格式一致）"""
+        return {
+            'id': self.id,
+            'original_name': self.original_name,
+            'filename': self.filename,
+            'file_type': self.file_type,
+            'file_size': self.size,
+            'upload_time': self.created_at.isoformat() if self.created_at else None,
+            'url': f'/api/notes/files/{self.user_id}/{self.filename}'
+        }
+
+    def __repr__(self):
+        return f'<UserFile {self.user_id}/{self.filename}>'
+
+class UploadSession(db.Model):
+    """分片上传会话，已接收的数据保存在临时文件中，可断点续传"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    original_name = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_upload_sessions_user_id', 'user_id'),
+        db.Index('ix_upload_sessions_updated_at', 'updated_at'),
+    )
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'upload_id': self.id,
+            'original_name': self.original_name,
+            'total_size': self.total_size,
+            'received_size': self.received_size,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<UploadSession {self.id}>'
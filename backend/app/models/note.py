@@ -1,18 +1,27 @@
 from app import db
-from datetime import datetime
+from app.services.version_storage import (
+    DEFAULT_KEYFRAME_INTERVAL, FORMAT_DELTA, FORMAT_FULL,
+    apply_delta, decompress_full, encode_content
+)
+from flask import current_app
+from sqlalchemy import case, event, func
+from datetime import datetime, timedelta
 import json
 import json
 
 # 笔记-标签关联表
 note_tags = db.Table('note_tags',
     db.Column('note_id', db.Integer, db.ForeignKey('notes.id'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True),
+    # 主键以 note_id 开头，按标签反查笔记需要单独索引
+    db.Index('ix_note_tags_tag_id', 'tag_id', 'note_id')
 )
 
 # 笔记-分类关联表
 note_categories = db.Table('note_categories',
     db.Column('note_id', db.Integer, db.ForeignKey('notes.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True),
+    db.Index('ix_note_categories_category_id', 'category_id', 'note_id')
 )
 
 class Note(db.Model):
@@ -26,6 +35,9 @@ class Note(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
 
+    # 字数（内容变更时自动更新，用于增量统计）
+    word_count = db.Column(db.Integer, default=0)
+
     # 软删除字段
     is_deleted = db.Column(db.Boolean, default=False, nullable=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
@@ -35,13 +47,38 @@ class Note(db.Model):
                           backref=db.backref('notes', lazy='dynamic'))
     categories = db.relationship('Category', secondary=note_categories, lazy='dynamic',
                                 backref=db.backref('notes', lazy='dynamic'))
+
+    # 与列表、回收站、统计查询的过滤和排序方式一致的复合索引
+    __table_args__ = (
+        db.Index('ix_notes_user_deleted_updated', 'user_id', 'is_deleted', 'updated_at'),
+        db.Index('ix_notes_user_deleted_deleted_at', 'user_id', 'is_deleted', 'deleted_at'),
+        db.Index('ix_notes_user_deleted_created', 'user_id', 'is_deleted', 'created_at'),
+    )
     
-    def create_version(self, change_summary=None):
-        """创建当前笔记的版本快照"""
+    def create_version(self, change_summary=None, pinned=True):
+        """创建当前笔记的版本快照（默认固定保留，不参与合并和清理）"""
         version = NoteVersion.create_from_note(self, change_summary)
+        version.is_pinned = pinned
         db.session.add(version)
         return version
 
+    def create_edit_version(self, change_summary=None, edit_session=None):
+        """编辑前创建版本快照，同一编辑会话在合并窗口内的连续保存只保留第一次快照
+
+        返回新建的版本；被合并时返回 None
+        """
+        window = current_app.config.get('VERSION_COALESCE_MINUTES', 0)
+        if window > 0:
+            latest = self.get_latest_version()
+            if (latest is not None and not latest.is_pinned
+                    and latest.edit_session == edit_session
+                    and latest.created_at >= datetime.utcnow() - timedelta(minutes=window)):
+                return None
+
+        version = self.create_version(change_summary, pinned=False)
+        version.edit_session = edit_session
+        return version
+
     def get_latest_version(self):
         """获取最新版本"""
         return self.versions.first()
@@ -61,28 +98,53 @@ class Note(db.Model):
 
         # 恢复内容
         self.title = version.title
-        self.content = version.content
-
-        # 恢复标签
-        self.tags = []
-        if version.tags_snapshot:
-            tag_names = json.loads(version.tags_snapshot)
-            for tag_name in tag_names:
-                tag = Tag.query.filter_by(name=tag_name).first()
-                if tag:
-                    self.tags.append(tag)
-
-        # 恢复分类
-        self.categories = []
-        if version.categories_snapshot:
-            category_names = json.loads(version.categories_snapshot)
-            for category_name in category_names:
-                category = Category.query.filter_by(name=category_name, user_id=self.user_id).first()
-                if category:
-                    self.categories.append(category)
+        self.content = version.get_content()
+
+        # 恢复标签和分类（只关联仍然存在的标签和分类）
+        from app.services.taxonomy_service import TaxonomyService
+        tag_names = json.loads(version.tags_snapshot) if version.tags_snapshot else []
+        self.set_tag_ids(TaxonomyService.resolve_tag_ids(tag_names, create=False))
+
+        category_names = json.loads(version.categories_snapshot) if version.categories_snapshot else []
+        self.set_category_ids(
+            TaxonomyService.resolve_category_ids(self.user_id, category_names, create=False)
+        )
 
         return True
 
+    def set_tag_ids(self, tag_ids, current_ids=None):
+        """将笔记的标签设置为指定ID集合，只删除和插入有差异的关联，返回是否有变化"""
+        return self._sync_association(note_tags, 'tag_id', tag_ids, current_ids)
+
+    def set_category_ids(self, category_ids, current_ids=None):
+        """将笔记的分类设置为指定ID集合，只删除和插入有差异的关联，返回是否有变化"""
+        return self._sync_association(note_categories, 'category_id', category_ids, current_ids)
+
+    def _sync_association(self, table, column_name, target_ids, current_ids=None):
+        """按集合差异更新关联表，current_ids 为空时从数据库读取当前关联"""
+        db.session.flush()
+        column = table.c[column_name]
+        if current_ids is None:
+            current_ids = db.session.scalars(db.select(column).where(table.c.note_id == self.id))
+        current_ids = set(current_ids)
+        target_ids = set(target_ids)
+
+        removed = current_ids - target_ids
+        added = target_ids - current_ids
+        if removed:
+            db.session.execute(db.delete(table).where(table.c.note_id == self.id, column.in_(removed)))
+        if added:
+            db.session.execute(db.insert(table), [
+                {'note_id': self.id, column_name: target_id} for target_id in added
+            ])
+
+        if removed or added:
+            from app.services.sync_service import SyncService, ENTITY_CATEGORY, ENTITY_NOTE, ENTITY_TAG
+            SyncService.record(self.user_id, ENTITY_NOTE, [self.id])
+            SyncService.record(self.user_id, ENTITY_TAG if table is note_tags else ENTITY_CATEGORY,
+                               removed | added)
+        return bool(removed or added)
+
     def get_version_count(self):
         """获取版本总数"""
         return self.versions.count()
@@ -113,6 +175,43 @@ class Note(db.Model):
         """获取用户的已删除笔记（回收站）"""
         return cls.query.filter_by(user_id=user_id, is_deleted=True)
 
+    @staticmethod
+    def load_tag_and_category_names(note_ids, chunk_size=500):
+        """批量获取多篇笔记的标签和分类名称
+
+        每批笔记只执行一条 UNION ALL 查询，避免逐篇访问 lazy='dynamic' 关系产生的 N+1 查询。
+        返回 ({note_id: [标签名]}, {note_id: [分类名]})
+        """
+        tag_names = {note_id: [] for note_id in note_ids}
+        category_names = {note_id: [] for note_id in note_ids}
+        note_ids = list(tag_names)
+
+        # 分批查询，避免超出 SQLite 参数数量限制
+        for start in range(0, len(note_ids), chunk_size):
+            chunk = note_ids[start:start + chunk_size]
+
+            tags_query = db.select(
+                note_tags.c.note_id, db.literal('tag').label('kind'), Tag.id, Tag.name
+            ).join(Tag, Tag.id == note_tags.c.tag_id).where(note_tags.c.note_id.in_(chunk))
+
+            categories_query = db.select(
+                note_categories.c.note_id, db.literal('category').label('kind'), Category.id, Category.name
+            ).join(Category, Category.id == note_categories.c.category_id).where(
+                note_categories.c.note_id.in_(chunk)
+            )
+
+            rows = db.session.execute(
+                db.union_all(tags_query, categories_query).order_by('note_id', 'kind', 'id')
+            )
+
+            for note_id, kind, _, name in rows:
+                if kind == 'tag':
+                    tag_names[note_id].append(name)
+                else:
+                    category_names[note_id].append(name)
+
+        return tag_names, category_names
+
     def to_dict(self):
         """转换为字典格式"""
         return {
@@ -131,6 +230,11 @@ class Note(db.Model):
     def __repr__(self):
         return f'<Note {self.title}>'
 
+@event.listens_for(Note.content, 'set')
+def _update_word_count(target, value, oldvalue, initiator):
+    """内容变更时同步字数"""
+    target.word_count = len(value.split()) if value else 0
+
 class Tag(db.Model):
     """标签模型"""
     __tablename__ = 'tags'
@@ -141,6 +245,9 @@ class Tag(db.Model):
     def __repr__(self):
         return f'<Tag {self.name}>'
 
+# 递归查询的最大层级，防止异常数据中的循环引用导致无限递归
+MAX_CATEGORY_DEPTH = 64
+
 class Category(db.Model):
     """分类模型 - 支持层级结构"""
     __tablename__ = 'categories'
@@ -163,11 +270,21 @@ class Category(db.Model):
     # 添加唯一约束：同一用户下的同级分类名称不能重复
     __table_args__ = (
         db.UniqueConstraint('name', 'parent_id', 'user_id', name='unique_category_per_parent_user'),
+        # 按用户和父分类查询子分类（唯一约束以 name 开头，无法用于该查询）
+        db.Index('ix_categories_user_parent_name', 'user_id', 'parent_id', 'name'),
     )
 
-    def to_dict(self, include_children=False):
-        """转换为字典格式"""
-        result = {
+    def to_dict(self, notes_counts=None):
+        """转换为字典格式（不含子分类，分类树见 build_tree）
+
+        notes_counts 为 Category.get_notes_counts 的结果，批量格式化时传入以避免逐个计数
+        """
+        if notes_counts is None:
+            notes_count = self.notes.filter_by(user_id=self.user_id).count()
+        else:
+            notes_count = notes_counts.get(self.id, 0)
+
+        return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
@@ -177,50 +294,126 @@ class Category(db.Model):
             'user_id': self.user_id,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'notes_count': self.notes.filter_by(user_id=self.user_id).count()
+            'notes_count': notes_count
         }
 
-        if include_children:
-            result['children'] = [child.to_dict(include_children=True)
-                                for child in self.children.all()]
+    @staticmethod
+    def get_notes_counts(user_id):
+        """一次分组查询获取用户每个分类的笔记数"""
+        rows = db.session.query(
+            note_categories.c.category_id, func.count(Note.id)
+        ).join(Note, Note.id == note_categories.c.note_id).filter(
+            Note.user_id == user_id
+        ).group_by(note_categories.c.category_id).all()
+        return dict(rows)
+
+    @staticmethod
+    def build_tree(user_id):
+        """构建用户的分类树：一次查询取出全部分类，一次分组查询取出笔记数，在内存中组装"""
+        categories = Category.query.filter_by(user_id=user_id).order_by(Category.id).all()
+        notes_counts = Category.get_notes_counts(user_id)
+
+        nodes = {category.id: category.to_dict(notes_counts=notes_counts) for category in categories}
+        roots = []
+        for category in categories:
+            node = nodes[category.id]
+            node['children'] = []
+            parent = nodes.get(category.parent_id)
+            if parent is not None:
+                parent.setdefault('children', []).append(node)
+            elif category.parent_id is None:
+                roots.append(node)
+
+        return sorted(roots, key=lambda node: node['name'])
+
+    def _ancestors_cte(self):
+        """自身及所有祖先分类的递归查询，depth 为距自身的层数"""
+        ancestors = db.select(
+            Category.id, Category.name, Category.parent_id, db.literal(0).label('depth')
+        ).where(Category.id == self.id).cte('category_ancestors', recursive=True)
+
+        parent = db.aliased(Category)
+        return ancestors.union_all(
+            db.select(parent.id, parent.name, parent.parent_id, ancestors.c.depth + 1).where(
+                parent.id == ancestors.c.parent_id,
+                ancestors.c.depth < MAX_CATEGORY_DEPTH
+            )
+        )
 
-        return result
+    def get_ancestor_ids(self):
+        """获取所有祖先分类ID（单条递归查询）"""
+        ancestors = self._ancestors_cte()
+        rows = db.session.execute(db.select(ancestors.c.id).where(ancestors.c.depth > 0))
+        return {row[0] for row in rows}
+
+    def touch_notes(self):
+        """分类名称变化会影响笔记的返回内容，更新其下笔记的修改时间使客户端缓存失效，并记录同步变更"""
+        from app.services.sync_service import SyncService
+        SyncService.record_category_notes(self.id)
+        db.session.execute(
+            db.update(Note).where(
+                Note.id.in_(db.select(note_categories.c.note_id).where(note_categories.c.category_id == self.id))
+            ).values(updated_at=datetime.utcnow()),
+            execution_options={'synchronize_session': False}
+        )
 
     def get_path(self):
-        """获取分类的完整路径"""
-        path = [self.name]
-        current = self.parent
-        while current:
-            path.insert(0, current.name)
-            current = current.parent
-        return ' > '.join(path)
+        """获取分类的完整路径（单条递归查询）"""
+        ancestors = self._ancestors_cte()
+        rows = db.session.execute(db.select(ancestors.c.name).order_by(ancestors.c.depth.desc()))
+        return ' > '.join(row[0] for row in rows)
 
     def get_all_descendants(self):
-        """获取所有子分类（递归）"""
-        descendants = []
-        for child in self.children:
-            descendants.append(child)
-            descendants.extend(child.get_all_descendants())
-        return descendants
+        """获取所有子分类（单条递归查询），按层级由浅到深排列"""
+        descendants = db.select(
+            Category.id, db.literal(1).label('depth')
+        ).where(Category.parent_id == self.id).cte('category_descendants', recursive=True)
+
+        child = db.aliased(Category)
+        descendants = descendants.union_all(
+            db.select(child.id, descendants.c.depth + 1).where(
+                child.parent_id == descendants.c.id,
+                descendants.c.depth < MAX_CATEGORY_DEPTH
+            )
+        )
+
+        return Category.query.join(descendants, Category.id == descendants.c.id).order_by(
+            descendants.c.depth, Category.id
+        ).all()
 
     def __repr__(self):
         return f'<Category {self.name}>'
 
 class NoteVersion(db.Model):
-    """笔记版本历史模型"""
+    """笔记版本历史模型
+
+    内容以压缩关键帧或相对上一版本的差异存储（见 app.services.version_storage），
+    storage_format 为空的旧记录仍直接使用 content 列。
+    """
     __tablename__ = 'note_versions'
 
     id = db.Column(db.Integer, primary_key=True)
     note_id = db.Column(db.Integer, db.ForeignKey('notes.id', ondelete='CASCADE'), nullable=False)
     version_number = db.Column(db.Integer, nullable=False)
     title = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text)
+    content = db.Column(db.Text)  # 旧版明文内容
     tags_snapshot = db.Column(db.Text)  # JSON格式存储标签快照
     categories_snapshot = db.Column(db.Text)  # JSON格式存储分类快照
     change_summary = db.Column(db.String(500))  # 变更摘要
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
 
+    # 压缩存储字段
+    storage_format = db.Column(db.String(10))  # full: 完整关键帧, delta: 差异
+    content_data = db.Column(db.LargeBinary)  # zlib 压缩后的内容或差异
+    content_size = db.Column(db.Integer)  # 原始内容字节数
+    base_version = db.Column(db.Integer)  # 差异所基于的版本号
+    chain_length = db.Column(db.Integer, default=0)  # 距最近关键帧的差异数
+
+    # 合并与清理策略字段
+    is_pinned = db.Column(db.Boolean, default=True)  # 初始、手动及恢复前快照，始终保留
+    edit_session = db.Column(db.String(64))  # 产生该快照的编辑会话（JWT jti）
+
     # 定义关系
     note = db.relationship('Note', backref=db.backref('versions', lazy='dynamic', order_by='NoteVersion.version_number.desc()'))
     creator = db.relationship('User', backref='note_versions')
@@ -237,7 +430,7 @@ class NoteVersion(db.Model):
             'note_id': self.note_id,
             'version_number': self.version_number,
             'title': self.title,
-            'content': self.content,
+            'content': self.get_content(),
             'tags': json.loads(self.tags_snapshot) if self.tags_snapshot else [],
             'categories': json.loads(self.categories_snapshot) if self.categories_snapshot else [],
             'change_summary': self.change_summary,
@@ -245,12 +438,99 @@ class NoteVersion(db.Model):
             'created_by': self.created_by
         }
 
+    def get_content(self):
+        """获取版本的完整内容"""
+        if self.storage_format is None:
+            return self.content
+        if getattr(self, '_resolved_content', None) is None:
+            NoteVersion.resolve_contents([self])
+        return self._resolved_content
+
+    def set_content(self, content, base=None, keyframe_interval=None):
+        """编码并写入版本内容，base 为上一版本（已还原内容）"""
+        if keyframe_interval is None:
+            keyframe_interval = current_app.config.get('VERSION_KEYFRAME_INTERVAL', DEFAULT_KEYFRAME_INTERVAL)
+
+        if base is not None:
+            base_content = base.get_content()
+            chain_length = (base.chain_length or 0) if base.storage_format == FORMAT_DELTA else 0
+        else:
+            base_content = None
+            chain_length = 0
+
+        self.storage_format, self.content_data = encode_content(
+            content, base_content, chain_length, keyframe_interval
+        )
+        if self.storage_format == FORMAT_DELTA:
+            self.base_version = base.version_number
+            self.chain_length = chain_length + 1
+        else:
+            self.base_version = None
+            self.chain_length = 0
+
+        self.content = None
+        self.content_size = len((content or '').encode('utf-8'))
+        self._resolved_content = content or ''
+
+    @staticmethod
+    def resolve_contents(versions):
+        """批量还原同一笔记多个版本的内容，差异链上缺少的基准版本按窗口一次查询补齐"""
+        if not versions:
+            return
+
+        note_id = versions[0].note_id
+        window = current_app.config.get('VERSION_KEYFRAME_INTERVAL', DEFAULT_KEYFRAME_INTERVAL)
+        by_number = {version.version_number: version for version in versions}
+
+        while True:
+            missing = {
+                version.base_version for version in by_number.values()
+                if version.storage_format == FORMAT_DELTA
+                and getattr(version, '_resolved_content', None) is None
+                and version.base_version not in by_number
+            }
+            if not missing:
+                break
+
+            rows = NoteVersion.query.filter(
+                NoteVersion.note_id == note_id,
+                NoteVersion.version_number.between(min(missing) - window, max(missing))
+            ).all()
+            added = [row for row in rows if row.version_number not in by_number]
+            if not added:
+                break
+            for row in added:
+                by_number[row.version_number] = row
+
+        # 按版本号升序还原，保证基准版本先于差异版本
+        for number in sorted(by_number):
+            version = by_number[number]
+            if getattr(version, '_resolved_content', None) is not None:
+                continue
+
+            if version.storage_format is None:
+                version._resolved_content = version.content
+            elif version.storage_format == FORMAT_FULL:
+                version._resolved_content = decompress_full(version.content_data)
+            else:
+                base = by_number.get(version.base_version)
+                base_content = getattr(base, '_resolved_content', None) if base else None
+                version._resolved_content = (
+                    apply_delta(base_content, version.content_data) if base_content is not None else None
+                )
+
     @staticmethod
     def create_from_note(note, change_summary=None):
         """从当前笔记创建版本快照"""
-        # 获取当前笔记的最大版本号
-        latest_version = NoteVersion.query.filter_by(note_id=note.id).order_by(NoteVersion.version_number.desc()).first()
+        keyframe_interval = current_app.config.get('VERSION_KEYFRAME_INTERVAL', DEFAULT_KEYFRAME_INTERVAL)
+
+        # 一次查询取出最近的版本窗口，既得到最大版本号，也足以还原上一版本内容
+        recent_versions = NoteVersion.query.filter_by(note_id=note.id).order_by(
+            NoteVersion.version_number.desc()
+        ).limit(keyframe_interval).all()
+        latest_version = recent_versions[0] if recent_versions else None
         next_version = (latest_version.version_number + 1) if latest_version else 1
+        NoteVersion.resolve_contents(recent_versions)
 
         # 创建标签和分类的快照
         tags_snapshot = json.dumps([tag.name for tag in note.tags])
@@ -260,14 +540,94 @@ class NoteVersion(db.Model):
             note_id=note.id,
             version_number=next_version,
             title=note.title,
-            content=note.content,
             tags_snapshot=tags_snapshot,
             categories_snapshot=categories_snapshot,
             change_summary=change_summary,
             created_by=note.user_id
         )
+        version.set_content(note.content, latest_version, keyframe_interval)
 
         return version
 
+    @staticmethod
+    def compact_note_versions(note_id):
+        """将笔记的全部版本重新编码为关键帧加差异的压缩格式"""
+        versions = NoteVersion.query.filter_by(note_id=note_id).order_by(NoteVersion.version_number).all()
+        NoteVersion.resolve_contents(versions)
+
+        previous = None
+        for version in versions:
+            version.set_content(version._resolved_content, previous)
+            previous = version
+
+        return len(versions)
+
+    @staticmethod
+    def prune_note_versions(note_id, now=None):
+        """按保留策略清理笔记的自动版本
+
+        固定版本和最新版本始终保留；超过 VERSION_HOURLY_AFTER_HOURS 的自动版本每小时保留一个，
+        超过 VERSION_DAILY_AFTER_DAYS 的每天保留一个。清理后剩余版本重新编码以修复差异链。
+        返回删除的版本数
+        """
+        now = now or datetime.utcnow()
+        hourly_after = now - timedelta(hours=current_app.config.get('VERSION_HOURLY_AFTER_HOURS', 24))
+        daily_after = now - timedelta(days=current_app.config.get('VERSION_DAILY_AFTER_DAYS', 7))
+
+        versions = NoteVersion.query.filter_by(note_id=note_id).order_by(NoteVersion.version_number).all()
+        if not versions:
+            return 0
+        NoteVersion.resolve_contents(versions)
+
+        # 从新到旧遍历，每个时间桶保留最新的一个自动版本
+        kept_buckets = set()
+        removed = []
+        for version in reversed(versions[:-1]):
+            if version.is_pinned or version.created_at >= hourly_after:
+                continue
+            if version.created_at >= daily_after:
+                bucket = version.created_at.strftime('%Y-%m-%d %H')
+            else:
+                bucket = version.created_at.strftime('%Y-%m-%d')
+            if bucket in kept_buckets:
+                removed.append(version)
+            else:
+                kept_buckets.add(bucket)
+
+        if not removed:
+            return 0
+
+        removed_ids = {version.id for version in removed}
+        NoteVersion.query.filter(NoteVersion.id.in_(removed_ids)).delete(synchronize_session=False)
+
+        previous = None
+        for version in versions:
+            if version.id in removed_ids:
+                continue
+            version.set_content(version._resolved_content, previous)
+            previous = version
+
+        return len(removed)
+
+    @staticmethod
+    def storage_stats(user_id):
+        """统计用户版本历史的原始大小和实际存储大小（字节）"""
+        row = db.session.query(
+            func.count(NoteVersion.id),
+            func.coalesce(func.sum(func.coalesce(NoteVersion.content_size, func.length(NoteVersion.content))), 0),
+            func.coalesce(func.sum(func.coalesce(func.length(NoteVersion.content_data), func.length(NoteVersion.content))), 0),
+            func.coalesce(func.sum(case((NoteVersion.storage_format == FORMAT_DELTA, 1), else_=0)), 0)
+        ).join(Note, Note.id == NoteVersion.note_id).filter(Note.user_id == user_id).one()
+
+        total_versions, raw_bytes, stored_bytes, delta_versions = row
+        return {
+            'total_versions': total_versions,
+            'delta_versions': delta_versions,
+            'raw_bytes': raw_bytes,
+            'stored_bytes': stored_bytes,
+            'saved_bytes': raw_bytes - stored_bytes,
+            'compression_ratio': round(raw_bytes / stored_bytes, 2) if stored_bytes else None
+        }
+
     def __repr__(self):
-        return f'<NoteVersion {self.note_id}:v{self.version_number}>'
\ No newline at end of file
+        return f'<NoteVersion {self.note_id}:v{self.version_number}>'
@@ -0,0 +1,19 @@
+from app import db
+from datetime import datetime
+
+class ReminderDelivery(db.Model):
+    """已发送的日历事件提醒，同一事件的同一提醒时间只记录一次（避免重复提醒）"""
+    __tablename__ = 'reminder_deliveries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    remind_at = db.Column(db.DateTime, nullable=False)  # 发送时事件的提醒时间，事件改期后可再次提醒
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'remind_at', name='uq_reminder_deliveries_event_remind_at'),
+    )
+
+    def __repr__(self):
+        return f'<ReminderDelivery {self.event_id} @ {self.remind_at}>'
@@ -0,0 +1,48 @@
+from app import db
+from datetime import datetime
+
+class UserNoteStats(db.Model):
+    """用户笔记汇总统计（增量维护）"""
+    __tablename__ = 'user_note_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_notes = db.Column(db.Integer, default=0, nullable=False)  # 未删除笔记数
+    total_words = db.Column(db.Integer, default=0, nullable=False)  # 未删除笔记总字数
+    notes_with_content = db.Column(db.Integer, default=0, nullable=False)  # 内容不为空的笔记数
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserNoteStats {self.user_id}>'
+
+class UserDailyNoteStats(db.Model):
+    """用户每日创建笔记数（按创建日期计数，只统计未删除笔记）"""
+    __tablename__ = 'user_daily_note_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    created_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<UserDailyNoteStats {self.user_id}:{self.day}>'
+
+class UserTagStats(db.Model):
+    """用户各标签下的未删除笔记数"""
+    __tablename__ = 'user_tag_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    note_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<UserTagStats {self.user_id}:{self.tag_id}>'
+
+class UserCategoryStats(db.Model):
+    """用户各分类下的未删除笔记数"""
+    __tablename__ = 'user_category_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    note_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<UserCategoryStats {self.user_id}:{self.category_id}>'
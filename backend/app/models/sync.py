@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+class NoteChange(db.Model):
+    """笔记数据变更日志，自增ID作为增量同步的变更令牌"""
+    __tablename__ = 'note_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    entity_type = db.Column(db.String(20), nullable=False)  # note / tag / category
+    entity_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_note_changes_user_id_id', 'user_id', 'id'),
+        db.Index('ix_note_changes_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<NoteChange {self.id} {self.entity_type}:{self.entity_id}>'
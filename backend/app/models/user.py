@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from flask import current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
@@ -9,10 +10,14 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, index=True)
     email = db.Column(db.String(120), unique=True, index=True)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # 笔记数据版本号，用户的笔记、标签或分类有任何变更时递增（用于列表接口的 ETag）
+    notes_version = db.Column(db.Integer, default=0, nullable=False)
+    notes_modified_at = db.Column(db.DateTime)
+
     # 定义关系
     notes = db.relationship('Note', backref='author', lazy='dynamic')
     categories = db.relationship('Category', backref='owner', lazy='dynamic')
@@ -24,13 +29,43 @@ class User(db.Model):
     
     @password.setter
     def password(self, password):
-        """设置密码"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码（哈希算法和参数由 PASSWORD_HASH_METHOD、PASSWORD_SALT_LENGTH 配置）"""
+        self.password_hash = generate_password_hash(
+            password,
+            method=current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+            salt_length=current_app.config.get('PASSWORD_SALT_LENGTH', 16)
+        )
     
     def verify_password(self, password):
         """验证密码"""
         return check_password_hash(self.password_hash, password)
 
+    def needs_rehash(self):
+        """密码哈希的算法、参数或盐长度与当前配置不一致时返回 True"""
+        if not self.password_hash or self.password_hash.count('$') < 2:
+            return True
+        method, salt, _ = self.password_hash.split('$', 2)
+        return (method != current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+                or len(salt) != current_app.config.get('PASSWORD_SALT_LENGTH', 16))
+
+    @staticmethod
+    def touch_notes(user_id):
+        """递增用户的笔记数据版本号（不加载用户对象，调用方负责提交事务）"""
+        db.session.execute(
+            db.update(User).where(User.id == user_id).values(
+                notes_version=User.notes_version + 1,
+                notes_modified_at=datetime.utcnow()
+            ),
+            execution_options={'synchronize_session': False}
+        )
+
+    @staticmethod
+    def get_notes_version(user_id):
+        """获取用户的笔记数据版本号和最后修改时间"""
+        return db.session.execute(
+            db.select(User.notes_version, User.notes_modified_at).where(User.id == user_id)
+        ).first()
+
     def to_dict(self):
         """转换为字典"""
         return {
@@ -1,2 +1,3 @@
 from app.routes.auth import auth_bp
-from app.routes.notes import notes_bp 
\ No newline at end of file
+from app.routes.notes import notes_bp
+from app.routes.export import export_bp
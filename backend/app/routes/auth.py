@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required
 from app.models import User
 from app import db
+from app.services.auth_service import AuthService, LoginBusyError
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -43,8 +44,17 @@ def login():
     user = User.query.filter_by(username=data['username']).first()
     
     # 验证密码
-    if not user or not user.verify_password(data['password']):
+    try:
+        valid = user is not None and AuthService.verify_password(user, data['password'])
+    except LoginBusyError:
+        return jsonify({'error': '登录请求过多，请稍后重试'}), 503, {'Retry-After': '1'}
+    if not valid:
         return jsonify({'error': '用户名或密码错误'}), 401
+
+    # 哈希参数调整后，在用户下次登录时用新参数重新计算
+    if user.needs_rehash():
+        user.password = data['password']
+        db.session.commit()
     
     # 创建访问令牌
     access_token = create_access_token(identity=str(user.id))
@@ -63,35 +73,27 @@ def login():
 @jwt_required()
 def get_current_user():
     """获取当前用户信息"""
-    current_user_id = int(get_jwt_identity())
-    user = User.query.get_or_404(current_user_id)
-    
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email,
-        'created_at': user.created_at.isoformat()
-    }), 200
+    user = AuthService.current_user()
+    if user is None:
+        return jsonify({'error': '用户不存在'}), 404
+
+    return jsonify(user), 200
 
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     """获取用户个人资料"""
-    current_user_id = int(get_jwt_identity())
-    user = User.query.get_or_404(current_user_id)
+    user = AuthService.current_user()
+    if user is None:
+        return jsonify({'error': '用户不存在'}), 404
 
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email,
-        'created_at': user.created_at.isoformat()
-    }), 200
+    return jsonify(user), 200
 
 @auth_bp.route('/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
     """更新用户资料"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
     user = User.query.get_or_404(current_user_id)
 
     data = request.get_json()
@@ -135,7 +137,7 @@ def update_profile():
             new_password = data['newPassword']
 
             # 验证当前密码
-            if not user.check_password(current_password):
+            if not user.verify_password(current_password):
                 return jsonify({'error': '当前密码错误'}), 400
 
             # 验证新密码长度
@@ -145,6 +147,7 @@ def update_profile():
             user.password = new_password
 
         db.session.commit()
+        AuthService.invalidate_user(current_user_id)
 
         return jsonify({
             'message': '个人资料更新成功',
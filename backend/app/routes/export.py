@@ -0,0 +1,81 @@
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import jwt_required
+from urllib.parse import quote
+from app.services.auth_service import AuthService
+from app.services.export_service import ExportService, FORMATS, FORMAT_MARKDOWN
+
+export_bp = Blueprint('export', __name__)
+
+def parse_export_request():
+    """解析导出参数，返回 (格式, 导出选项, 错误响应)"""
+    data = request.get_json(silent=True) or {}
+
+    export_format = data.get('format', FORMAT_MARKDOWN)
+    if export_format not in FORMATS:
+        return None, None, (jsonify({'error': f"不支持的导出格式，可选: {', '.join(FORMATS)}"}), 400)
+    if not ExportService.is_available(export_format):
+        return None, None, (jsonify({'error': '服务器未安装该格式所需的组件'}), 400)
+
+    note_ids = data.get('note_ids')
+    if note_ids is not None:
+        if not isinstance(note_ids, list) or not all(isinstance(note_id, int) for note_id in note_ids):
+            return None, None, (jsonify({'error': 'note_ids 必须是整数列表'}), 400)
+        note_ids = list(dict.fromkeys(note_ids))
+
+    options = {
+        'note_ids': note_ids,
+        'include_deleted': bool(data.get('include_deleted', False)),
+        'include_attachments': bool(data.get('include_attachments', True))
+    }
+    return export_format, options, None
+
+@export_bp.route('/formats', methods=['GET'])
+@jwt_required()
+def get_export_formats():
+    """获取可用的导出格式"""
+    return jsonify({
+        'formats': [
+            {'format': name, 'description': description, 'extension': extension}
+            for name, (description, _, extension) in FORMATS.items()
+            if ExportService.is_available(name)
+        ]
+    }), 200
+
+@export_bp.route('/preview', methods=['POST'])
+@jwt_required()
+def preview_export():
+    """预览导出：返回笔记数量和前几篇笔记的标题"""
+    current_user_id = AuthService.current_user_id()
+    export_format, options, error = parse_export_request()
+    if error:
+        return error
+    options.pop('include_attachments')
+
+    preview = []
+    for note in ExportService.iter_notes(current_user_id, batch_size=5, **options):
+        preview.append({'id': note['id'], 'title': note['title'], 'tags': note['tags']})
+        if len(preview) >= 5:
+            break
+
+    return jsonify({
+        'format': export_format,
+        'total': ExportService.count(current_user_id, options['note_ids'], options['include_deleted']),
+        'notes': preview
+    }), 200
+
+@export_bp.route('/notes', methods=['POST'])
+@jwt_required()
+def export_notes():
+    """流式导出笔记（分块传输，导出内容边生成边发送）"""
+    current_user_id = AuthService.current_user_id()
+    export_format, options, error = parse_export_request()
+    if error:
+        return error
+
+    content = ExportService.generate(export_format, current_user_id, **options)
+    response = current_app.response_class(stream_with_context(content), mimetype=FORMATS[export_format][1])
+    filename = ExportService.download_name(export_format)
+    response.headers['Content-Disposition'] = f"attachment; filename=\"{filename}\"; filename*=UTF-8''{quote(filename)}"
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
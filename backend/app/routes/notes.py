@@ -1,20 +1,173 @@
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app, send_file, g
+from flask_jwt_extended import jwt_required, get_jwt
 from app.models import Note, Tag, Category, User, NoteVersion
 from app import db
-from sqlalchemy import or_, and_, func, desc
-from datetime import datetime, timedelta
+from app.services.auth_service import AuthService
+from app.services.search_service import SearchService, highlight, query_terms
+from app.services.stats_service import StatsService
+from app.services.bulk_service import BulkNoteService
+from app.services.taxonomy_service import TaxonomyService
+from app.services.file_storage import (
+    FileStorageService, FileTooLargeError, UploadOffsetError, allowed_file, get_file_type
+)
+from app.services.image_derivatives import ImageDerivativeService
+from app.services.response_cache import ResponseCache, cached_response
+from app.services.event_stream import EventStream, EVENT_IMPORT_PROGRESS, EVENT_NOTES_CHANGED
+from app.services.import_service import ImportService, ImportFormatError
+from app.services.reminder_service import ReminderService
+from app.services.sync_service import SyncService, ENTITY_CATEGORY, ENTITY_NOTE, ENTITY_TAG
+from sqlalchemy import or_, and_
+from datetime import datetime
 import os
-import uuid
+import json
+import base64
+import hashlib
+import mimetypes
+from functools import wraps
+from urllib.parse import quote
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
 notes_bp = Blueprint('notes', __name__)
 
+def serialize_note(note, tag_names, category_names):
+    """将笔记格式化为接口返回的字典"""
+    return {
+        'id': note.id,
+        'title': note.title,
+        'content': note.content,
+        'created_at': note.created_at.isoformat(),
+        'updated_at': note.updated_at.isoformat(),
+        'tags': tag_names,
+        'categories': category_names
+    }
+
+def serialize_notes(notes):
+    """批量格式化笔记，整页笔记的标签和分类只需一次查询"""
+    tag_map, category_map = Note.load_tag_and_category_names([note.id for note in notes])
+    return [serialize_note(note, tag_map[note.id], category_map[note.id]) for note in notes]
+
+def encode_cursor(sort_value, note_id):
+    """生成不透明的分页游标"""
+    payload = json.dumps([sort_value.isoformat(), note_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析分页游标，无效时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, note_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(sort_value), int(note_id)
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+def paginate_by_cursor(query, sort_column, cursor, per_page):
+    """基于 (sort_column, id) 的键集分页，每页代价与翻页深度无关
+
+    返回 (当前页笔记列表, 下一页游标)
+    """
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, Note.id < last_id)
+        ))
+
+    items = query.order_by(sort_column.desc(), Note.id.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+
+    return items, next_cursor
+
+def cursor_page_size():
+    """游标分页和搜索结果的每页数量，限制在配置的上限内"""
+    max_size = current_app.config.get('NOTES_MAX_PAGE_SIZE', 100)
+    per_page = request.args.get('per_page', 20, type=int)
+    return min(max(per_page, 1), max_size)
+
+def is_first_page():
+    """是否请求列表首页（只缓存首页）"""
+    if 'cursor' in request.args:
+        return not request.args.get('cursor')
+    return request.args.get('page', 1, type=int) == 1
+
+def notes_changed(user_id):
+    """用户笔记数据变更后递增数据版本号，使其缓存的响应失效，并通知用户的其他在线客户端"""
+    User.touch_notes(user_id)
+    db.session.commit()
+    EventStream.publish(user_id, EVENT_NOTES_CHANGED)
+
+@notes_bp.after_request
+def invalidate_response_cache(response):
+    """请求修改了笔记数据时递增当前用户的数据版本号，使其缓存的响应和列表 ETag 失效
+
+    是否修改由写入同步变更日志时设置的 g.notes_dirty 判断：内容未变的保存、文件上传等请求不写数据，
+    缓存保持有效。请求出错时已提交的部分（如分批导入中已完成的批次）同样需要使缓存失效。
+    """
+    if g.pop('notes_dirty', False):
+        try:
+            user_id = AuthService.current_user_id()
+        except (RuntimeError, TypeError):
+            user_id = None
+        if user_id is not None:
+            notes_changed(user_id)
+    return response
+
+def is_not_modified(etag, last_modified=None):
+    """客户端缓存是否仍然有效（If-None-Match 优先于 If-Modified-Since）"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+def with_validators(response, etag, last_modified=None):
+    """设置 ETag/Last-Modified，并要求客户端每次使用缓存前重新验证"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified_response(etag, last_modified=None):
+    """304 响应"""
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+def conditional_collection(view):
+    """列表接口的条件请求：ETag 由用户的笔记数据版本号、接口和查询参数生成，
+    数据未变化时只需一次主键查询即可返回 304"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = AuthService.current_user_id()
+        # 在生成响应之前读取版本号，避免并发写入时用新版本号标记旧数据；响应缓存使用同一个版本号，
+        # 缓存的响应体与 ETag 总是对应同一版本的数据
+        version = ResponseCache.current_version(user_id)
+        if version is None:
+            return view(*args, **kwargs)
+
+        args_key = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        etag = hashlib.sha1(f'{user_id}:{version.notes_version}:{request.endpoint}:{args_key}'.encode()).hexdigest()
+        if is_not_modified(etag, version.notes_modified_at):
+            return not_modified_response(etag, version.notes_modified_at)
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            with_validators(response, etag, version.notes_modified_at)
+        return response
+    return wrapper
+
 @notes_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional_collection
+@cached_response(condition=is_first_page)
 def get_notes():
     """获取当前用户的所有笔记，支持搜索和过滤"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 获取查询参数
     search = request.args.get('search', '').strip()
@@ -26,13 +179,13 @@ def get_notes():
     # 构建基础查询 - 只返回未删除的笔记
     query = Note.get_active_notes(current_user_id)
 
-    # 添加搜索条件
+    # 添加搜索条件（优先使用全文索引）
     if search:
-        search_filter = or_(
-            Note.title.contains(search),
-            Note.content.contains(search)
-        )
-        query = query.filter(search_filter)
+        matches = SearchService.ranked_matches(current_user_id, search)
+        if matches is not None:
+            query = query.filter(Note.id.in_(db.select(matches.c.note_id)))
+        else:
+            query = query.filter(SearchService.like_filter(search))
 
     # 添加标签过滤
     if tags:
@@ -46,6 +199,30 @@ def get_notes():
         if category_list:
             query = query.join(Note.categories).filter(Category.name.in_(category_list))
 
+    # 游标分页模式（传入 cursor 参数即启用，首页传空值）
+    if 'cursor' in request.args:
+        per_page = cursor_page_size()
+        try:
+            notes_data, next_cursor = paginate_by_cursor(
+                query, Note.updated_at, request.args.get('cursor', ''), per_page
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        pagination = {
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }
+        # 总数需要额外的 COUNT 查询，仅在请求时计算
+        if request.args.get('with_total', 'false').lower() == 'true':
+            pagination['total'] = query.order_by(None).count()
+
+        return jsonify({
+            'notes': serialize_notes(notes_data),
+            'pagination': pagination
+        }), 200
+
     # 排序和分页
     query = query.order_by(Note.updated_at.desc())
 
@@ -66,15 +243,7 @@ def get_notes():
         has_prev = False
 
     # 格式化返回数据
-    result = [{
-        'id': note.id,
-        'title': note.title,
-        'content': note.content,
-        'created_at': note.created_at.isoformat(),
-        'updated_at': note.updated_at.isoformat(),
-        'tags': [tag.name for tag in note.tags],
-        'categories': [category.name for category in note.categories]
-    } for note in notes_data]
+    result = serialize_notes(notes_data)
 
     return jsonify({
         'notes': result,
@@ -91,30 +260,27 @@ def get_notes():
 @jwt_required()
 def get_note(id):
     """获取单个笔记"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
     
     # 查询笔记（只查询未删除的）
     note = Note.query.filter_by(id=id, user_id=current_user_id, is_deleted=False).first_or_404()
+
+    # 笔记（包括标签和分类）的任何修改都会更新 updated_at，据此判断客户端缓存是否有效
+    etag = f"{note.id}-{note.updated_at:%Y%m%d%H%M%S%f}" if note.updated_at else str(note.id)
+    if is_not_modified(etag, note.updated_at):
+        return not_modified_response(etag, note.updated_at)
     
     # 格式化返回数据
-    result = {
-        'id': note.id,
-        'title': note.title,
-        'content': note.content,
-        'created_at': note.created_at.isoformat(),
-        'updated_at': note.updated_at.isoformat(),
-        'tags': [tag.name for tag in note.tags],
-        'categories': [category.name for category in note.categories]
-    }
+    result = serialize_notes([note])[0]
     
-    return jsonify(result), 200
+    return with_validators(jsonify(result), etag, note.updated_at), 200
 
 @notes_bp.route('', methods=['POST'])
 @notes_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_note():
     """创建新笔记"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
     data = request.get_json()
     
     # 验证数据
@@ -128,47 +294,34 @@ def create_note():
         user_id=current_user_id
     )
     
-    # 处理标签
+    db.session.add(note)
+    db.session.flush()
+
+    # 处理标签（名称批量解析为ID，缺失的标签批量创建）
     if 'tags' in data and isinstance(data['tags'], list):
-        for tag_name in data['tags']:
-            tag = Tag.query.filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.session.add(tag)
-            note.tags.append(tag)
+        note.set_tag_ids(TaxonomyService.resolve_tag_ids(data['tags']), current_ids=())
     
     # 处理分类
     if 'categories' in data and isinstance(data['categories'], list):
-        for category_name in data['categories']:
-            category = Category.query.filter_by(name=category_name).first()
-            if not category:
-                category = Category(name=category_name)
-                db.session.add(category)
-            note.categories.append(category)
+        note.set_category_ids(
+            TaxonomyService.resolve_category_ids(current_user_id, data['categories']), current_ids=()
+        )
     
-    db.session.add(note)
     db.session.commit()
 
     # 为新创建的笔记创建初始版本
     note.create_version("初始版本")
+    StatsService.record_change(current_user_id, None, StatsService.capture(note))
     db.session.commit()
 
     # 返回创建的笔记
-    return jsonify({
-        'id': note.id,
-        'title': note.title,
-        'content': note.content,
-        'created_at': note.created_at.isoformat(),
-        'updated_at': note.updated_at.isoformat(),
-        'tags': [tag.name for tag in note.tags],
-        'categories': [category.name for category in note.categories]
-    }), 201
+    return jsonify(serialize_notes([note])[0]), 201
 
 @notes_bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_note(id):
     """更新笔记"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
     data = request.get_json()
     
     # 验证数据
@@ -177,95 +330,82 @@ def update_note(id):
     
     # 查询笔记（只查询未删除的）
     note = Note.query.filter_by(id=id, user_id=current_user_id, is_deleted=False).first_or_404()
+    stats_before = StatsService.capture(note)
 
-    # 检查是否有实际内容变更
+    # 检查是否有实际内容变更（标签和分类按ID集合比较，当前关联已随统计状态一并读取）
     has_content_change = False
     change_summary_parts = []
 
-    if 'title' in data and data['title'] != note.title:
+    title_changed = 'title' in data and data['title'] != note.title
+    if title_changed:
         has_content_change = True
         change_summary_parts.append('标题')
 
-    if 'content' in data and data['content'] != note.content:
+    content_changed = 'content' in data and data['content'] != note.content
+    if content_changed:
         has_content_change = True
         change_summary_parts.append('内容')
 
-    if 'tags' in data:
-        current_tag_names = set(tag.name for tag in note.tags)
-        new_tag_names = set(data['tags'])
-        if current_tag_names != new_tag_names:
+    new_tag_ids = None
+    if 'tags' in data and isinstance(data['tags'], list):
+        new_tag_ids = set(TaxonomyService.resolve_tag_ids(data['tags']))
+        if new_tag_ids != stats_before.tag_ids:
             has_content_change = True
             change_summary_parts.append('标签')
 
-    if 'categories' in data:
-        current_category_names = set(category.name for category in note.categories)
-        new_category_names = set(data['categories'])
-        if current_category_names != new_category_names:
+    new_category_ids = None
+    if 'categories' in data and isinstance(data['categories'], list):
+        new_category_ids = set(TaxonomyService.resolve_category_ids(current_user_id, data['categories']))
+        if new_category_ids != stats_before.category_ids:
             has_content_change = True
             change_summary_parts.append('分类')
 
-    # 如果有内容变更，先创建版本快照
-    if has_content_change:
-        change_summary = f"更新了{', '.join(change_summary_parts)}"
-        note.create_version(change_summary)
+    # 没有任何变更时直接返回，不写数据库（未写入同步变更日志，数据版本号和响应缓存也保持不变）
+    if not has_content_change:
+        db.session.commit()
+        return jsonify(serialize_notes([note])[0]), 200
 
-    # 更新笔记
-    if 'title' in data:
+    # 先创建版本快照（同一会话的连续自动保存会合并）
+    change_summary = f"更新了{', '.join(change_summary_parts)}"
+    note.create_edit_version(change_summary, edit_session=get_jwt().get('jti'))
+
+    # 只写入有变化的字段
+    if title_changed:
         note.title = data['title']
 
-    if 'content' in data:
+    if content_changed:
         note.content = data['content']
-    
-    # 更新标签
-    if 'tags' in data and isinstance(data['tags'], list):
-        # 清除现有标签
-        note.tags = []
-        
-        # 添加新标签
-        for tag_name in data['tags']:
-            tag = Tag.query.filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.session.add(tag)
-            note.tags.append(tag)
-    
-    # 更新分类
-    if 'categories' in data and isinstance(data['categories'], list):
-        # 清除现有分类
-        note.categories = []
-        
-        # 添加新分类
-        for category_name in data['categories']:
-            category = Category.query.filter_by(name=category_name).first()
-            if not category:
-                category = Category(name=category_name)
-                db.session.add(category)
-            note.categories.append(category)
-    
+
+    # 只修改标签或分类时笔记行本身没有变化，需手动更新修改时间
+    note.updated_at = datetime.utcnow()
+
+    # 标签和分类只删除和插入有差异的关联
+    if new_tag_ids is not None:
+        note.set_tag_ids(new_tag_ids, current_ids=stats_before.tag_ids)
+
+    if new_category_ids is not None:
+        note.set_category_ids(new_category_ids, current_ids=stats_before.category_ids)
+
+    db.session.flush()
+    StatsService.record_change(current_user_id, stats_before, StatsService.capture(note))
     db.session.commit()
     
     # 返回更新后的笔记
-    return jsonify({
-        'id': note.id,
-        'title': note.title,
-        'content': note.content,
-        'created_at': note.created_at.isoformat(),
-        'updated_at': note.updated_at.isoformat(),
-        'tags': [tag.name for tag in note.tags],
-        'categories': [category.name for category in note.categories]
-    }), 200
+    return jsonify(serialize_notes([note])[0]), 200
 
 @notes_bp.route('/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_note(id):
     """软删除笔记（移到回收站）"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 查询笔记（只查询未删除的）
     note = Note.query.filter_by(id=id, user_id=current_user_id, is_deleted=False).first_or_404()
 
     # 软删除笔记
+    stats_before = StatsService.capture(note)
     note.soft_delete()
+    StatsService.record_change(current_user_id, stats_before, stats_before._replace(active=False))
     db.session.commit()
 
     return jsonify({
@@ -277,7 +417,7 @@ def delete_note(id):
 @jwt_required()
 def search_notes():
     """高级搜索笔记"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 获取查询参数
     q = request.args.get('q', '').strip()
@@ -293,18 +433,13 @@ def search_notes():
     query = Note.get_active_notes(current_user_id)
 
     # 全文搜索
+    matches = None
     if q:
-        search_terms = q.split()
-        search_conditions = []
-        for term in search_terms:
-            search_conditions.append(
-                or_(
-                    Note.title.contains(term),
-                    Note.content.contains(term)
-                )
-            )
-        if search_conditions:
-            query = query.filter(and_(*search_conditions))
+        matches = SearchService.ranked_matches(current_user_id, q)
+        if matches is not None:
+            query = query.join(matches, matches.c.note_id == Note.id)
+        else:
+            query = query.filter(SearchService.like_filter(q))
 
     # 标签过滤
     if tags:
@@ -335,23 +470,38 @@ def search_notes():
         except ValueError:
             pass
 
-    # 执行查询
-    notes = query.order_by(Note.updated_at.desc()).all()
+    # 执行查询：有全文匹配时按 BM25 相关度排序，只读取和高亮当前页
+    if matches is not None:
+        query = query.order_by(matches.c.rank, Note.updated_at.desc())
+    else:
+        query = query.order_by(Note.updated_at.desc())
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = cursor_page_size()
+    notes = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(notes) > per_page
+    notes = notes[:per_page]
+
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'has_next': has_next,
+        'has_prev': page > 1
+    }
+    # 总数需要统计全部匹配，仅在请求时计算
+    if request.args.get('with_total', 'false').lower() == 'true':
+        pagination['total'] = query.order_by(None).count()
 
     # 格式化返回数据
-    result = [{
-        'id': note.id,
-        'title': note.title,
-        'content': note.content,
-        'created_at': note.created_at.isoformat(),
-        'updated_at': note.updated_at.isoformat(),
-        'tags': [tag.name for tag in note.tags],
-        'categories': [category.name for category in note.categories]
-    } for note in notes]
+    terms = query_terms(q)
+    result = serialize_notes(notes)
+    for note, item in zip(notes, result):
+        item['highlighted_title'] = highlight(note.title, terms)
+        item['snippet'] = highlight(note.content, terms, max_length=160)
 
     return jsonify({
         'notes': result,
-        'total': len(result),
+        'pagination': pagination,
         'query': {
             'search': q,
             'tags': tags,
@@ -363,9 +513,11 @@ def search_notes():
 
 @notes_bp.route('/tags', methods=['GET'])
 @jwt_required()
+@conditional_collection
+@cached_response()
 def get_tags():
     """获取当前用户的所有标签"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 查询用户的所有标签（通过笔记关联）
     tags = db.session.query(Tag).join(Note.tags).filter(
@@ -382,25 +534,23 @@ def get_tags():
 
 @notes_bp.route('/categories', methods=['GET'])
 @jwt_required()
+@conditional_collection
+@cached_response()
 def get_categories():
     """获取当前用户的所有分类（层级结构）"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 获取查询参数
     include_tree = request.args.get('tree', 'false').lower() == 'true'
 
     if include_tree:
-        # 返回层级结构
-        root_categories = Category.query.filter_by(
-            user_id=current_user_id,
-            parent_id=None
-        ).order_by(Category.name).all()
-
-        result = [category.to_dict(include_children=True) for category in root_categories]
+        # 返回层级结构（一次查询取分类，一次分组查询取笔记数）
+        result = Category.build_tree(current_user_id)
     else:
         # 返回扁平列表（用于搜索过滤）
         categories = Category.query.filter_by(user_id=current_user_id).order_by(Category.name).all()
-        result = [category.to_dict() for category in categories]
+        notes_counts = Category.get_notes_counts(current_user_id)
+        result = [category.to_dict(notes_counts=notes_counts) for category in categories]
 
     return jsonify(result), 200
 
@@ -408,7 +558,7 @@ def get_categories():
 @jwt_required()
 def create_category():
     """创建新分类"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
     data = request.get_json()
 
     # 验证数据
@@ -453,7 +603,7 @@ def create_category():
 @jwt_required()
 def update_category(category_id):
     """更新分类"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
     data = request.get_json()
 
     # 查找分类
@@ -474,6 +624,8 @@ def update_category(category_id):
                 return jsonify({'error': '同级分类中已存在相同名称'}), 400
 
             category.name = name
+            category.touch_notes()
+            TaxonomyService.invalidate_categories(current_user_id)
 
     if 'description' in data:
         category.description = data['description']
@@ -494,12 +646,9 @@ def update_category(category_id):
             if not new_parent:
                 return jsonify({'error': '父分类不存在'}), 400
 
-            # 检查是否会造成循环引用
-            current_check = new_parent
-            while current_check:
-                if current_check.id == category.id:
-                    return jsonify({'error': '不能将分类移动到其子分类下'}), 400
-                current_check = current_check.parent
+            # 检查是否会造成循环引用（新父分类或其任一祖先是当前分类）
+            if new_parent.id == category.id or category.id in new_parent.get_ancestor_ids():
+                return jsonify({'error': '不能将分类移动到其子分类下'}), 400
 
         category.parent_id = new_parent_id
 
@@ -511,7 +660,7 @@ def update_category(category_id):
 @jwt_required()
 def delete_category(category_id):
     """删除分类"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 查找分类
     category = Category.query.filter_by(id=category_id, user_id=current_user_id).first_or_404()
@@ -527,52 +676,57 @@ def delete_category(category_id):
 
     db.session.delete(category)
     db.session.commit()
+    TaxonomyService.invalidate_categories(current_user_id)
 
     return jsonify({'success': True}), 200
 
 # 文件上传相关配置
-ALLOWED_EXTENSIONS = {
-    'images': {'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg'},
-    'documents': {'pdf', 'doc', 'docx', 'txt', 'md', 'rtf'},
-    'archives': {'zip', 'rar', '7z', 'tar', 'gz'},
-    'others': {'json', 'xml', 'csv', 'xlsx', 'pptx'}
-}
-
-def allowed_file(filename, file_type='all'):
-    """检查文件类型是否允许"""
-    if '.' not in filename:
-        return False
-
-    ext = filename.rsplit('.', 1)[1].lower()
-
-    if file_type == 'all':
-        all_extensions = set()
-        for extensions in ALLOWED_EXTENSIONS.values():
-            all_extensions.update(extensions)
-        return ext in all_extensions
-    elif file_type in ALLOWED_EXTENSIONS:
-        return ext in ALLOWED_EXTENSIONS[file_type]
-
-    return False
-
-def get_file_type(filename):
-    """获取文件类型分类"""
-    if '.' not in filename:
-        return 'others'
-
-    ext = filename.rsplit('.', 1)[1].lower()
-
-    for file_type, extensions in ALLOWED_EXTENSIONS.items():
-        if ext in extensions:
-            return file_type
-
-    return 'others'
+def set_file_cache_headers(response):
+    """文件名与内容一一对应，允许客户端长期缓存（需登录访问，只允许私有缓存）"""
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get('FILE_CACHE_MAX_AGE', 0)
+    response.cache_control.immutable = True
+    return response
+
+def send_stored_file(path, filename, etag=True, last_modified=None):
+    """发送文件，支持 If-None-Match/If-Modified-Since 条件请求和 Range 请求
+
+    FILE_SENDFILE_MODE 为 x-sendfile 时由 Flask 输出 X-Sendfile 头（USE_X_SENDFILE），
+    为 x-accel 时输出 X-Accel-Redirect 头，由 nginx 发送文件内容并处理 Range。
+    """
+    path = os.path.abspath(path)
+
+    if current_app.config.get('FILE_SENDFILE_MODE') == 'x-accel':
+        relative_path = os.path.relpath(path, os.path.abspath(FileStorageService.storage_root()))
+        prefix = current_app.config.get('FILE_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative_path.replace(os.sep, '/'))
+        if etag is True:
+            stat = os.stat(path)
+            etag = f'{stat.st_mtime}-{stat.st_size}'
+            last_modified = last_modified or datetime.utcfromtimestamp(stat.st_mtime)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        set_file_cache_headers(response)
+        return response.make_conditional(request)
+
+    response = send_file(path, download_name=filename, etag=etag, last_modified=last_modified,
+                         max_age=current_app.config.get('FILE_CACHE_MAX_AGE', 0), conditional=True)
+    return set_file_cache_headers(response)
+
+def submit_image_derivatives(user_file):
+    """图片上传后在后台生成缩略图"""
+    if user_file.file_type == 'images':
+        ImageDerivativeService.submit(FileStorageService.blob_path(user_file.blob_sha256), user_file.filename)
 
 @notes_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_file():
-    """上传文件"""
-    current_user_id = int(get_jwt_identity())
+    """上传文件（流式写入并按内容去重）"""
+    current_user_id = AuthService.current_user_id()
 
     # 检查是否有文件
     if 'file' not in request.files:
@@ -588,59 +742,202 @@ def upload_file():
     if not allowed_file(file.filename):
         return jsonify({'error': '不支持的文件类型'}), 400
 
-    # 检查文件大小 (10MB限制)
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
-
-    if file_size > 10 * 1024 * 1024:  # 10MB
-        return jsonify({'error': '文件大小不能超过10MB'}), 400
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
 
     try:
         # 生成安全的文件名
         original_filename = secure_filename(file.filename)
-        file_ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
-        unique_filename = f"{uuid.uuid4().hex}.{file_ext}" if file_ext else uuid.uuid4().hex
-
-        # 创建上传目录
-        upload_dir = os.path.join(current_app.root_path, '..', 'uploads', str(current_user_id))
-        os.makedirs(upload_dir, exist_ok=True)
-
-        # 保存文件
-        file_path = os.path.join(upload_dir, unique_filename)
-        file.save(file_path)
-
-        # 返回文件信息
-        file_info = {
-            'id': uuid.uuid4().hex,
-            'original_name': original_filename,
-            'filename': unique_filename,
-            'file_type': get_file_type(original_filename),
-            'file_size': file_size,
-            'upload_time': datetime.utcnow().isoformat(),
-            'url': f'/api/notes/files/{current_user_id}/{unique_filename}'
-        }
 
-        return jsonify(file_info), 201
+        # 边写入边计算哈希，超过大小限制时中止
+        user_file = FileStorageService.save_upload(
+            current_user_id, file.stream, original_filename, get_file_type(original_filename), max_size
+        )
+        db.session.commit()
+        submit_image_derivatives(user_file)
+
+        return jsonify(user_file.to_dict()), 201
+
+    except FileTooLargeError:
+        db.session.rollback()
+        return jsonify({'error': f'文件大小不能超过{max_size // (1024 * 1024)}MB'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'文件上传失败: {str(e)}'}), 500
+
+@notes_bp.route('/upload/sessions', methods=['POST'])
+@jwt_required()
+def create_upload_session():
+    """创建分片上传会话，用于大文件和可断点续传的上传"""
+    current_user_id = AuthService.current_user_id()
+    data = request.get_json() or {}
+
+    filename = data.get('filename') or ''
+    if not filename:
+        return jsonify({'error': '没有提供文件名'}), 400
+
+    if not allowed_file(filename):
+        return jsonify({'error': '不支持的文件类型'}), 400
+
+    total_size = data.get('size')
+    max_size = current_app.config.get('CHUNKED_UPLOAD_MAX_SIZE', 1024 * 1024 * 1024)
+    if not isinstance(total_size, int) or total_size <= 0:
+        return jsonify({'error': '文件大小无效'}), 400
+    if total_size > max_size:
+        return jsonify({'error': f'文件大小不能超过{max_size // (1024 * 1024)}MB'}), 400
+
+    session = FileStorageService.create_session(current_user_id, secure_filename(filename), total_size)
+    db.session.commit()
+
+    result = session.to_dict()
+    result['chunk_size'] = current_app.config.get('UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)
+    return jsonify(result), 201
 
+@notes_bp.route('/upload/sessions/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload_session(upload_id):
+    """查询上传会话的已接收字节数（断点续传时从该位置继续）"""
+    current_user_id = AuthService.current_user_id()
+
+    session = FileStorageService.get_session(current_user_id, upload_id)
+    if not session:
+        return jsonify({'error': '上传会话不存在'}), 404
+
+    return jsonify(session.to_dict()), 200
+
+@notes_bp.route('/upload/sessions/<upload_id>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id):
+    """上传一个分片，请求体为分片原始数据，offset 参数为分片在文件中的起始位置"""
+    current_user_id = AuthService.current_user_id()
+
+    session = FileStorageService.get_session(current_user_id, upload_id)
+    if not session:
+        return jsonify({'error': '上传会话不存在'}), 404
+
+    offset = request.args.get('offset', session.received_size, type=int)
+
+    try:
+        FileStorageService.append_chunk(session, offset, request.stream)
+        db.session.commit()
+    except UploadOffsetError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'received_size': e.received_size}), 409
+    except FileTooLargeError:
+        db.session.rollback()
+        return jsonify({'error': '上传的数据超过了声明的文件大小'}), 400
+
+    return jsonify(session.to_dict()), 200
+
+@notes_bp.route('/upload/sessions/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload_session(upload_id):
+    """完成分片上传，返回与普通上传相同的文件信息"""
+    current_user_id = AuthService.current_user_id()
+
+    session = FileStorageService.get_session(current_user_id, upload_id)
+    if not session:
+        return jsonify({'error': '上传会话不存在'}), 404
+
+    if session.received_size != session.total_size:
+        return jsonify({
+            'error': '文件尚未上传完整',
+            'received_size': session.received_size,
+            'total_size': session.total_size
+        }), 409
+
+    try:
+        user_file = FileStorageService.complete_session(session, get_file_type(session.original_name))
+        db.session.commit()
+        submit_image_derivatives(user_file)
+        return jsonify(user_file.to_dict()), 201
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'文件上传失败: {str(e)}'}), 500
 
+@notes_bp.route('/upload/sessions/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_upload_session(upload_id):
+    """取消分片上传"""
+    current_user_id = AuthService.current_user_id()
+
+    session = FileStorageService.get_session(current_user_id, upload_id)
+    if not session:
+        return jsonify({'error': '上传会话不存在'}), 404
+
+    FileStorageService.abort_session(session)
+    db.session.commit()
+
+    return jsonify({'message': '上传已取消'}), 200
+
 @notes_bp.route('/files/<int:user_id>/<filename>')
 @jwt_required()
 def get_file(user_id, filename):
     """获取上传的文件"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 只允许用户访问自己的文件
     if current_user_id != user_id:
         return jsonify({'error': '无权访问此文件'}), 403
 
-    try:
-        upload_dir = os.path.join(current_app.root_path, '..', 'uploads', str(user_id))
-        return send_from_directory(upload_dir, filename)
-    except FileNotFoundError:
+    # 图片可通过 size 参数获取缩略图
+    size = request.args.get('size')
+    if size and size not in ImageDerivativeService.sizes():
+        return jsonify({'error': f"不支持的尺寸，可选: {', '.join(ImageDerivativeService.sizes())}"}), 400
+
+    user_file = FileStorageService.get_user_file(user_id, filename)
+    if user_file:
+        if user_file.file_type != 'images' or not ImageDerivativeService.supports(filename):
+            size = None
+
+        # 内容哈希即强 ETag，客户端缓存命中时无需访问文件系统
+        etag = f'{user_file.blob_sha256}-{size}' if size else user_file.blob_sha256
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            set_file_cache_headers(response)
+            return response
+
+        blob_path = FileStorageService.blob_path(user_file.blob_sha256)
+        if not os.path.exists(blob_path):
+            return jsonify({'error': '文件不存在'}), 404
+
+        if size:
+            derivative_path = ImageDerivativeService.get(blob_path, filename, size)
+            if derivative_path:
+                return send_stored_file(derivative_path, f"{filename.rsplit('.', 1)[0]}.webp",
+                                        etag=etag, last_modified=user_file.created_at)
+
+        # 无法生成缩略图时回退到原图
+        return send_stored_file(blob_path, filename, etag=user_file.blob_sha256,
+                                last_modified=user_file.created_at)
+
+    # 兼容去重存储之前按用户目录保存的文件（ETag 由文件修改时间和大小生成）
+    legacy_path = safe_join(FileStorageService.storage_root(), str(user_id), filename)
+    if legacy_path is None or not os.path.isfile(legacy_path):
         return jsonify({'error': '文件不存在'}), 404
+    return send_stored_file(legacy_path, filename)
+
+@notes_bp.route('/files/<int:user_id>/<filename>', methods=['DELETE'])
+@jwt_required()
+def delete_file(user_id, filename):
+    """删除上传的文件（内容数据块在不再被引用后由清理任务删除）"""
+    current_user_id = AuthService.current_user_id()
+
+    if current_user_id != user_id:
+        return jsonify({'error': '无权访问此文件'}), 403
+
+    user_file = FileStorageService.get_user_file(user_id, filename)
+    if user_file:
+        FileStorageService.delete_user_file(user_file)
+        db.session.commit()
+        return jsonify({'message': '文件已删除'}), 200
+
+    legacy_path = FileStorageService.legacy_path(user_id, secure_filename(filename))
+    if os.path.isfile(legacy_path):
+        os.remove(legacy_path)
+        return jsonify({'message': '文件已删除'}), 200
+
+    return jsonify({'error': '文件不存在'}), 404
 
 # ==================== 版本历史相关API ====================
 
@@ -648,13 +945,14 @@ def get_file(user_id, filename):
 @jwt_required()
 def get_note_versions(note_id):
     """获取笔记的版本历史列表"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 验证笔记所有权（允许访问已删除笔记的版本历史）
     note = Note.query.filter_by(id=note_id, user_id=current_user_id).first_or_404()
 
-    # 获取版本列表
+    # 获取版本列表，差异存储的版本一次性批量还原
     versions = note.versions.all()
+    NoteVersion.resolve_contents(versions)
 
     result = [version.to_dict() for version in versions]
 
@@ -665,11 +963,19 @@ def get_note_versions(note_id):
         'total_versions': len(result)
     }), 200
 
+@notes_bp.route('/versions/storage', methods=['GET'])
+@jwt_required()
+def get_version_storage_stats():
+    """获取当前用户版本历史的存储占用统计"""
+    current_user_id = AuthService.current_user_id()
+
+    return jsonify(NoteVersion.storage_stats(current_user_id)), 200
+
 @notes_bp.route('/<int:note_id>/versions/<int:version_number>', methods=['GET'])
 @jwt_required()
 def get_note_version(note_id, version_number):
     """获取笔记的特定版本"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 验证笔记所有权（允许访问已删除笔记的版本）
     note = Note.query.filter_by(id=note_id, user_id=current_user_id).first_or_404()
@@ -685,30 +991,25 @@ def get_note_version(note_id, version_number):
 @jwt_required()
 def restore_note_version(note_id, version_number):
     """恢复笔记到指定版本"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 验证笔记所有权（只允许恢复未删除的笔记版本）
     note = Note.query.filter_by(id=note_id, user_id=current_user_id, is_deleted=False).first_or_404()
 
     # 恢复到指定版本
+    stats_before = StatsService.capture(note)
     success = note.restore_from_version(version_number)
     if not success:
         return jsonify({'error': '版本不存在或恢复失败'}), 400
 
     try:
+        db.session.flush()
+        StatsService.record_change(current_user_id, stats_before, StatsService.capture(note))
         db.session.commit()
 
         # 返回恢复后的笔记信息
-        result = {
-            'id': note.id,
-            'title': note.title,
-            'content': note.content,
-            'created_at': note.created_at.isoformat(),
-            'updated_at': note.updated_at.isoformat(),
-            'tags': [tag.name for tag in note.tags],
-            'categories': [category.name for category in note.categories],
-            'restored_from_version': version_number
-        }
+        result = serialize_notes([note])[0]
+        result['restored_from_version'] = version_number
 
         return jsonify({
             'message': f'成功恢复到版本 {version_number}',
@@ -723,7 +1024,7 @@ def restore_note_version(note_id, version_number):
 @jwt_required()
 def create_note_version(note_id):
     """手动创建笔记版本快照"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
     data = request.get_json()
 
     # 验证笔记所有权（只允许为未删除的笔记创建版本）
@@ -748,11 +1049,19 @@ def create_note_version(note_id):
 
 # ==================== 回收站相关API ====================
 
+def serialize_trash_notes(notes):
+    """格式化回收站笔记（内容截断为摘要并附带删除时间）"""
+    result = serialize_notes(notes)
+    for note, item in zip(notes, result):
+        item['content'] = note.content[:200] + '...' if len(note.content) > 200 else note.content
+        item['deleted_at'] = note.deleted_at.isoformat() if note.deleted_at else None
+    return result
+
 @notes_bp.route('/trash', methods=['GET'])
 @jwt_required()
 def get_trash_notes():
     """获取回收站中的笔记列表"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 获取查询参数
     page = request.args.get('page', 1, type=int)
@@ -761,6 +1070,28 @@ def get_trash_notes():
     # 查询已删除的笔记
     query = Note.get_deleted_notes(current_user_id)
 
+    # 游标分页模式（传入 cursor 参数即启用，首页传空值）
+    if 'cursor' in request.args:
+        per_page = cursor_page_size()
+        try:
+            notes, next_cursor = paginate_by_cursor(
+                query, Note.deleted_at, request.args.get('cursor', ''), per_page
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        result = serialize_trash_notes(notes)
+        response = {
+            'notes': result,
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }
+        if request.args.get('with_total', 'false').lower() == 'true':
+            response['total'] = query.count()
+
+        return jsonify(response), 200
+
     # 按删除时间倒序排列
     query = query.order_by(Note.deleted_at.desc())
 
@@ -774,18 +1105,7 @@ def get_trash_notes():
     notes = pagination.items
 
     # 格式化返回数据
-    result = []
-    for note in notes:
-        result.append({
-            'id': note.id,
-            'title': note.title,
-            'content': note.content[:200] + '...' if len(note.content) > 200 else note.content,
-            'created_at': note.created_at.isoformat(),
-            'updated_at': note.updated_at.isoformat(),
-            'deleted_at': note.deleted_at.isoformat() if note.deleted_at else None,
-            'tags': [tag.name for tag in note.tags],
-            'categories': [category.name for category in note.categories]
-        })
+    result = serialize_trash_notes(notes)
 
     return jsonify({
         'notes': result,
@@ -801,13 +1121,15 @@ def get_trash_notes():
 @jwt_required()
 def restore_note(id):
     """从回收站恢复笔记"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 查询已删除的笔记
     note = Note.query.filter_by(id=id, user_id=current_user_id, is_deleted=True).first_or_404()
 
     # 恢复笔记
+    stats_before = StatsService.capture(note)
     note.restore()
+    StatsService.record_change(current_user_id, stats_before, stats_before._replace(active=True))
     db.session.commit()
 
     return jsonify({
@@ -824,17 +1146,13 @@ def restore_note(id):
 @jwt_required()
 def permanently_delete_note(id):
     """永久删除笔记"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     # 查询已删除的笔记
     note = Note.query.filter_by(id=id, user_id=current_user_id, is_deleted=True).first_or_404()
 
-    # 先删除相关的版本记录
-    from app.models.note import NoteVersion
-    NoteVersion.query.filter_by(note_id=note.id).delete()
-
-    # 永久删除笔记
-    db.session.delete(note)
+    # 集合式删除版本、关联和笔记本身
+    BulkNoteService.purge_ids([note.id])
     db.session.commit()
 
     return jsonify({
@@ -846,151 +1164,263 @@ def permanently_delete_note(id):
 @jwt_required()
 def empty_trash():
     """清空回收站"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
-    # 查询所有已删除的笔记
-    deleted_notes = Note.get_deleted_notes(current_user_id).all()
+    # 回收站较大时可在后台分批删除
+    if request.args.get('background', 'false').lower() == 'true':
+        pending = Note.get_deleted_notes(current_user_id).count()
+        BulkNoteService.purge_trash_in_background(current_user_id)
+        return jsonify({
+            'success': True,
+            'message': f'正在后台清空回收站，共 {pending} 篇笔记',
+            'pending': pending
+        }), 202
 
-    # 先删除所有相关的版本记录
-    from app.models.note import NoteVersion
-    for note in deleted_notes:
-        NoteVersion.query.filter_by(note_id=note.id).delete()
+    # 分批集合式删除所有回收站笔记
+    deleted_count = BulkNoteService.purge_trash(current_user_id)
 
-    # 永久删除所有笔记
-    for note in deleted_notes:
-        db.session.delete(note)
+    return jsonify({
+        'success': True,
+        'message': f'已清空回收站，永久删除了 {deleted_count} 篇笔记'
+    }), 200
 
-    db.session.commit()
+# ==================== 批量操作API ====================
+
+def parse_bulk_request(require_names=None):
+    """解析批量请求中的笔记ID列表（以及标签/分类名称列表）
+
+    返回 (ids, names, 错误响应)
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, None, (jsonify({'error': '请提供笔记ID列表'}), 400)
+
+    try:
+        ids = list(dict.fromkeys(int(note_id) for note_id in ids))
+    except (TypeError, ValueError):
+        return None, None, (jsonify({'error': '笔记ID格式错误'}), 400)
+
+    max_notes = current_app.config.get('BULK_MAX_NOTES', 10000)
+    if len(ids) > max_notes:
+        return None, None, (jsonify({'error': f'单次最多操作 {max_notes} 篇笔记'}), 400)
+
+    names = None
+    if require_names:
+        names = data.get(require_names)
+        if not isinstance(names, list):
+            return None, None, (jsonify({'error': f'请提供 {require_names} 列表'}), 400)
+        names = list(dict.fromkeys(str(name).strip() for name in names if str(name).strip()))
+
+    return ids, names, None
+
+def run_bulk_operation(operation, *args):
+    """在单个事务中执行批量操作并返回每个ID的结果"""
+    try:
+        results = operation(*args)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'批量操作失败: {str(e)}'}), 500
 
     return jsonify({
         'success': True,
-        'message': f'已清空回收站，永久删除了 {len(deleted_notes)} 篇笔记'
+        'results': {str(note_id): result for note_id, result in results.items()},
+        'success_count': sum(1 for result in results.values() if result == 'ok')
+    }), 200
+
+@notes_bp.route('/bulk/delete', methods=['POST'])
+@jwt_required()
+def bulk_delete_notes():
+    """批量将笔记移到回收站"""
+    current_user_id = AuthService.current_user_id()
+    ids, _, error = parse_bulk_request()
+    if error:
+        return error
+    return run_bulk_operation(BulkNoteService.soft_delete, current_user_id, ids)
+
+@notes_bp.route('/bulk/restore', methods=['POST'])
+@jwt_required()
+def bulk_restore_notes():
+    """批量从回收站恢复笔记"""
+    current_user_id = AuthService.current_user_id()
+    ids, _, error = parse_bulk_request()
+    if error:
+        return error
+    return run_bulk_operation(BulkNoteService.restore, current_user_id, ids)
+
+@notes_bp.route('/bulk/permanent-delete', methods=['POST'])
+@jwt_required()
+def bulk_permanently_delete_notes():
+    """批量永久删除回收站中的笔记"""
+    current_user_id = AuthService.current_user_id()
+    ids, _, error = parse_bulk_request()
+    if error:
+        return error
+    return run_bulk_operation(BulkNoteService.purge, current_user_id, ids)
+
+@notes_bp.route('/bulk/tags/add', methods=['POST'])
+@jwt_required()
+def bulk_add_tags():
+    """批量为笔记添加标签"""
+    current_user_id = AuthService.current_user_id()
+    ids, tag_names, error = parse_bulk_request('tags')
+    if error:
+        return error
+    return run_bulk_operation(BulkNoteService.add_tags, current_user_id, ids, tag_names)
+
+@notes_bp.route('/bulk/tags/remove', methods=['POST'])
+@jwt_required()
+def bulk_remove_tags():
+    """批量移除笔记的标签"""
+    current_user_id = AuthService.current_user_id()
+    ids, tag_names, error = parse_bulk_request('tags')
+    if error:
+        return error
+    return run_bulk_operation(BulkNoteService.remove_tags, current_user_id, ids, tag_names)
+
+@notes_bp.route('/bulk/categories', methods=['POST'])
+@jwt_required()
+def bulk_set_categories():
+    """批量设置笔记的分类"""
+    current_user_id = AuthService.current_user_id()
+    ids, category_names, error = parse_bulk_request('categories')
+    if error:
+        return error
+    return run_bulk_operation(BulkNoteService.set_categories, current_user_id, ids, category_names)
+
+# ==================== 批量导入API ====================
+
+@notes_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_notes():
+    """批量导入笔记：上传 JSON Lines、Markdown 压缩包或 Evernote ENEX 文件
+
+    超过单次上传大小的文件可先通过分片上传会话上传，再以 {"filename": 上传后的文件名, "format": ...} 导入。
+    每批笔记提交后通过服务器推送事件 import_progress 通知进度。
+    """
+    current_user_id = AuthService.current_user_id()
+
+    if 'file' in request.files:
+        upload = request.files['file']
+        source_name = upload.filename or ''
+        requested_format = request.form.get('format')
+        stream = upload.stream
+    else:
+        data = request.get_json(silent=True) or {}
+        source_name = data.get('filename') or ''
+        requested_format = data.get('format')
+        path = FileStorageService.resolve_path(current_user_id, source_name) if source_name else None
+        if path is None:
+            return jsonify({'error': '文件不存在'}), 404
+        stream = open(path, 'rb')
+
+    import_format = ImportService.detect_format(source_name, requested_format)
+    if import_format is None:
+        stream.close()
+        return jsonify({'error': '无法识别导入格式，可选: jsonl、markdown、enex'}), 400
+
+    progress = {'imported': 0}
+
+    def report(imported):
+        progress['imported'] = imported
+        EventStream.publish(current_user_id, EVENT_IMPORT_PROGRESS, {'imported': imported})
+
+    try:
+        records = ImportService.parse(import_format, stream, current_user_id)
+        imported = ImportService.import_notes(current_user_id, records, progress=report)
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'imported': progress['imported']}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'导入失败: {str(e)}', 'imported': progress['imported']}), 500
+    finally:
+        stream.close()
+
+    return jsonify({'message': '导入完成', 'format': import_format, 'imported': imported}), 201
+
+# ==================== 增量同步API ====================
+
+@notes_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def sync_notes():
+    """增量同步：返回 since 令牌之后变更的笔记、标签、分类和删除墓碑
+
+    不传 since 或令牌之后的变更日志已被清理时返回全量数据并标记 reset；
+    has_more 为 true 时客户端应使用返回的 since 继续请求。
+    """
+    current_user_id = AuthService.current_user_id()
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', current_app.config.get('SYNC_BATCH_SIZE', 1000), type=int)
+    limit = min(max(limit, 1), current_app.config.get('SYNC_BATCH_SIZE', 1000))
+
+    if since <= 0 or SyncService.token_expired(since):
+        # 先取令牌再读取数据，读取期间的变更会在下次同步中重复返回而不会遗漏
+        token = SyncService.current_token()
+        notes = Note.get_active_notes(current_user_id).order_by(Note.id).all()
+        categories, _ = SyncService.load_categories(current_user_id)
+        return jsonify({
+            'reset': True,
+            'since': token,
+            'has_more': False,
+            'notes': serialize_notes(notes),
+            'deleted_notes': [],
+            'tags': SyncService.load_tags(current_user_id),
+            'categories': categories,
+            'deleted_categories': []
+        }), 200
+
+    changed, token, has_more = SyncService.get_changes(current_user_id, since, limit)
+    notes, tombstones = SyncService.load_notes(current_user_id, changed[ENTITY_NOTE])
+    categories, deleted_categories = SyncService.load_categories(current_user_id, changed[ENTITY_CATEGORY])
+
+    return jsonify({
+        'reset': False,
+        'since': token,
+        'has_more': has_more,
+        'notes': serialize_notes(notes),
+        'deleted_notes': tombstones,
+        'tags': SyncService.load_tags(current_user_id, changed[ENTITY_TAG]) if changed[ENTITY_TAG] else [],
+        'categories': categories,
+        'deleted_categories': deleted_categories
     }), 200
 
+@notes_bp.route('/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def event_stream():
+    """服务器推送事件（SSE）：提醒到期（reminder）和笔记数据变更（notes_changed，收到后调用增量同步）
+
+    浏览器的 EventSource 无法设置请求头，可通过 ?jwt=<token> 传递令牌。
+    """
+    config = current_app.config
+    # 提醒到期时需推送给在线客户端，在第一个连接到来时启动本进程的提醒调度器
+    if config.get('REMINDER_SCHEDULER_ENABLED'):
+        ReminderService.start_scheduler(current_app._get_current_object())
+    stream = EventStream.stream(AuthService.current_user_id(),
+                                config.get('EVENT_STREAM_HEARTBEAT_SECONDS', 15),
+                                config.get('EVENT_STREAM_MAX_DURATION', 300))
+    response = current_app.response_class(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 的响应缓冲，事件立即送达客户端
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 # ==================== 数据统计相关API ====================
 
 @notes_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@cached_response()
 def get_notes_stats():
     """获取笔记统计数据"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = AuthService.current_user_id()
 
     try:
         # 获取查询参数
         days = request.args.get('days', 30, type=int)  # 默认30天
 
-        # 计算日期范围
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days-1)
-
-        # 基础统计
-        total_notes = Note.query.filter_by(user_id=current_user_id, is_deleted=False).count()
-        total_categories = Category.query.filter_by(user_id=current_user_id).count()
-        total_tags = db.session.query(Tag).join(Note.tags).filter(Note.user_id == current_user_id).distinct().count()
-
-        # 最近创建的笔记数量
-        recent_notes = Note.query.filter(
-            and_(
-                Note.user_id == current_user_id,
-                Note.is_deleted == False,
-                func.date(Note.created_at) >= start_date,
-                func.date(Note.created_at) <= end_date
-            )
-        ).count()
-
-        # 最近更新的笔记数量
-        recent_updates = Note.query.filter(
-            and_(
-                Note.user_id == current_user_id,
-                Note.is_deleted == False,
-                func.date(Note.updated_at) >= start_date,
-                func.date(Note.updated_at) <= end_date,
-                Note.updated_at != Note.created_at  # 排除创建时的更新
-            )
-        ).count()
-
-        # 按日期统计每天的笔记创建数量
-        daily_creation_stats = db.session.query(
-            func.date(Note.created_at).label('date'),
-            func.count(Note.id).label('count')
-        ).filter(
-            and_(
-                Note.user_id == current_user_id,
-                Note.is_deleted == False,
-                func.date(Note.created_at) >= start_date,
-                func.date(Note.created_at) <= end_date
-            )
-        ).group_by(func.date(Note.created_at)).all()
-
-        # 转换为字典格式
-        daily_creation = {}
-        for stat in daily_creation_stats:
-            date_str = stat.date.isoformat() if hasattr(stat.date, 'isoformat') else str(stat.date)
-            daily_creation[date_str] = stat.count
-
-        # 按分类统计笔记数量
-        category_stats = db.session.query(
-            Category.name.label('category'),
-            func.count(Note.id).label('count')
-        ).join(Note.categories).filter(
-            and_(
-                Note.user_id == current_user_id,
-                Note.is_deleted == False
-            )
-        ).group_by(Category.name).order_by(desc('count')).limit(10).all()
-
-        category_distribution = [
-            {'name': stat.category, 'count': stat.count}
-            for stat in category_stats
-        ]
-
-        # 按标签统计笔记数量
-        tag_stats = db.session.query(
-            Tag.name.label('tag'),
-            func.count(Note.id).label('count')
-        ).join(Note.tags).filter(
-            and_(
-                Note.user_id == current_user_id,
-                Note.is_deleted == False
-            )
-        ).group_by(Tag.name).order_by(desc('count')).limit(10).all()
-
-        tag_distribution = [
-            {'name': stat.tag, 'count': stat.count}
-            for stat in tag_stats
-        ]
-
-        # 字数统计
-        notes_with_content = Note.query.filter(
-            and_(
-                Note.user_id == current_user_id,
-                Note.is_deleted == False,
-                Note.content.isnot(None)
-            )
-        ).all()
-
-        total_words = sum(len(note.content.split()) for note in notes_with_content if note.content)
-        avg_words_per_note = total_words / len(notes_with_content) if notes_with_content else 0
-
-        return jsonify({
-            'period': {
-                'days': days,
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat()
-            },
-            'overview': {
-                'total_notes': total_notes,
-                'total_categories': total_categories,
-                'total_tags': total_tags,
-                'recent_notes': recent_notes,
-                'recent_updates': recent_updates,
-                'total_words': total_words,
-                'avg_words_per_note': round(avg_words_per_note, 1)
-            },
-            'daily_creation': daily_creation,
-            'category_distribution': category_distribution,
-            'tag_distribution': tag_distribution
-        }), 200
+        # 统计数据来自增量维护的汇总表
+        return jsonify(StatsService.get_stats(current_user_id, days)), 200
 
     except Exception as e:
         return jsonify({'error': f'获取统计数据失败: {str(e)}'}), 500
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+当前用户上下文
+
+每个请求只转换一次 JWT 身份并保存在 flask.g 中；用户资料快照按用户ID缓存在进程内 LRU 缓存中，
+只需要用户基本信息的接口不必每次查询 users 表。修改用户资料后调用 invalidate_user，
+其他进程的修改最多在 USER_CACHE_TTL 秒内读到旧值。
+登录时的密码校验在有界线程池中执行，同时计算哈希的请求数受 PASSWORD_HASH_WORKERS 限制，
+排队过多时直接拒绝，避免登录高峰占满 CPU 影响其他请求。
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from flask import current_app, g
+from flask_jwt_extended import get_jwt_identity
+from werkzeug.security import check_password_hash
+from app import db
+from app.models.user import User
+from app.services.cache import LRUCache
+
+# 用户ID到资料快照（不含密码哈希）的缓存
+_cache = LRUCache(max_size=10000)
+
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+class LoginBusyError(Exception):
+    """等待校验密码的登录请求过多"""
+
+
+def _get_pool(max_workers, max_pending):
+    """密码校验线程池和排队名额（执行中加排队中的任务数上限）"""
+    global _executor, _slots
+    with _pool_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(max_workers + max_pending)
+        return _executor, _slots
+
+
+class AuthService:
+    """当前用户上下文服务类"""
+
+    @staticmethod
+    def current_user_id():
+        """当前请求的用户ID（需在 jwt_required 之后调用）"""
+        if 'current_user_id' not in g:
+            g.current_user_id = int(get_jwt_identity())
+        return g.current_user_id
+
+    @staticmethod
+    def get_user(user_id):
+        """获取用户资料快照（字典），用户不存在时返回 None"""
+        ttl = current_app.config.get('USER_CACHE_TTL', 30)
+        snapshot = _cache.get(user_id) if ttl else None
+        if snapshot is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            snapshot = user.to_dict()
+            if ttl:
+                _cache.set(user_id, snapshot, ttl=ttl)
+        return dict(snapshot)
+
+    @staticmethod
+    def current_user():
+        """当前请求的用户资料快照，同一请求内只读取一次"""
+        if 'current_user' not in g:
+            g.current_user = AuthService.get_user(AuthService.current_user_id())
+        return g.current_user
+
+    @staticmethod
+    def invalidate_user(user_id):
+        """用户资料修改后清除缓存"""
+        _cache.delete(user_id)
+        g.pop('current_user', None)
+
+    @staticmethod
+    def verify_password(user, password):
+        """在密码校验线程池中验证密码，排队超过 PASSWORD_HASH_QUEUE_TIMEOUT 秒时抛出 LoginBusyError"""
+        config = current_app.config
+        executor, slots = _get_pool(config.get('PASSWORD_HASH_WORKERS', 2),
+                                    config.get('PASSWORD_HASH_MAX_PENDING', 32))
+        if not slots.acquire(timeout=config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5)):
+            raise LoginBusyError()
+        try:
+            return executor.submit(check_password_hash, user.password_hash, password).result()
+        finally:
+            slots.release()
+
+    @staticmethod
+    def cache_stats():
+        """获取缓存命中统计"""
+        return _cache.stats()
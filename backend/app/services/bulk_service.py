@@ -0,0 +1,289 @@
+"""
+笔记批量操作服务
+
+批量软删除、恢复、永久删除、增删标签和设置分类，全部以集合式 SQL 在调用方的同一事务中执行，
+并同步全文索引和统计数据。批量方法返回 {note_id: 结果} 映射，由调用方负责提交事务；
+回收站清理（purge_trash）为限制写锁时间按批自行提交。
+"""
+from datetime import datetime, timedelta
+import logging
+import threading
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from app import db
+from app.models.note import Note, NoteVersion, note_tags, note_categories
+from app.models.user import User
+from app.services.event_stream import EventStream, EVENT_NOTES_CHANGED
+from app.services.search_service import SearchService
+from app.services.stats_service import StatsService
+from app.services.sync_service import SyncService, ENTITY_CATEGORY, ENTITY_NOTE, ENTITY_TAG
+from app.services.taxonomy_service import TaxonomyService
+
+logger = logging.getLogger(__name__)
+
+# 单条 IN 查询的最大参数数量（SQLite 默认上限为 999）
+CHUNK_SIZE = 500
+
+RESULT_OK = 'ok'
+RESULT_NOT_FOUND = 'not_found'
+
+
+def chunked(items, size=CHUNK_SIZE):
+    """按固定大小切分列表"""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BulkNoteService:
+    """笔记批量操作服务类"""
+
+    @staticmethod
+    def _load_notes(user_id, note_ids, is_deleted):
+        """加载用户指定状态的笔记"""
+        notes = []
+        for chunk in chunked(note_ids):
+            notes.extend(Note.query.filter(
+                Note.id.in_(chunk),
+                Note.user_id == user_id,
+                Note.is_deleted == is_deleted
+            ).all())
+        return notes
+
+    @staticmethod
+    def _results(note_ids, found_ids):
+        """生成每个请求ID的处理结果"""
+        return {note_id: RESULT_OK if note_id in found_ids else RESULT_NOT_FOUND for note_id in note_ids}
+
+    @staticmethod
+    def soft_delete(user_id, note_ids):
+        """批量移入回收站"""
+        notes = BulkNoteService._load_notes(user_id, note_ids, is_deleted=False)
+        found_ids = [note.id for note in notes]
+        if not found_ids:
+            return BulkNoteService._results(note_ids, set())
+
+        states = StatsService.capture_many(notes)
+        now = datetime.utcnow()
+        for chunk in chunked(found_ids):
+            db.session.execute(
+                update(Note).where(Note.id.in_(chunk)).values(is_deleted=True, deleted_at=now, updated_at=now),
+                execution_options={'synchronize_session': False}
+            )
+
+        SearchService.sync_notes(db.session.connection(), [], found_ids)
+        SyncService.record(user_id, ENTITY_NOTE, found_ids)
+        StatsService.record_changes(user_id, [
+            (state, state._replace(active=False)) for state in states.values()
+        ])
+        db.session.expire_all()
+
+        return BulkNoteService._results(note_ids, set(found_ids))
+
+    @staticmethod
+    def restore(user_id, note_ids):
+        """批量从回收站恢复"""
+        notes = BulkNoteService._load_notes(user_id, note_ids, is_deleted=True)
+        found_ids = [note.id for note in notes]
+        if not found_ids:
+            return BulkNoteService._results(note_ids, set())
+
+        states = StatsService.capture_many(notes)
+        now = datetime.utcnow()
+        for chunk in chunked(found_ids):
+            db.session.execute(
+                update(Note).where(Note.id.in_(chunk)).values(is_deleted=False, deleted_at=None, updated_at=now),
+                execution_options={'synchronize_session': False}
+            )
+
+        SearchService.sync_notes(db.session.connection(), notes, [])
+        SyncService.record(user_id, ENTITY_NOTE, found_ids)
+        StatsService.record_changes(user_id, [
+            (state, state._replace(active=True)) for state in states.values()
+        ])
+        db.session.expire_all()
+
+        return BulkNoteService._results(note_ids, set(found_ids))
+
+    @staticmethod
+    def purge(user_id, note_ids):
+        """批量永久删除回收站中的笔记及其版本和关联"""
+        found_ids = []
+        for chunk in chunked(note_ids):
+            found_ids.extend(db.session.scalars(select(Note.id).where(
+                Note.id.in_(chunk),
+                Note.user_id == user_id,
+                Note.is_deleted == True
+            )))
+
+        BulkNoteService.purge_ids(found_ids)
+
+        return BulkNoteService._results(note_ids, set(found_ids))
+
+    @staticmethod
+    def purge_ids(note_ids):
+        """按ID集合式删除笔记、版本和关联记录（调用方需已确认归属和回收站状态）"""
+        for chunk in chunked(note_ids):
+            # 删除前记录同步墓碑及受影响的标签和分类
+            SyncService.record_notes(chunk)
+            SyncService.record_note_associations(chunk)
+            db.session.execute(delete(NoteVersion).where(NoteVersion.note_id.in_(chunk)),
+                               execution_options={'synchronize_session': False})
+            db.session.execute(delete(note_tags).where(note_tags.c.note_id.in_(chunk)))
+            db.session.execute(delete(note_categories).where(note_categories.c.note_id.in_(chunk)))
+            db.session.execute(delete(Note).where(Note.id.in_(chunk)),
+                               execution_options={'synchronize_session': False})
+
+        if note_ids:
+            SearchService.sync_notes(db.session.connection(), [], note_ids)
+            db.session.expire_all()
+
+        return len(note_ids)
+
+    @staticmethod
+    def purge_trash(user_id=None, older_than_days=None, chunk_size=CHUNK_SIZE):
+        """分批永久删除回收站笔记，每批单独提交以缩短写锁时间
+
+        user_id 为空时处理所有用户；older_than_days 指定时只删除删除时间早于该天数的笔记。
+        返回删除的笔记数
+        """
+        conditions = [Note.is_deleted == True]
+        if user_id is not None:
+            conditions.append(Note.user_id == user_id)
+        if older_than_days is not None:
+            conditions.append(Note.deleted_at < datetime.utcnow() - timedelta(days=older_than_days))
+
+        total = 0
+        while True:
+            note_ids = db.session.scalars(select(Note.id).where(*conditions).limit(chunk_size)).all()
+            if not note_ids:
+                break
+            total += BulkNoteService.purge_ids(note_ids)
+            db.session.commit()
+
+        return total
+
+    @staticmethod
+    def purge_expired_trash(user_id=None):
+        """清理超过保留期的回收站笔记（TRASH_RETENTION_DAYS 为 0 时不清理），由 purge-trash 命令定时调用
+
+        清理后递增受影响用户的数据版本号，使其缓存的响应失效，并通知在线客户端
+        """
+        retention_days = current_app.config.get('TRASH_RETENTION_DAYS', 0)
+        if not retention_days:
+            return 0
+
+        conditions = [Note.is_deleted == True,
+                      Note.deleted_at < datetime.utcnow() - timedelta(days=retention_days)]
+        if user_id is not None:
+            conditions.append(Note.user_id == user_id)
+        user_ids = db.session.scalars(select(Note.user_id).where(*conditions).distinct()).all()
+        if not user_ids:
+            return 0
+
+        purged = BulkNoteService.purge_trash(user_id, older_than_days=retention_days)
+        for affected_user_id in user_ids:
+            User.touch_notes(affected_user_id)
+        db.session.commit()
+        for affected_user_id in user_ids:
+            EventStream.publish(affected_user_id, EVENT_NOTES_CHANGED)
+
+        logger.info(f"已自动清理 {purged} 篇超过 {retention_days} 天的回收站笔记")
+        return purged
+
+    @staticmethod
+    def purge_trash_in_background(user_id):
+        """在后台线程中清空用户回收站"""
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    purged = BulkNoteService.purge_trash(user_id)
+                    User.touch_notes(user_id)
+                    db.session.commit()
+                    EventStream.publish(user_id, EVENT_NOTES_CHANGED)
+                    logger.info(f"用户 {user_id} 的回收站已在后台清空，删除 {purged} 篇笔记")
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"后台清空用户 {user_id} 的回收站失败: {str(e)}")
+                finally:
+                    db.session.remove()
+
+        thread = threading.Thread(target=run, name=f'purge-trash-{user_id}', daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _change_associations(user_id, note_ids, table, column_name, add_ids=(), remove_ids=(), replace=False):
+        """集合式修改笔记与标签/分类的关联并同步统计（回收站中的笔记视为不存在）"""
+        notes = BulkNoteService._load_notes(user_id, note_ids, is_deleted=False)
+        found_ids = [note.id for note in notes]
+        if not found_ids:
+            return BulkNoteService._results(note_ids, set())
+
+        states = StatsService.capture_many(notes)
+        state_field = 'tag_ids' if table is note_tags else 'category_ids'
+        column = table.c[column_name]
+        add_ids = set(add_ids)
+        remove_ids = set(remove_ids)
+
+        changes = []
+        rows_to_insert = []
+        changed_ids = []
+        changed_targets = set()
+        for note_id in found_ids:
+            before = states[note_id]
+            current = getattr(before, state_field)
+            target = add_ids if replace else (current | add_ids) - remove_ids
+            rows_to_insert.extend(
+                {'note_id': note_id, column_name: target_id} for target_id in target - current
+            )
+            changes.append((before, before._replace(**{state_field: frozenset(target)})))
+            if target != current:
+                changed_ids.append(note_id)
+                changed_targets |= target ^ current
+
+        for chunk in chunked(found_ids):
+            if replace:
+                db.session.execute(delete(table).where(table.c.note_id.in_(chunk), column.notin_(add_ids)))
+            elif remove_ids:
+                db.session.execute(delete(table).where(table.c.note_id.in_(chunk), column.in_(remove_ids)))
+
+        if rows_to_insert:
+            db.session.execute(insert(table), rows_to_insert)
+
+        # 关联变化的笔记更新修改时间，使客户端缓存失效
+        now = datetime.utcnow()
+        for chunk in chunked(changed_ids):
+            db.session.execute(
+                update(Note).where(Note.id.in_(chunk)).values(updated_at=now),
+                execution_options={'synchronize_session': False}
+            )
+
+        SyncService.record(user_id, ENTITY_NOTE, changed_ids)
+        SyncService.record(user_id, ENTITY_TAG if table is note_tags else ENTITY_CATEGORY, changed_targets)
+        StatsService.record_changes(user_id, changes)
+        db.session.expire_all()
+
+        return BulkNoteService._results(note_ids, set(found_ids))
+
+    @staticmethod
+    def add_tags(user_id, note_ids, tag_names):
+        """批量为笔记添加标签"""
+        tag_ids = TaxonomyService.resolve_tag_ids(tag_names)
+        return BulkNoteService._change_associations(user_id, note_ids, note_tags, 'tag_id', add_ids=tag_ids)
+
+    @staticmethod
+    def remove_tags(user_id, note_ids, tag_names):
+        """批量移除笔记的标签"""
+        tag_ids = TaxonomyService.resolve_tag_ids(tag_names, create=False)
+        return BulkNoteService._change_associations(user_id, note_ids, note_tags, 'tag_id', remove_ids=tag_ids)
+
+    @staticmethod
+    def set_categories(user_id, note_ids, category_names):
+        """批量将笔记的分类设置为指定列表"""
+        category_ids = TaxonomyService.resolve_category_ids(user_id, category_names)
+        return BulkNoteService._change_associations(
+            user_id, note_ids, note_categories, 'category_id', add_ids=category_ids, replace=True
+        )
@@ -0,0 +1,81 @@
+"""
+数据库连接配置
+
+按数据库类型生成连接池参数，并在 SQLite 的每个新连接上设置配置的 PRAGMA。生产配置启用 WAL 等参数，
+使多个 worker 进程并发读写时读不阻塞写；各环境都设置 busy_timeout，写在超时内排队而不是立即报 database is locked。
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+class DatabaseService:
+    """数据库引擎参数与 SQLite 连接调优"""
+
+    @staticmethod
+    def engine_options(config):
+        """根据数据库 URI 生成 SQLALCHEMY_ENGINE_OPTIONS"""
+        url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+        backend = url.get_backend_name()
+        if backend == 'sqlite':
+            if url.database in (None, '', ':memory:'):
+                # 内存数据库由 Flask-SQLAlchemy 使用单连接的 StaticPool，不支持连接池参数
+                return {}
+            # 连接只是文件句柄，开销很小；pysqlite 的 timeout 与 busy_timeout 作用相同，一并设置
+            return {
+                'pool_size': config['DATABASE_POOL_SIZE'],
+                'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+                'pool_timeout': config['DATABASE_POOL_TIMEOUT'],
+                'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000},
+            }
+        # MySQL 等服务端数据库：检测并替换被服务端断开的连接，并在 wait_timeout 之前回收
+        return {
+            'pool_size': config['DATABASE_POOL_SIZE'],
+            'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+            'pool_timeout': config['DATABASE_POOL_TIMEOUT'],
+            'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+        }
+
+    @staticmethod
+    def sqlite_pragmas(config):
+        """每个 SQLite 连接建立时执行的 PRAGMA（按执行顺序），未配置的参数保持 SQLite 默认值"""
+        cache_size_kb = config.get('SQLITE_CACHE_SIZE_KB')
+        pragmas = [
+            ('journal_mode', config.get('SQLITE_JOURNAL_MODE')),
+            ('synchronous', config.get('SQLITE_SYNCHRONOUS')),
+            ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+            # 负数表示以 KiB 为单位
+            ('cache_size', -cache_size_kb if cache_size_kb is not None else None),
+            ('mmap_size', config.get('SQLITE_MMAP_SIZE')),
+            ('temp_store', config.get('SQLITE_TEMP_STORE')),
+        ]
+        return [(name, value) for name, value in pragmas if value is not None]
+
+    @staticmethod
+    def init_engine(engine, config):
+        """为 SQLite 引擎注册连接事件，在每个新连接上执行 PRAGMA"""
+        if engine.dialect.name != 'sqlite':
+            return
+        pragmas = DatabaseService.sqlite_pragmas(config)
+
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas:
+                    cursor.execute(f'PRAGMA {name}={value}')
+            finally:
+                cursor.close()
+
+        event.listen(engine, 'connect', apply_pragmas)
+
+    @staticmethod
+    def stats(engine):
+        """连接池状态及 SQLite 当前生效的 PRAGMA，供健康检查使用"""
+        result = {'backend': engine.dialect.name, 'pool': engine.pool.status()}
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                result['pragmas'] = {
+                    name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size')
+                }
+        return result
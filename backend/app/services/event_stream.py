@@ -0,0 +1,211 @@
+"""
+服务器推送事件
+
+按用户推送提醒到期和笔记数据变更通知，客户端通过 /api/notes/events 的 SSE 连接接收，无需轮询。
+默认使用进程内发布订阅（只能推送给连接在同一进程的客户端）；多 worker 部署时配置
+EVENT_STREAM_BACKEND=redis，通过 Redis 兼容服务的发布订阅在各进程间转发。
+订阅队列已满（客户端读取过慢）时丢弃后续事件，并通知客户端重新同步。
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis 为可选依赖
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+EVENT_NOTES_CHANGED = 'notes_changed'
+EVENT_REMINDER = 'reminder'
+EVENT_RESYNC = 'resync'
+EVENT_IMPORT_PROGRESS = 'import_progress'
+
+
+class MemorySubscription:
+    """进程内订阅"""
+
+    def __init__(self, broker, user_id, max_size):
+        self._broker = broker
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=max_size)
+        self.overflowed = False
+
+    def put(self, message):
+        """放入事件队列，队列已满时丢弃并返回 False"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    def get(self, timeout):
+        """等待下一条事件，超时返回 None"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class MemoryBroker:
+    """进程内发布订阅"""
+
+    def __init__(self, queue_size):
+        self._queue_size = queue_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, message):
+        """推送给用户在本进程的所有连接，返回收到事件的连接数"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        received = 0
+        for subscription in subscriptions:
+            received += subscription.put(message)
+        return received
+
+    def subscribe(self, user_id):
+        subscription = MemorySubscription(self, user_id, self._queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class RedisSubscription:
+    """Redis 订阅"""
+
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+        self.overflowed = False
+
+    def get(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message['type'] == 'message':
+                return json.loads(message['data'])
+
+    def close(self):
+        self._pubsub.close()
+
+
+class RedisBroker:
+    """Redis 兼容服务发布订阅"""
+
+    def __init__(self, url, prefix='notes:events:'):
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def publish(self, user_id, message):
+        """发布到用户的频道，返回各进程中订阅该频道的连接数"""
+        return self._client.publish(f'{self._prefix}{user_id}', json.dumps(message))
+
+    def subscribe(self, user_id):
+        pubsub = self._client.pubsub()
+        pubsub.subscribe(f'{self._prefix}{user_id}')
+        return RedisSubscription(pubsub)
+
+    def connection_count(self):
+        return None
+
+
+class EventStream:
+    """服务器推送事件类"""
+
+    _broker = None
+    _broker_lock = threading.Lock()
+    published = 0
+    errors = 0
+
+    @staticmethod
+    def broker():
+        """按配置创建发布订阅后端（Redis 不可用时回退到进程内）"""
+        if EventStream._broker is None:
+            with EventStream._broker_lock:
+                if EventStream._broker is None:
+                    config = current_app.config
+                    broker = None
+                    if config.get('EVENT_STREAM_BACKEND') == 'redis':
+                        if redis is None:
+                            logger.warning("未安装 redis，服务器推送只在进程内转发")
+                        else:
+                            broker = RedisBroker(config.get('EVENT_STREAM_REDIS_URL'))
+                    if broker is None:
+                        broker = MemoryBroker(config.get('EVENT_STREAM_QUEUE_SIZE', 100))
+                    EventStream._broker = broker
+        return EventStream._broker
+
+    @staticmethod
+    def publish(user_id, event_type, data=None):
+        """向用户的所有连接推送事件，返回收到事件的连接数（失败时只记录日志并返回 0，不影响业务操作）"""
+        try:
+            received = EventStream.broker().publish(int(user_id), {'event': event_type, 'data': data or {}})
+            EventStream.published += 1
+            return received
+        except Exception as e:
+            EventStream.errors += 1
+            logger.warning(f"推送事件失败: {str(e)}")
+            return 0
+
+    @staticmethod
+    def format(event_type, data):
+        """编码为 SSE 消息"""
+        return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    @staticmethod
+    def stream(user_id, heartbeat_seconds, max_duration):
+        """生成用户的 SSE 消息流：连接建立时发送 ready，空闲时发送心跳注释，
+        超过 max_duration 秒后结束（客户端按 retry 间隔自动重连）"""
+        subscription = EventStream.broker().subscribe(int(user_id))
+
+        def generate():
+            try:
+                yield f"retry: 3000\n{EventStream.format('ready', {'time': time.time()})}"
+                deadline = time.monotonic() + max_duration
+                while time.monotonic() < deadline:
+                    message = subscription.get(timeout=heartbeat_seconds)
+                    if subscription.overflowed:
+                        subscription.overflowed = False
+                        yield EventStream.format(EVENT_RESYNC, {})
+                    if message is None:
+                        yield ': heartbeat\n\n'
+                    else:
+                        yield EventStream.format(message['event'], message['data'])
+            finally:
+                subscription.close()
+
+        return generate()
+
+    @staticmethod
+    def stats():
+        """获取推送统计"""
+        return {
+            'backend': type(EventStream._broker).__name__ if EventStream._broker else None,
+            'connections': EventStream._broker.connection_count() if EventStream._broker else 0,
+            'published': EventStream.published,
+            'errors': EventStream.errors
+        }
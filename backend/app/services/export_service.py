@@ -0,0 +1,235 @@
+"""
+笔记导出服务
+
+按笔记ID键集分批读取（每批只查询所需列，不创建 ORM 对象），边读取边生成导出内容，
+导出任意数量的笔记时内存占用与一批笔记相当：
+- JSON Lines：每行一篇笔记
+- Markdown 压缩包：每篇笔记一个 .md 文件，笔记引用的上传文件放在 attachments/ 下并改写为相对链接，
+  压缩包直接写入响应流（不可回溯的流使用数据描述符，无需先生成完整文件）
+- XLSX：openpyxl 只写模式逐行写入临时文件，完成后分块发送
+"""
+from datetime import datetime
+import json
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.note import Note
+from app.services.file_storage import BUFFER_SIZE, FileStorageService
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+except ImportError:  # pragma: no cover - openpyxl 为可选依赖
+    Workbook = None
+    ILLEGAL_CHARACTERS_RE = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_JSONL = 'jsonl'
+FORMAT_MARKDOWN = 'markdown'
+FORMAT_XLSX = 'xlsx'
+
+# 导出格式：格式名 -> (说明, MIME 类型, 扩展名)
+FORMATS = {
+    FORMAT_JSONL: ('JSON Lines，每行一篇笔记', 'application/x-ndjson', 'jsonl'),
+    FORMAT_MARKDOWN: ('Markdown 文件压缩包（含附件）', 'application/zip', 'zip'),
+    FORMAT_XLSX: ('Excel 工作簿', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# 笔记内容中引用的上传文件链接
+FILE_LINK_RE = re.compile(r'/api/notes/files/(\d+)/([A-Za-z0-9_.-]+)')
+# 文件名中不允许的字符
+UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+# Excel 单元格最大字符数
+XLSX_CELL_LIMIT = 32767
+
+
+class _StreamBuffer:
+    """供 zipfile 写入的只追加缓冲区，生成器每写完一段就取出已写入的数据发送"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _markdown_filename(note):
+    title = UNSAFE_FILENAME_RE.sub('_', note['title'] or '').strip(' ._')[:80]
+    return f"{note['id']}-{title}.md" if title else f"{note['id']}.md"
+
+
+def _markdown_document(note, content):
+    """笔记的 Markdown 文本，元数据写在 YAML 头部"""
+    front_matter = [
+        '---',
+        f"title: {json.dumps(note['title'], ensure_ascii=False)}",
+        f"tags: {json.dumps(note['tags'], ensure_ascii=False)}",
+        f"categories: {json.dumps(note['categories'], ensure_ascii=False)}",
+        f"created_at: {note['created_at']}",
+        f"updated_at: {note['updated_at']}",
+        '---',
+        '',
+    ]
+    return '\n'.join(front_matter) + (content or '') + '\n'
+
+
+def _xlsx_value(value):
+    """去除 Excel 不允许的控制字符并截断超长文本"""
+    if not isinstance(value, str):
+        return value
+    return ILLEGAL_CHARACTERS_RE.sub('', value)[:XLSX_CELL_LIMIT]
+
+
+class ExportService:
+    """笔记导出服务类"""
+
+    @staticmethod
+    def is_available(export_format):
+        """导出格式是否可用（XLSX 依赖 openpyxl）"""
+        if export_format == FORMAT_XLSX:
+            return Workbook is not None
+        return export_format in FORMATS
+
+    @staticmethod
+    def _base_query(user_id, note_ids=None, include_deleted=False):
+        query = select(
+            Note.id, Note.title, Note.content, Note.created_at, Note.updated_at,
+            Note.is_deleted, Note.deleted_at
+        ).where(Note.user_id == user_id)
+        if not include_deleted:
+            query = query.where(Note.is_deleted == False)
+        if note_ids is not None:
+            query = query.where(Note.id.in_(note_ids))
+        return query
+
+    @staticmethod
+    def count(user_id, note_ids=None, include_deleted=False):
+        """待导出的笔记数量"""
+        query = ExportService._base_query(user_id, note_ids, include_deleted)
+        return db.session.scalar(select(db.func.count()).select_from(query.subquery()))
+
+    @staticmethod
+    def iter_notes(user_id, note_ids=None, include_deleted=False, batch_size=None):
+        """按ID顺序分批读取笔记（含标签和分类名称），逐篇返回字典"""
+        batch_size = batch_size or current_app.config.get('EXPORT_BATCH_SIZE', 500)
+        query = ExportService._base_query(user_id, note_ids, include_deleted).order_by(Note.id)
+        last_id = 0
+        while True:
+            rows = db.session.execute(query.where(Note.id > last_id).limit(batch_size)).all()
+            if not rows:
+                return
+
+            tag_map, category_map = Note.load_tag_and_category_names([row.id for row in rows])
+            for row in rows:
+                yield {
+                    'id': row.id,
+                    'title': row.title,
+                    'content': row.content,
+                    'created_at': row.created_at.isoformat(),
+                    'updated_at': row.updated_at.isoformat(),
+                    'is_deleted': row.is_deleted,
+                    'deleted_at': row.deleted_at.isoformat() if row.deleted_at else None,
+                    'tags': tag_map[row.id],
+                    'categories': category_map[row.id]
+                }
+            last_id = rows[-1].id
+            # 只读查询的事务及时结束，避免长时间导出阻塞 SQLite 的写入检查点
+            db.session.commit()
+
+    @staticmethod
+    def generate_jsonl(user_id, **options):
+        """JSON Lines 导出内容"""
+        for note in ExportService.iter_notes(user_id, **options):
+            yield (json.dumps(note, ensure_ascii=False) + '\n').encode('utf-8')
+
+    @staticmethod
+    def generate_markdown_zip(user_id, include_attachments=True, **options):
+        """Markdown 压缩包导出内容"""
+        buffer = _StreamBuffer()
+        added_attachments = set()
+
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            used_names = set()
+            for note in ExportService.iter_notes(user_id, **options):
+                content = note['content'] or ''
+                attachments = []
+                if include_attachments:
+                    for owner_id, filename in set(FILE_LINK_RE.findall(content)):
+                        if int(owner_id) != user_id:
+                            continue
+                        content = content.replace(f'/api/notes/files/{owner_id}/{filename}', f'attachments/{filename}')
+                        if filename not in added_attachments:
+                            attachments.append(filename)
+
+                name = _markdown_filename(note)
+                if name in used_names:
+                    name = f"{note['id']}.md"
+                used_names.add(name)
+                archive.writestr(name, _markdown_document(note, content))
+                yield buffer.drain()
+
+                for filename in attachments:
+                    path = FileStorageService.resolve_path(user_id, filename)
+                    added_attachments.add(filename)
+                    if path is None:
+                        logger.warning(f"导出时附件不存在: {user_id}/{filename}")
+                        continue
+                    with open(path, 'rb') as source, archive.open(f'attachments/{filename}', 'w') as target:
+                        for block in iter(lambda: source.read(BUFFER_SIZE), b''):
+                            target.write(block)
+                            yield buffer.drain()
+
+        yield buffer.drain()
+
+    @staticmethod
+    def generate_xlsx(user_id, **options):
+        """XLSX 导出内容：只写模式逐行写入临时文件后分块发送"""
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('笔记')
+        sheet.append(['ID', '标题', '内容', '标签', '分类', '创建时间', '更新时间', '已删除'])
+        for note in ExportService.iter_notes(user_id, **options):
+            sheet.append([_xlsx_value(value) for value in (
+                note['id'], note['title'], note['content'], ', '.join(note['tags']),
+                ', '.join(note['categories']), note['created_at'], note['updated_at'], note['is_deleted']
+            )])
+
+        fd, temp_path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            workbook.save(temp_path)
+            with open(temp_path, 'rb') as f:
+                for block in iter(lambda: f.read(BUFFER_SIZE), b''):
+                    yield block
+        finally:
+            os.remove(temp_path)
+
+    @staticmethod
+    def generate(export_format, user_id, **options):
+        """按格式生成导出内容"""
+        if export_format == FORMAT_JSONL:
+            options.pop('include_attachments', None)
+            return ExportService.generate_jsonl(user_id, **options)
+        if export_format == FORMAT_MARKDOWN:
+            return ExportService.generate_markdown_zip(user_id, **options)
+        options.pop('include_attachments', None)
+        return ExportService.generate_xlsx(user_id, **options)
+
+    @staticmethod
+    def download_name(export_format):
+        """下载文件名"""
+        return f"notes-export-{datetime.now():%Y%m%d-%H%M%S}.{FORMATS[export_format][2]}"
@@ -0,0 +1,314 @@
+"""
+文件存储服务
+
+上传内容边写入临时文件边计算 SHA-256，完成后按哈希存放在 uploads/blobs/ 下，
+相同内容只保存一份并记录引用计数；用户文件名（URL 中的文件名）映射到数据块。
+大文件可通过分片上传会话分多次请求上传，中断后从已接收位置续传。
+引用计数降为 0 的数据块（连同其衍生图）和过期的上传会话由 purge-file-storage 命令清理。
+"""
+from datetime import datetime, timedelta
+import glob
+import hashlib
+import logging
+import os
+import uuid
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import safe_join
+from app import db
+from app.models.file import FileBlob, UserFile, UploadSession
+
+logger = logging.getLogger(__name__)
+
+# 流式读写的缓冲区大小
+BUFFER_SIZE = 64 * 1024
+
+# 允许上传的文件类型
+ALLOWED_EXTENSIONS = {
+    'images': {'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg'},
+    'documents': {'pdf', 'doc', 'docx', 'txt', 'md', 'rtf'},
+    'archives': {'zip', 'rar', '7z', 'tar', 'gz'},
+    'others': {'json', 'xml', 'csv', 'xlsx', 'pptx'}
+}
+
+
+def allowed_file(filename, file_type='all'):
+    """检查文件类型是否允许"""
+    if '.' not in filename:
+        return False
+
+    ext = filename.rsplit('.', 1)[1].lower()
+
+    if file_type == 'all':
+        all_extensions = set()
+        for extensions in ALLOWED_EXTENSIONS.values():
+            all_extensions.update(extensions)
+        return ext in all_extensions
+    elif file_type in ALLOWED_EXTENSIONS:
+        return ext in ALLOWED_EXTENSIONS[file_type]
+
+    return False
+
+
+def get_file_type(filename):
+    """获取文件类型分类"""
+    if '.' not in filename:
+        return 'others'
+
+    ext = filename.rsplit('.', 1)[1].lower()
+
+    for file_type, extensions in ALLOWED_EXTENSIONS.items():
+        if ext in extensions:
+            return file_type
+
+    return 'others'
+
+
+class FileTooLargeError(Exception):
+    """上传内容超过允许的大小"""
+
+
+class UploadOffsetError(Exception):
+    """分片起始位置与已接收数据不一致"""
+
+    def __init__(self, received_size):
+        super().__init__(f'分片起始位置应为 {received_size}')
+        self.received_size = received_size
+
+
+def copy_stream(source, target, hasher=None, limit=None):
+    """分块复制数据流，可同时计算哈希；超过 limit 字节时抛出 FileTooLargeError，返回复制的字节数"""
+    copied = 0
+    while True:
+        block = source.read(BUFFER_SIZE)
+        if not block:
+            return copied
+        copied += len(block)
+        if limit is not None and copied > limit:
+            raise FileTooLargeError()
+        if hasher is not None:
+            hasher.update(block)
+        target.write(block)
+
+
+def file_sha256(path):
+    """流式计算文件的 SHA-256"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BUFFER_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class FileStorageService:
+    """文件存储服务类"""
+
+    @staticmethod
+    def storage_root():
+        """上传文件根目录"""
+        return os.path.join(current_app.root_path, '..', current_app.config.get('UPLOAD_FOLDER', 'uploads'))
+
+    @staticmethod
+    def blob_path(sha256):
+        """数据块路径，按哈希前两级分目录避免单目录文件过多"""
+        return os.path.join(FileStorageService.storage_root(), 'blobs', sha256[:2], sha256[2:4], sha256)
+
+    @staticmethod
+    def temp_path(name):
+        """临时文件路径"""
+        temp_dir = os.path.join(FileStorageService.storage_root(), 'tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        return os.path.join(temp_dir, name)
+
+    @staticmethod
+    def legacy_path(user_id, filename):
+        """引入内容寻址存储之前按用户目录保存的文件路径"""
+        return os.path.join(FileStorageService.storage_root(), str(user_id), filename)
+
+    @staticmethod
+    def save_upload(user_id, stream, original_name, file_type, max_size=None):
+        """流式保存上传文件并返回 UserFile（调用方负责提交事务）"""
+        temp_path = FileStorageService.temp_path(f'{uuid.uuid4().hex}.upload')
+        hasher = hashlib.sha256()
+        try:
+            with open(temp_path, 'wb') as f:
+                size = copy_stream(stream, f, hasher, limit=max_size)
+            return FileStorageService._store(user_id, temp_path, hasher.hexdigest(), size,
+                                             original_name, file_type)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _store(user_id, temp_path, sha256, size, original_name, file_type):
+        """将已计算哈希的临时文件登记为数据块并创建用户文件记录"""
+        FileStorageService._add_blob_reference(sha256, size, temp_path)
+
+        file_ext = original_name.rsplit('.', 1)[1].lower() if '.' in original_name else ''
+        filename = f"{uuid.uuid4().hex}.{file_ext}" if file_ext else uuid.uuid4().hex
+        user_file = UserFile(
+            user_id=user_id,
+            filename=filename,
+            original_name=original_name,
+            file_type=file_type,
+            size=size,
+            blob_sha256=sha256
+        )
+        db.session.add(user_file)
+        db.session.flush()
+        return user_file
+
+    @staticmethod
+    def _add_blob_reference(sha256, size, temp_path):
+        """增加数据块引用计数，并将临时文件移入存储目录
+
+        先写入引用计数再移动文件：清理任务在删除记录的事务提交前删除文件，此处的写入要等清理提交后才能进行，
+        因此无论数据块文件此前是否存在，移动后文件都一定存在（内容相同，替换已有文件不影响其他引用）。
+        """
+        if not FileStorageService._increment_ref_count(sha256):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(FileBlob(sha256=sha256, size=size, ref_count=1))
+            except IntegrityError:
+                # 其他请求已登记同一内容
+                FileStorageService._increment_ref_count(sha256)
+
+        blob_path = FileStorageService.blob_path(sha256)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(temp_path, blob_path)
+
+    @staticmethod
+    def _increment_ref_count(sha256, delta=1):
+        result = db.session.execute(
+            update(FileBlob).where(FileBlob.sha256 == sha256).values(ref_count=FileBlob.ref_count + delta),
+            execution_options={'synchronize_session': False}
+        )
+        return result.rowcount > 0
+
+    @staticmethod
+    def get_user_file(user_id, filename):
+        """获取用户文件记录"""
+        return UserFile.query.filter_by(user_id=user_id, filename=filename).first()
+
+    @staticmethod
+    def resolve_path(user_id, filename):
+        """用户文件内容的磁盘路径（含去重存储之前的旧文件），不存在时返回 None"""
+        user_file = FileStorageService.get_user_file(user_id, filename)
+        if user_file is not None:
+            path = FileStorageService.blob_path(user_file.blob_sha256)
+        else:
+            path = safe_join(FileStorageService.storage_root(), str(user_id), filename)
+        return path if path is not None and os.path.isfile(path) else None
+
+    @staticmethod
+    def delete_user_file(user_file):
+        """删除用户文件并减少数据块引用计数（数据块文件由清理任务删除）"""
+        FileStorageService._increment_ref_count(user_file.blob_sha256, -1)
+        db.session.delete(user_file)
+
+    # ==================== 分片上传 ====================
+
+    @staticmethod
+    def create_session(user_id, original_name, total_size):
+        """创建分片上传会话"""
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            original_name=original_name,
+            total_size=total_size,
+            received_size=0
+        )
+        open(FileStorageService.temp_path(f'{session.id}.part'), 'wb').close()
+        db.session.add(session)
+        db.session.flush()
+        return session
+
+    @staticmethod
+    def get_session(user_id, upload_id):
+        """获取用户的上传会话"""
+        return UploadSession.query.filter_by(id=upload_id, user_id=user_id).first()
+
+    @staticmethod
+    def append_chunk(session, offset, stream):
+        """从 offset 处写入一个分片，返回新的已接收字节数
+
+        offset 必须等于已接收字节数，否则抛出 UploadOffsetError（客户端据此续传）；
+        同一会话的分片需按顺序依次上传。
+        """
+        if offset != session.received_size:
+            raise UploadOffsetError(session.received_size)
+
+        part_path = FileStorageService.temp_path(f'{session.id}.part')
+        mode = 'r+b' if os.path.exists(part_path) else 'wb'
+        with open(part_path, mode) as f:
+            # 丢弃上次中断请求写入的未确认数据
+            f.seek(offset)
+            f.truncate()
+            written = copy_stream(stream, f, limit=session.total_size - offset)
+
+        received_size = offset + written
+        updated = db.session.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session.id, UploadSession.received_size == offset)
+            .values(received_size=received_size, updated_at=datetime.utcnow()),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        if not updated:
+            db.session.refresh(session)
+            raise UploadOffsetError(session.received_size)
+
+        session.received_size = received_size
+        return received_size
+
+    @staticmethod
+    def complete_session(session, file_type):
+        """所有分片接收完毕后计算哈希并登记文件，返回 UserFile"""
+        part_path = FileStorageService.temp_path(f'{session.id}.part')
+        sha256 = file_sha256(part_path)
+        user_file = FileStorageService._store(
+            session.user_id, part_path, sha256, session.total_size, session.original_name, file_type
+        )
+        db.session.delete(session)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return user_file
+
+    @staticmethod
+    def abort_session(session):
+        """取消上传会话并删除已接收的数据"""
+        part_path = FileStorageService.temp_path(f'{session.id}.part')
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        db.session.delete(session)
+
+    # ==================== 清理 ====================
+
+    @staticmethod
+    def purge_unused(session_expire_hours=None):
+        """删除引用计数为 0 的数据块和过期的上传会话，返回 (数据块数, 会话数)"""
+        if session_expire_hours is None:
+            session_expire_hours = current_app.config.get('UPLOAD_SESSION_EXPIRE_HOURS', 24)
+
+        expired_before = datetime.utcnow() - timedelta(hours=session_expire_hours)
+        sessions = UploadSession.query.filter(UploadSession.updated_at < expired_before).all()
+        for session in sessions:
+            FileStorageService.abort_session(session)
+        db.session.commit()
+
+        purged_blobs = 0
+        for sha256 in db.session.scalars(select(FileBlob.sha256).where(FileBlob.ref_count <= 0)).all():
+            deleted = db.session.execute(
+                FileBlob.__table__.delete().where(FileBlob.sha256 == sha256, FileBlob.ref_count <= 0)
+            ).rowcount
+            blob_path = FileStorageService.blob_path(sha256)
+            if deleted and os.path.exists(blob_path):
+                # 在提交删除前删除文件（同时删除缩略图等衍生文件）：同时上传相同内容的请求写入记录时需等待本事务提交，
+                # 之后再移入的文件不会被删除；提交失败时记录保留，下次上传相同内容时恢复文件
+                for path in [blob_path] + glob.glob(glob.escape(blob_path) + '.*'):
+                    os.remove(path)
+                purged_blobs += 1
+            db.session.commit()
+
+        logger.info(f"已清理 {purged_blobs} 个未引用的数据块和 {len(sessions)} 个过期上传会话")
+        return purged_blobs, len(sessions)
@@ -0,0 +1,124 @@
+"""
+图片衍生图服务
+
+图片上传后由后台线程池为每个尺寸生成 WebP 缩略图（按 EXIF 方向旋转后丢弃 EXIF 信息），
+保存在原图数据块旁（<sha256>.<尺寸名>.webp），同一内容的图片只生成一次。
+依赖 Pillow，未安装时不生成衍生图，访问时回退到原图。
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import uuid
+from flask import current_app
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow 为可选依赖
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# 不生成衍生图的图片格式（矢量图）
+SKIPPED_EXTENSIONS = {'svg'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-derivatives')
+        return _executor
+
+
+def derivative_path(blob_path, size_name):
+    """衍生图路径（与原图数据块同目录）"""
+    return f'{blob_path}.{size_name}.webp'
+
+
+def render_derivative(blob_path, size_name, max_edge, quality):
+    """生成单个尺寸的 WebP 衍生图，先写入临时文件再原子替换，返回衍生图路径"""
+    target_path = derivative_path(blob_path, size_name)
+    temp_path = f'{target_path}.{uuid.uuid4().hex}.tmp'
+
+    try:
+        with Image.open(blob_path) as image:
+            # 按 EXIF 方向旋转，保存时不写入 EXIF（去除拍摄位置等元数据）
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+            image.thumbnail((max_edge, max_edge))
+            image.save(temp_path, 'WEBP', quality=quality)
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return target_path
+
+
+def render_all(blob_path, sizes, quality):
+    """生成所有尺寸的衍生图（已存在的跳过），在后台线程中执行"""
+    for size_name, max_edge in sizes.items():
+        if os.path.exists(derivative_path(blob_path, size_name)):
+            continue
+        try:
+            render_derivative(blob_path, size_name, max_edge, quality)
+        except Exception as e:
+            logger.warning(f"生成图片衍生图失败 {blob_path} ({size_name}): {str(e)}")
+            return
+
+
+class ImageDerivativeService:
+    """图片衍生图服务类"""
+
+    @staticmethod
+    def is_available():
+        """是否已安装 Pillow"""
+        return Image is not None
+
+    @staticmethod
+    def sizes():
+        """可用尺寸：尺寸名 -> 最长边像素"""
+        return current_app.config.get('IMAGE_DERIVATIVE_SIZES', {})
+
+    @staticmethod
+    def supports(filename):
+        """文件是否可以生成衍生图"""
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        return ImageDerivativeService.is_available() and ext not in SKIPPED_EXTENSIONS
+
+    @staticmethod
+    def submit(blob_path, filename):
+        """提交后台生成任务，返回 Future；不支持时返回 None"""
+        if not ImageDerivativeService.supports(filename):
+            return None
+
+        sizes = dict(ImageDerivativeService.sizes())
+        if all(os.path.exists(derivative_path(blob_path, size_name)) for size_name in sizes):
+            return None
+
+        executor = _get_executor(current_app.config.get('IMAGE_WORKERS', 2))
+        return executor.submit(render_all, blob_path, sizes, current_app.config.get('IMAGE_WEBP_QUALITY', 80))
+
+    @staticmethod
+    def get(blob_path, filename, size_name):
+        """获取指定尺寸的衍生图路径，后台任务尚未完成时同步生成；无法生成时返回 None"""
+        max_edge = ImageDerivativeService.sizes().get(size_name)
+        if max_edge is None or not ImageDerivativeService.supports(filename):
+            return None
+
+        path = derivative_path(blob_path, size_name)
+        if os.path.exists(path):
+            return path
+
+        try:
+            return render_derivative(blob_path, size_name, max_edge,
+                                     current_app.config.get('IMAGE_WEBP_QUALITY', 80))
+        except Exception as e:
+            logger.warning(f"生成图片衍生图失败 {blob_path} ({size_name}): {str(e)}")
+            return None
@@ -0,0 +1,349 @@
+"""
+笔记批量导入服务
+
+按流式方式解析导入文件，每 IMPORT_BATCH_SIZE 篇笔记为一批：
+一次解析本批所有标签和分类名称，用 executemany 插入笔记和关联，
+并批量同步全文索引、统计计数和增量同步日志，每批提交一次事务。
+支持的格式：
+- JSON Lines：每行一篇笔记（与导出格式相同）
+- Markdown 压缩包：每个 .md 文件一篇笔记，可带 YAML 头部；引用的 attachments/ 文件作为上传文件导入
+- Evernote ENEX：逐个 <note> 增量解析，内容转换为纯文本（不导入其中的资源文件）
+导入的笔记不创建初始版本快照。
+"""
+from collections import defaultdict, deque, namedtuple
+from datetime import datetime, timezone
+import codecs
+import html
+import json
+import logging
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models.note import Note, note_tags, note_categories
+from app.services.file_storage import FileStorageService, allowed_file, get_file_type
+from app.services.search_service import SearchService
+from app.services.stats_service import StatsService, NoteState, count_words
+from app.services.sync_service import SyncService, ENTITY_CATEGORY, ENTITY_NOTE, ENTITY_TAG
+from app.services.taxonomy_service import TaxonomyService
+
+logger = logging.getLogger(__name__)
+
+FORMAT_JSONL = 'jsonl'
+FORMAT_MARKDOWN = 'markdown'
+FORMAT_ENEX = 'enex'
+
+# 文件扩展名 -> 导入格式
+FORMAT_EXTENSIONS = {
+    'jsonl': FORMAT_JSONL,
+    'ndjson': FORMAT_JSONL,
+    'zip': FORMAT_MARKDOWN,
+    'enex': FORMAT_ENEX,
+}
+
+TITLE_MAX_LENGTH = 255
+NAME_MAX_LENGTH = 50
+DEFAULT_TITLE = '无标题'
+
+# Markdown 中引用附件的相对链接
+ATTACHMENT_LINK_RE = re.compile(r'attachments/([^\s)"\'<>]+)')
+FRONT_MATTER_RE = re.compile(r'\A---\r?\n(.*?)\r?\n---\r?\n?', re.S)
+HEADING_RE = re.compile(r'\A\s*#\s+(.+)')
+ENML_BREAK_RE = re.compile(r'<br\s*/?>|</(?:div|p|li|h[1-6]|tr)>', re.I)
+ENML_TAG_RE = re.compile(r'<[^>]+>')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+# 批量插入后同步全文索引所需的字段
+IndexedNote = namedtuple('IndexedNote', 'id user_id title content')
+
+# 批量 RETURNING 时用于将插入的行对应回输入行的列（覆盖所有写入的列）
+_NOTE_ROW_KEY = ('title', 'content', 'user_id', 'created_at', 'updated_at', 'word_count', 'is_deleted')
+
+
+class ImportFormatError(ValueError):
+    """导入文件格式错误"""
+
+
+def _parse_datetime(value):
+    """解析 ISO 格式或 ENEX 的 20200101T120000Z 格式时间（转换为 UTC），无法解析时返回 None"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ')
+    except ValueError:
+        pass
+
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _names(values):
+    """规范化标签或分类名称列表"""
+    if isinstance(values, str):
+        values = [values]
+    if not isinstance(values, list):
+        return []
+    return list(dict.fromkeys(str(value).strip()[:NAME_MAX_LENGTH] for value in values if str(value).strip()))
+
+
+def _record(title=None, content=None, tags=None, categories=None, created_at=None, updated_at=None):
+    """规范化一篇待导入的笔记"""
+    title = (str(title).strip() if title else '')[:TITLE_MAX_LENGTH] or DEFAULT_TITLE
+    return {
+        'title': title,
+        'content': '' if content is None else str(content),
+        'tags': _names(tags or []),
+        'categories': _names(categories or []),
+        'created_at': created_at if isinstance(created_at, datetime) else _parse_datetime(created_at),
+        'updated_at': updated_at if isinstance(updated_at, datetime) else _parse_datetime(updated_at),
+    }
+
+
+def parse_jsonl(stream):
+    """逐行解析 JSON Lines"""
+    reader = codecs.getreader('utf-8')(stream)
+    for line_number, line in enumerate(reader, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            raise ImportFormatError(f'第 {line_number} 行不是有效的 JSON')
+        if not isinstance(data, dict):
+            raise ImportFormatError(f'第 {line_number} 行不是 JSON 对象')
+        yield _record(data.get('title'), data.get('content'), data.get('tags'), data.get('categories'),
+                      data.get('created_at'), data.get('updated_at'))
+
+
+def _parse_front_matter(text):
+    """解析导出时写入的 YAML 头部（每行 key: JSON 值或纯文本），返回 (元数据, 正文)"""
+    match = FRONT_MATTER_RE.match(text)
+    if not match:
+        return {}, text
+
+    meta = {}
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        value = value.strip()
+        try:
+            meta[key.strip()] = json.loads(value)
+        except ValueError:
+            meta[key.strip()] = value
+    return meta, text[match.end():]
+
+
+def parse_markdown_zip(stream, user_id):
+    """解析 Markdown 压缩包，引用的附件保存为用户的上传文件并改写链接"""
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise ImportFormatError('不是有效的 zip 文件')
+
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+    max_total_size = current_app.config.get('IMPORT_MAX_UNCOMPRESSED_SIZE', 1024 * 1024 * 1024)
+    members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+    notes = [info for name, info in members.items()
+             if name.lower().endswith('.md') and not name.startswith('attachments/')]
+    attachment_urls = {}
+
+    # 写入任何笔记之前按目录中记录的解压后大小检查，防止压缩炸弹耗尽内存或磁盘
+    if sum(info.file_size for info in members.values()) > max_total_size:
+        archive.close()
+        raise ImportFormatError(f'压缩包解压后超过 {max_total_size // (1024 * 1024)} MB')
+    for info in notes:
+        if info.file_size > max_size:
+            archive.close()
+            raise ImportFormatError(f'{info.filename} 超过 {max_size // (1024 * 1024)} MB')
+
+    with archive:
+        for info in notes:
+            name = info.filename
+            # 实际解压的数据同样不超过上限（不依赖目录中记录的大小）
+            with archive.open(info) as source:
+                data = source.read(max_size + 1)
+            if len(data) > max_size:
+                raise ImportFormatError(f'{name} 超过 {max_size // (1024 * 1024)} MB')
+            text = data.decode('utf-8', errors='replace')
+            meta, body = _parse_front_matter(text)
+
+            title = meta.get('title')
+            if not title:
+                heading = HEADING_RE.match(body)
+                title = heading.group(1) if heading else os.path.splitext(os.path.basename(name))[0]
+
+            for filename in set(ATTACHMENT_LINK_RE.findall(body)):
+                if filename not in attachment_urls:
+                    attachment_urls[filename] = _import_attachment(
+                        archive, members.get(f'attachments/{filename}'), user_id, filename, max_size
+                    )
+                if attachment_urls[filename]:
+                    body = body.replace(f'attachments/{filename}', attachment_urls[filename])
+
+            yield _record(title, body.rstrip('\n'), meta.get('tags'), meta.get('categories'),
+                          meta.get('created_at'), meta.get('updated_at'))
+
+
+def _import_attachment(archive, info, user_id, filename, max_size):
+    """将压缩包中的附件保存为上传文件，返回访问地址；不存在或类型不允许时返回 None"""
+    if info is None or not allowed_file(filename) or info.file_size > max_size:
+        logger.warning(f"跳过无法导入的附件: {filename}")
+        return None
+    with archive.open(info) as source:
+        user_file = FileStorageService.save_upload(user_id, source, filename, get_file_type(filename), max_size)
+    return user_file.to_dict()['url']
+
+
+def _enml_to_text(enml):
+    """将 ENML（XHTML）内容转换为纯文本，保留段落换行"""
+    text = ENML_BREAK_RE.sub('\n', enml or '')
+    text = html.unescape(ENML_TAG_RE.sub('', text))
+    return BLANK_LINES_RE.sub('\n\n', '\n'.join(line.rstrip() for line in text.splitlines())).strip()
+
+
+def parse_enex(stream):
+    """增量解析 Evernote ENEX，每篇笔记解析完即释放其 XML 节点（含资源数据）"""
+    try:
+        for event, element in ET.iterparse(stream, events=('end',)):
+            if element.tag != 'note':
+                continue
+            yield _record(
+                element.findtext('title'),
+                _enml_to_text(element.findtext('content')),
+                [tag.text for tag in element.findall('tag') if tag.text],
+                None,
+                element.findtext('created'),
+                element.findtext('updated')
+            )
+            element.clear()
+    except ET.ParseError as e:
+        raise ImportFormatError(f'ENEX 解析失败: {str(e)}')
+
+
+class ImportService:
+    """笔记批量导入服务类"""
+
+    @staticmethod
+    def detect_format(filename, export_format=None):
+        """根据参数或扩展名确定导入格式，无法识别时返回 None"""
+        if export_format:
+            return export_format if export_format in FORMAT_EXTENSIONS.values() else None
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in (filename or '') else ''
+        return FORMAT_EXTENSIONS.get(ext)
+
+    @staticmethod
+    def parse(import_format, stream, user_id):
+        """按格式逐篇解析导入文件（Markdown 压缩包需要可随机读取的文件）"""
+        if import_format == FORMAT_JSONL:
+            return parse_jsonl(stream)
+        if import_format == FORMAT_MARKDOWN:
+            return parse_markdown_zip(stream, user_id)
+        if import_format == FORMAT_ENEX:
+            return parse_enex(stream)
+        raise ImportFormatError(f'不支持的导入格式: {import_format}')
+
+    @staticmethod
+    def import_notes(user_id, records, batch_size=None, progress=None):
+        """分批导入笔记，每批提交一次事务，progress(已导入数量) 在每批提交后调用；返回导入数量"""
+        batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+        imported = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                imported += ImportService._import_batch(user_id, batch)
+                batch = []
+                if progress:
+                    progress(imported)
+
+        if batch:
+            imported += ImportService._import_batch(user_id, batch)
+            if progress:
+                progress(imported)
+        return imported
+
+    @staticmethod
+    def _import_batch(user_id, records):
+        """导入一批笔记：批量解析名称、插入笔记和关联，同步索引、统计和变更日志后提交"""
+        tag_names = list(dict.fromkeys(name for record in records for name in record['tags']))
+        category_names = list(dict.fromkeys(name for record in records for name in record['categories']))
+        tag_ids = TaxonomyService.resolve_tags(tag_names)
+        category_ids = TaxonomyService.resolve_categories(user_id, category_names)
+
+        now = datetime.utcnow()
+        rows = []
+        for record in records:
+            created_at = record['created_at'] or now
+            rows.append({
+                'title': record['title'],
+                'content': record['content'],
+                'user_id': user_id,
+                'created_at': created_at,
+                'updated_at': record['updated_at'] or created_at,
+                'word_count': count_words(record['content']),
+                'is_deleted': False,
+            })
+        note_ids = ImportService._insert_notes(rows)
+
+        tag_rows = []
+        category_rows = []
+        states = []
+        for note_id, record, row in zip(note_ids, records, rows):
+            note_tag_ids = frozenset(tag_ids[name] for name in record['tags'] if name in tag_ids)
+            note_category_ids = frozenset(
+                category_ids[name] for name in record['categories'] if name in category_ids
+            )
+            tag_rows.extend({'note_id': note_id, 'tag_id': tag_id} for tag_id in note_tag_ids)
+            category_rows.extend({'note_id': note_id, 'category_id': category_id} for category_id in note_category_ids)
+            states.append((None, NoteState(
+                active=True, day=row['created_at'].date(), words=row['word_count'], has_content=True,
+                tag_ids=note_tag_ids, category_ids=note_category_ids
+            )))
+
+        if tag_rows:
+            db.session.execute(insert(note_tags), tag_rows)
+        if category_rows:
+            db.session.execute(insert(note_categories), category_rows)
+
+        connection = db.session.connection()
+        SearchService.sync_notes(connection, [
+            IndexedNote(note_id, user_id, row['title'], row['content']) for note_id, row in zip(note_ids, rows)
+        ], [])
+        StatsService.record_changes(user_id, states)
+        SyncService.record(user_id, ENTITY_NOTE, note_ids)
+        SyncService.record(user_id, ENTITY_TAG, set(tag_ids.values()))
+        SyncService.record(user_id, ENTITY_CATEGORY, set(category_ids.values()))
+        db.session.commit()
+        return len(note_ids)
+
+    @staticmethod
+    def _insert_notes(rows):
+        """批量插入笔记并按输入顺序返回ID（数据库不支持批量 RETURNING 时逐条插入）
+
+        SQLite 上 sort_by_parameter_order 会退化为逐条执行，这里改用普通的批量 RETURNING，
+        RETURNING 的行顺序和ID分配顺序都不保证与输入一致，因此同时返回写入的列按内容对应回输入行。
+        各列都相同的行无法区分，但它们写入的数据也完全相同，按出现顺序依次分配即可。
+        """
+        dialect = db.session.get_bind().dialect
+        if not dialect.insert_executemany_returning:
+            return [db.session.execute(insert(Note).values(**row)).inserted_primary_key[0] for row in rows]
+
+        key_columns = [getattr(Note, name) for name in _NOTE_ROW_KEY]
+        result = db.session.execute(insert(Note).returning(Note.id, *key_columns), rows)
+        ids_by_key = defaultdict(deque)
+        for inserted in result:
+            ids_by_key[tuple(inserted[1:])].append(inserted[0])
+        return [ids_by_key[tuple(row[name] for name in _NOTE_ROW_KEY)].popleft() for row in rows]
@@ -1,54 +1,267 @@
 """
 日历事件提醒服务
+
+事件的提醒时间 remind_at（开始时间减去提前分钟数，未启用提醒时为空）在保存事件时计算
+并存储在带索引的列上，轮询只需一次 remind_at 范围查询。
+已发送的提醒记录在 reminder_deliveries 中，同一事件的同一提醒时间只发送一次。
+ReminderScheduler 在进程内用最小堆保存即将到期的提醒，到期时按 O(log n) 逐个取出，
+通过服务器推送发送给用户的在线客户端；调度器在第一个客户端连接事件流时启动。
+任何写入路径新建、改期或删除事件并提交后，本进程的调度器随即更新，其他进程在下一次定期载入时更新。
 """
 from datetime import datetime, timedelta
+import heapq
+import threading
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from app import db
 from app.models.calendar import CalendarEvent
-from app.models.user import User
+from app.models.reminder import ReminderDelivery
+from app.services.event_stream import EventStream, EVENT_REMINDER
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _not_delivered():
+    """提醒尚未发送的条件（事件改期后 remind_at 变化，可再次提醒）"""
+    return ~select(ReminderDelivery.id).where(
+        ReminderDelivery.event_id == CalendarEvent.id,
+        ReminderDelivery.remind_at == CalendarEvent.remind_at
+    ).exists()
+
+
+def _due_query(start, end):
+    """提醒时间落在 [start, end] 内、事件尚未开始且未发送过提醒的事件"""
+    return CalendarEvent.query.filter(
+        CalendarEvent.remind_at >= start,
+        CalendarEvent.remind_at <= end,
+        CalendarEvent.start_datetime > end,
+        _not_delivered()
+    )
+
+
+class ReminderScheduler:
+    """进程内提醒调度器
+
+    最小堆按提醒时间保存 (remind_at, event_id)，事件改期或取消时只更新 _scheduled，
+    堆中的旧条目在弹出时丢弃。后台线程等待到最早的提醒时间，到期后在应用上下文中调用 callback(event_id)；
+    每隔 refresh_seconds 从数据库重新载入未来 horizon 内的提醒，以包含其他进程新建的事件
+    （同时载入上一个间隔内已到期但尚未发送的提醒，避免两次载入之间到期的提醒被遗漏）。
+    """
+
+    def __init__(self, callback, horizon_minutes=60, refresh_seconds=300):
+        self.callback = callback
+        self.horizon = timedelta(minutes=horizon_minutes)
+        self.refresh_seconds = refresh_seconds
+        self._heap = []
+        self._scheduled = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def schedule(self, event_id, remind_at):
+        """加入或更新事件的提醒，remind_at 为 None 时取消"""
+        with self._condition:
+            if remind_at is None:
+                self._scheduled.pop(event_id, None)
+                return
+            self._scheduled[event_id] = remind_at
+            heapq.heappush(self._heap, (remind_at, event_id))
+            self._condition.notify()
+
+    def cancel(self, event_id):
+        """取消事件的提醒"""
+        self.schedule(event_id, None)
+
+    def update(self, event_id, remind_at, start_datetime, now):
+        """事件保存后更新提醒：只保留 load 载入范围内的提醒，范围外的由之后的定期载入处理"""
+        in_range = (
+            remind_at is not None and start_datetime > now
+            and now - timedelta(seconds=self.refresh_seconds) <= remind_at <= now + self.horizon
+        )
+        self.schedule(event_id, remind_at if in_range else None)
+
+    def pop_due(self, now):
+        """取出所有已到期的提醒，返回事件ID列表"""
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                remind_at, event_id = heapq.heappop(self._heap)
+                if self._scheduled.get(event_id) == remind_at:
+                    del self._scheduled[event_id]
+                    due.append(event_id)
+        return due
+
+    def next_due(self):
+        """最早的有效提醒时间"""
+        with self._condition:
+            while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def load(self, now):
+        """载入上一个载入间隔起至未来 horizon 内、事件尚未开始且尚未发送的提醒"""
+        rows = db.session.execute(
+            select(CalendarEvent.id, CalendarEvent.remind_at).where(
+                CalendarEvent.remind_at >= now - timedelta(seconds=self.refresh_seconds),
+                CalendarEvent.remind_at <= now + self.horizon,
+                CalendarEvent.start_datetime > now,
+                _not_delivered()
+            )
+        ).all()
+        for event_id, remind_at in rows:
+            self.schedule(event_id, remind_at)
+
+    def start(self, app):
+        """启动后台调度线程"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(app,), name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台调度线程"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self, app):
+        next_refresh = datetime.now()
+        while True:
+            now = datetime.now()
+            with app.app_context():
+                try:
+                    if now >= next_refresh:
+                        self.load(now)
+                        next_refresh = now + timedelta(seconds=self.refresh_seconds)
+                    for event_id in self.pop_due(now):
+                        self.callback(event_id)
+                except Exception as e:
+                    logger.error(f"提醒调度失败: {str(e)}")
+                finally:
+                    db.session.remove()
+
+            with self._condition:
+                if self._stopped:
+                    return
+                deadline = min(filter(None, [self.next_due(), next_refresh]))
+                self._condition.wait(max((deadline - datetime.now()).total_seconds(), 0))
+                if self._stopped:
+                    return
+
+
 class ReminderService:
     """提醒服务类"""
-    
+
+    scheduler = None
+    _scheduler_lock = threading.Lock()
+
+    @staticmethod
+    def start_scheduler(app, callback=None):
+        """启动进程内调度器（已启动时直接返回），提醒到期时调用 callback(event_id)（默认推送给用户并记录为已发送）"""
+        if ReminderService.scheduler is None:
+            with ReminderService._scheduler_lock:
+                if ReminderService.scheduler is None:
+                    scheduler = ReminderScheduler(
+                        callback or ReminderService.deliver,
+                        app.config.get('REMINDER_HORIZON_MINUTES', 60),
+                        app.config.get('REMINDER_REFRESH_SECONDS', 60)
+                    )
+                    scheduler.start(app)
+                    ReminderService.scheduler = scheduler
+        return ReminderService.scheduler
+
+    @staticmethod
+    def stop_scheduler():
+        """停止进程内调度器"""
+        with ReminderService._scheduler_lock:
+            if ReminderService.scheduler is not None:
+                ReminderService.scheduler.stop()
+                ReminderService.scheduler = None
+
+    @staticmethod
+    def deliver(event_id):
+        """调度器到期回调：推送给用户的在线客户端，有客户端收到时记录提醒已发送
+
+        发送记录先写入但在推送之后才提交：多个进程同时到期时后写入的进程等待提交后因唯一约束放弃，不会重复推送；
+        没有客户端收到（未连接，或只连接在其他进程且使用进程内推送）时回滚，提醒留给前端轮询和 mark_reminder_sent。
+        """
+        event = db.session.get(CalendarEvent, event_id)
+        if event is None or event.remind_at is None or event.is_deleted:
+            return
+        # 不使用保存点：pysqlite 在事务外执行 SAVEPOINT 时 RELEASE 即提交，之后无法回滚
+        db.session.add(ReminderDelivery(event_id=event.id, user_id=event.user_id, remind_at=event.remind_at))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # 其他请求或调度器已记录
+            db.session.rollback()
+            return
+
+        received = EventStream.publish(event.user_id, EVENT_REMINDER,
+                                       ReminderService._user_reminder_dict(event, datetime.now()))
+        if not received:
+            db.session.rollback()
+            return
+        db.session.commit()
+        if ReminderService.scheduler is not None:
+            ReminderService.scheduler.cancel(event.id)
+
+    @staticmethod
+    def _record_delivery(event):
+        """写入发送记录，返回 True 表示本次新写入（已记录过时返回 False）"""
+        try:
+            with db.session.begin_nested():
+                db.session.add(ReminderDelivery(event_id=event.id, user_id=event.user_id, remind_at=event.remind_at))
+            db.session.commit()
+        except IntegrityError:
+            # 其他请求或调度器已记录
+            db.session.commit()
+            return False
+
+        if ReminderService.scheduler is not None:
+            ReminderService.scheduler.cancel(event.id)
+        return True
+
+    @staticmethod
+    def _user_reminder_dict(event, now):
+        """用户待提醒事件的返回格式"""
+        return {
+            'event_id': event.id,
+            'title': event.title,
+            'description': event.description,
+            'start_datetime': event.start_datetime.isoformat(),
+            'location': event.location,
+            'reminder_minutes': event.reminder_minutes,
+            'reminder_time': event.remind_at.isoformat(),
+            'category': event.category,
+            'priority': event.priority,
+            'color': event.color,
+            'time_until_event': int((event.start_datetime - now).total_seconds() / 60)  # 距离事件开始的分钟数
+        }
+
     @staticmethod
     def get_pending_reminders():
         """获取需要发送提醒的事件"""
         try:
             now = datetime.now()
             
-            # 查询所有启用提醒且即将到来的事件
-            events = CalendarEvent.query.filter(
-                CalendarEvent.reminder_enabled == True,
-                CalendarEvent.is_deleted == False,
-                CalendarEvent.start_datetime > now
-            ).all()
-            
-            pending_reminders = []
-            
-            for event in events:
-                # 计算提醒时间
-                reminder_time = event.start_datetime - timedelta(minutes=event.reminder_minutes)
-                
-                # 检查是否到了提醒时间（允许1分钟的误差）
-                time_diff = abs((now - reminder_time).total_seconds())
-                
-                if time_diff <= 60:  # 1分钟内的误差
-                    pending_reminders.append({
-                        'event_id': event.id,
-                        'user_id': event.user_id,
-                        'title': event.title,
-                        'description': event.description,
-                        'start_datetime': event.start_datetime.isoformat(),
-                        'location': event.location,
-                        'reminder_minutes': event.reminder_minutes,
-                        'reminder_time': reminder_time.isoformat(),
-                        'category': event.category,
-                        'priority': event.priority
-                    })
+            # 提醒时间在前后1分钟内且尚未发送的事件
+            events = _due_query(now - timedelta(seconds=60), now + timedelta(seconds=60)).all()
             
-            return pending_reminders
+            return [{
+                'event_id': event.id,
+                'user_id': event.user_id,
+                'title': event.title,
+                'description': event.description,
+                'start_datetime': event.start_datetime.isoformat(),
+                'location': event.location,
+                'reminder_minutes': event.reminder_minutes,
+                'reminder_time': event.remind_at.isoformat(),
+                'category': event.category,
+                'priority': event.priority
+            } for event in events]
             
         except Exception as e:
             logger.error(f"获取待提醒事件失败: {str(e)}")
@@ -60,40 +273,12 @@ class ReminderService:
         try:
             now = datetime.now()
             
-            # 查询用户的启用提醒且即将到来的事件
-            events = CalendarEvent.query.filter(
-                CalendarEvent.user_id == user_id,
-                CalendarEvent.reminder_enabled == True,
-                CalendarEvent.is_deleted == False,
-                CalendarEvent.start_datetime > now
-            ).all()
-            
-            pending_reminders = []
-            
-            for event in events:
-                # 计算提醒时间
-                reminder_time = event.start_datetime - timedelta(minutes=event.reminder_minutes)
-                
-                # 检查是否到了提醒时间（允许2分钟的误差，给前端轮询留出时间）
-                time_diff = (now - reminder_time).total_seconds()
-                
-                # 如果当前时间在提醒时间之后2分钟内，认为需要提醒
-                if 0 <= time_diff <= 120:  # 2分钟内
-                    pending_reminders.append({
-                        'event_id': event.id,
-                        'title': event.title,
-                        'description': event.description,
-                        'start_datetime': event.start_datetime.isoformat(),
-                        'location': event.location,
-                        'reminder_minutes': event.reminder_minutes,
-                        'reminder_time': reminder_time.isoformat(),
-                        'category': event.category,
-                        'priority': event.priority,
-                        'color': event.color,
-                        'time_until_event': int((event.start_datetime - now).total_seconds() / 60)  # 距离事件开始的分钟数
-                    })
+            # 提醒时间在过去2分钟内（给前端轮询留出时间）且尚未发送的事件
+            events = _due_query(now - timedelta(seconds=120), now).filter(
+                CalendarEvent.user_id == user_id
+            ).order_by(CalendarEvent.remind_at).all()
             
-            return pending_reminders
+            return [ReminderService._user_reminder_dict(event, now) for event in events]
             
         except Exception as e:
             logger.error(f"获取用户 {user_id} 的待提醒事件失败: {str(e)}")
@@ -131,11 +316,10 @@ class ReminderService:
                     'time_until_event': int((event.start_datetime - now).total_seconds() / 60)
                 }
                 
-                # 如果启用了提醒，计算提醒时间
-                if event.reminder_enabled:
-                    reminder_time = event.start_datetime - timedelta(minutes=event.reminder_minutes)
-                    event_data['reminder_time'] = reminder_time.isoformat()
-                    event_data['time_until_reminder'] = int((reminder_time - now).total_seconds() / 60)
+                # 如果启用了提醒，返回存储的提醒时间
+                if event.remind_at is not None:
+                    event_data['reminder_time'] = event.remind_at.isoformat()
+                    event_data['time_until_reminder'] = int((event.remind_at - now).total_seconds() / 60)
                 
                 upcoming_events.append(event_data)
             
@@ -147,12 +331,47 @@ class ReminderService:
     
     @staticmethod
     def mark_reminder_sent(event_id, user_id):
-        """标记提醒已发送（可以用于避免重复提醒）"""
+        """记录提醒已发送，之后的轮询不再返回该提醒（重复标记视为成功）"""
         try:
-            # 这里可以实现提醒发送记录，避免重复提醒
-            # 暂时简单记录日志
+            event = CalendarEvent.query.filter_by(id=event_id, user_id=user_id).first()
+            if event is None or event.remind_at is None:
+                return False
+
+            ReminderService._record_delivery(event)
             logger.info(f"提醒已发送 - 事件ID: {event_id}, 用户ID: {user_id}")
             return True
         except Exception as e:
+            db.session.rollback()
             logger.error(f"标记提醒发送状态失败: {str(e)}")
             return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_event_changes(session, flush_context):
+    """记录本事务中新建、修改和删除的事件，提交后再同步到调度器（回滚时丢弃）"""
+    changes = session.info.setdefault('reminder_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, CalendarEvent) and obj.id is not None:
+            changes[obj.id] = None if obj.is_deleted else (obj.remind_at, obj.start_datetime)
+    for obj in session.deleted:
+        if isinstance(obj, CalendarEvent) and obj.id is not None:
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _update_scheduler(session):
+    changes = session.info.pop('reminder_changes', None)
+    scheduler = ReminderService.scheduler
+    if not changes or scheduler is None:
+        return
+    now = datetime.now()
+    for event_id, change in changes.items():
+        if change is None:
+            scheduler.cancel(event_id)
+        else:
+            scheduler.update(event_id, *change, now)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_event_changes(session):
+    session.info.pop('reminder_changes', None)
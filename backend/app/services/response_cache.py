@@ -0,0 +1,162 @@
+"""
+接口响应缓存
+
+缓存读多写少接口的 JSON 响应，缓存键包含用户、接口、查询参数和该用户的数据版本号（数据库中的
+User.notes_version）。用户的任何写操作都会递增版本号，旧版本的缓存不再被命中并随 TTL 或 LRU 淘汰，无需逐个删除；
+版本号保存在数据库中，任何 worker 进程的写操作都会使所有进程的缓存失效。
+默认使用进程内 LRU 缓存；配置 RESPONSE_CACHE_BACKEND=redis 时使用 Redis 兼容服务，各进程共享缓存内容。
+"""
+from functools import wraps
+import logging
+import pickle
+import threading
+from flask import current_app, g, request
+from app.models.user import User
+from app.services.auth_service import AuthService
+from app.services.cache import LRUCache
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis 为可选依赖
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """进程内缓存后端"""
+
+    def __init__(self, max_size, ttl):
+        self._cache = LRUCache(max_size=max_size, ttl=ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl):
+        self._cache.set(key, value, ttl=ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class RedisBackend:
+    """Redis 兼容服务缓存后端"""
+
+    def __init__(self, url, prefix='notes:cache:'):
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self._prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, pickle.dumps(value), ex=ttl)
+
+    def clear(self):
+        for key in self._client.scan_iter(f'{self._prefix}*'):
+            self._client.delete(key)
+
+
+class ResponseCache:
+    """接口响应缓存类"""
+
+    _backend = None
+    _backend_lock = threading.Lock()
+    hits = 0
+    misses = 0
+    errors = 0
+
+    @staticmethod
+    def enabled():
+        return current_app.config.get('RESPONSE_CACHE_BACKEND', 'memory') != 'none'
+
+    @staticmethod
+    def backend():
+        """按配置创建缓存后端（Redis 不可用时回退到进程内缓存）"""
+        if ResponseCache._backend is None:
+            with ResponseCache._backend_lock:
+                if ResponseCache._backend is None:
+                    config = current_app.config
+                    backend = None
+                    if config.get('RESPONSE_CACHE_BACKEND') == 'redis':
+                        if redis is None:
+                            logger.warning("未安装 redis，响应缓存使用进程内缓存")
+                        else:
+                            backend = RedisBackend(config.get('RESPONSE_CACHE_REDIS_URL'))
+                    if backend is None:
+                        backend = MemoryBackend(config.get('RESPONSE_CACHE_MAX_SIZE', 2048),
+                                                config.get('RESPONSE_CACHE_TTL', 60))
+                    ResponseCache._backend = backend
+        return ResponseCache._backend
+
+    @staticmethod
+    def make_key(user_id, version):
+        """缓存键：用户、数据版本、接口和排序后的查询参数"""
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        return f'{user_id}:{version}:{request.endpoint}:{args}'
+
+    @staticmethod
+    def current_version(user_id):
+        """本次请求使用的用户数据版本号（每个请求只读取一次，条件请求的 ETag 与缓存键使用同一个值），用户不存在时返回 None"""
+        if 'notes_version' not in g:
+            g.notes_version = User.get_notes_version(user_id)
+        return g.notes_version
+
+    @staticmethod
+    def stats():
+        """获取命中统计"""
+        total = ResponseCache.hits + ResponseCache.misses
+        return {
+            'backend': type(ResponseCache._backend).__name__ if ResponseCache._backend else None,
+            'hits': ResponseCache.hits,
+            'misses': ResponseCache.misses,
+            'errors': ResponseCache.errors,
+            'hit_rate': round(ResponseCache.hits / total, 3) if total else 0
+        }
+
+
+def cached_response(ttl=None, condition=None):
+    """缓存视图的成功响应（需放在 jwt_required 之后），condition 返回 False 时不使用缓存
+
+    响应头 X-Cache 标明是否命中。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ResponseCache.enabled() or (condition is not None and not condition()):
+                return view(*args, **kwargs)
+
+            user_id = AuthService.current_user_id()
+            version = ResponseCache.current_version(user_id)
+            if version is None:
+                return view(*args, **kwargs)
+            try:
+                backend = ResponseCache.backend()
+                key = ResponseCache.make_key(user_id, version.notes_version)
+                cached = backend.get(key)
+            except Exception as e:
+                ResponseCache.errors += 1
+                logger.warning(f"读取响应缓存失败: {str(e)}")
+                return view(*args, **kwargs)
+
+            if cached is not None:
+                ResponseCache.hits += 1
+                body, status, mimetype = cached
+                response = current_app.response_class(body, status=status, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            ResponseCache.misses += 1
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                try:
+                    backend.set(key, (response.get_data(), response.status_code, response.mimetype),
+                                ttl or current_app.config.get('RESPONSE_CACHE_TTL', 60))
+                except Exception as e:
+                    ResponseCache.errors += 1
+                    logger.warning(f"写入响应缓存失败: {str(e)}")
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
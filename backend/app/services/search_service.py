@@ -0,0 +1,288 @@
+"""
+笔记全文检索服务
+
+基于 SQLite FTS5 的倒排索引，索引内容在写入前先做 CJK 分词：
+中文/日文/韩文连续字符拆成二元组（末字单独保留），其余文字按单词切分。
+每个索引词带所属用户的前缀（如 u42x中文），不同用户的同一个词是不同的索引词，
+检索只读取该用户的倒排列表，耗时取决于用户自己的笔记数量而不是全部用户的笔记数量。
+非 SQLite 数据库回退到 LIKE 查询。
+"""
+import html
+import re
+import logging
+from sqlalchemy import DDL, Float, Integer, and_, column, event, inspect, or_, text
+from sqlalchemy.orm import Session
+from app import db
+from app.models.note import Note
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'notes_fts'
+
+# 标题权重高于正文
+BM25_WEIGHTS = (10.0, 1.0)
+
+_CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+# 一次扫描切出 CJK 连续片段或其他文字组成的单词（不含下划线）
+_RUN_RE = re.compile(f'([{_CJK_RANGES}]+)|([^\\W_{_CJK_RANGES}]+)')
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+CREATE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    f"USING fts5(title, content, user_id UNINDEXED, tokenize = 'unicode61')"
+)
+
+# 已确认索引表存在的数据库
+_ready_engines = set()
+
+
+def strip_markup(value):
+    """去除HTML标签并压缩空白，用于索引和摘要"""
+    if not value:
+        return ''
+    return _SPACE_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', value))).strip()
+
+
+def _split_runs(value):
+    """将文本拆分为 (是否CJK, 片段) 序列"""
+    for cjk, word in _RUN_RE.findall(value.lower()):
+        yield (True, cjk) if cjk else (False, word)
+
+
+def _cjk_tokens(run):
+    """CJK片段拆分为二元组，末字单独保留以支持单字前缀查询"""
+    tokens = [run[i:i + 2] for i in range(len(run) - 1)]
+    tokens.append(run[-1])
+    return tokens
+
+
+def owner_prefix(user_id):
+    """用户的索引词前缀（数字后跟字母，u4x 与 u42x 不会互为前缀）"""
+    return f'u{user_id}x'
+
+
+def tokenize(value, user_id):
+    """将文本转换为空格分隔、带用户前缀的索引词序列"""
+    owner = owner_prefix(user_id)
+    tokens = []
+    for cjk, word in _RUN_RE.findall(strip_markup(value).lower()):
+        if cjk:
+            tokens.extend(owner + token for token in _cjk_tokens(cjk))
+        else:
+            tokens.append(owner + word)
+    return ' '.join(tokens)
+
+
+def build_match_query(user_id, q):
+    """将用户输入转换为 FTS5 MATCH 表达式，所有词需同时命中，最后一个词按前缀匹配"""
+    owner = owner_prefix(user_id)
+    phrases = []
+    prefix = False
+    for is_cjk, part in _split_runs(q):
+        if is_cjk and len(part) > 1:
+            # 相邻二元组组成短语，等价于子串匹配
+            phrases.append('"%s"' % ' '.join(owner + part[i:i + 2] for i in range(len(part) - 1)))
+            prefix = False
+        else:
+            phrases.append('"%s%s"' % (owner, part))
+            prefix = True
+
+    if not phrases:
+        return None
+
+    if prefix:
+        phrases[-1] += '*'
+
+    return ' AND '.join(phrases)
+
+
+def query_terms(q):
+    """提取用于高亮的原始查询词"""
+    return [term for term in (t.strip() for t in q.split()) if term]
+
+
+def highlight(value, terms, max_length=None):
+    """截取包含查询词的片段并用 <mark> 包裹命中部分"""
+    plain = strip_markup(value)
+    if not plain:
+        return ''
+
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+                         re.IGNORECASE) if terms else None
+
+    if max_length and len(plain) > max_length:
+        match = pattern.search(plain) if pattern else None
+        start = max(0, match.start() - max_length // 4) if match else 0
+        end = start + max_length
+        fragment = plain[start:end]
+        prefix = '...' if start > 0 else ''
+        suffix = '...' if end < len(plain) else ''
+    else:
+        fragment, prefix, suffix = plain, '', ''
+
+    if not pattern:
+        return prefix + html.escape(fragment) + suffix
+
+    parts = []
+    last = 0
+    for match in pattern.finditer(fragment):
+        parts.append(html.escape(fragment[last:match.start()]))
+        parts.append('<mark>%s</mark>' % html.escape(match.group(0)))
+        last = match.end()
+    parts.append(html.escape(fragment[last:]))
+
+    return prefix + ''.join(parts) + suffix
+
+
+class SearchService:
+    """全文检索服务类"""
+
+    @staticmethod
+    def is_supported(connection=None):
+        """当前数据库是否支持 FTS5 索引"""
+        bind = connection if connection is not None else db.engine
+        return bind.dialect.name == 'sqlite'
+
+    @staticmethod
+    def index_ready(connection):
+        """索引表是否已按当前格式创建（只缓存肯定结果，便于建表后自动启用）
+
+        旧格式（不区分用户）的索引表视为未就绪，回退到 LIKE 查询，直到迁移或 rebuild-search-index 重建
+        """
+        if not SearchService.is_supported(connection):
+            return False
+
+        key = str(connection.engine.url)
+        if key in _ready_engines:
+            return True
+
+        ready = SearchService._current_format(connection)
+        if ready:
+            _ready_engines.add(key)
+        return ready
+
+    @staticmethod
+    def _current_format(connection):
+        """索引表存在且包含 user_id 列"""
+        sql = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).scalar()
+        return bool(sql) and 'user_id' in sql
+
+    @staticmethod
+    def rebuild_index(batch_size=1000, connection=None):
+        """（按当前格式重新）创建并重建全文索引，用于已有数据库的升级和维护"""
+        if not SearchService.is_supported(connection):
+            return False
+
+        if connection is None:
+            with db.engine.begin() as connection:
+                SearchService._rebuild(connection, batch_size)
+        else:
+            SearchService._rebuild(connection, batch_size)
+
+        logger.info("全文索引重建完成")
+        return True
+
+    @staticmethod
+    def _rebuild(connection, batch_size):
+        if not SearchService._current_format(connection):
+            connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+            connection.execute(text(CREATE_FTS_SQL))
+        connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                text("SELECT id, user_id, title, content FROM notes "
+                     "WHERE id > :last_id AND is_deleted = 0 ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': batch_size}
+            ).fetchall()
+            if not rows:
+                break
+
+            SearchService._insert(connection, rows)
+            last_id = rows[-1].id
+
+    @staticmethod
+    def _insert(connection, notes):
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, title, content, user_id) "
+                 f"VALUES (:id, :title, :content, :user_id)"),
+            [{'id': note.id, 'user_id': note.user_id,
+              'title': tokenize(note.title, note.user_id), 'content': tokenize(note.content, note.user_id)}
+             for note in notes]
+        )
+
+    @staticmethod
+    def sync_notes(connection, upserts, deletes):
+        """在同一事务内同步索引：upserts 为需要(重新)索引的笔记，deletes 为需要移除的笔记ID"""
+        if not SearchService.index_ready(connection):
+            return
+
+        stale_ids = list(deletes) + [note.id for note in upserts]
+        if stale_ids:
+            connection.execute(
+                text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"),
+                [{'id': note_id} for note_id in stale_ids]
+            )
+
+        if upserts:
+            SearchService._insert(connection, upserts)
+
+    @staticmethod
+    def ranked_matches(user_id, q):
+        """返回用户笔记的 (note_id, rank) 子查询，rank 越小越相关；无法检索时返回 None"""
+        match_query = build_match_query(user_id, q)
+        if match_query is None or not SearchService.index_ready(db.session.connection()):
+            return None
+
+        return text(
+            f"SELECT rowid AS note_id, bm25({FTS_TABLE}, {BM25_WEIGHTS[0]}, {BM25_WEIGHTS[1]}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match AND user_id = :user_id"
+        ).bindparams(match=match_query, user_id=user_id).columns(
+            column('note_id', Integer), column('rank', Float)
+        ).subquery('search_matches')
+
+    @staticmethod
+    def like_filter(q):
+        """不支持FTS时的回退条件：每个词都需出现在标题或正文中"""
+        return and_(*[
+            or_(Note.title.contains(term), Note.content.contains(term))
+            for term in query_terms(q)
+        ])
+
+
+# 随 notes 表一起创建和删除索引表
+event.listen(Note.__table__, 'after_create', DDL(CREATE_FTS_SQL).execute_if(dialect='sqlite'))
+event.listen(Note.__table__, 'before_drop', DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect='sqlite'))
+
+
+def _indexed_fields_changed(note):
+    """只有标题、内容或删除状态变化时才需要重建该笔记的索引（如只更新修改时间则跳过）"""
+    state = inspect(note)
+    return any(state.attrs[name].history.has_changes() for name in ('title', 'content', 'is_deleted'))
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """笔记新增、修改、软删除、恢复及永久删除时同步更新索引"""
+    upserts = []
+    deletes = []
+
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Note) or obj.id is None:
+            continue
+        if obj.is_deleted:
+            deletes.append(obj.id)
+        elif obj in session.new or _indexed_fields_changed(obj):
+            upserts.append(obj)
+
+    for obj in session.deleted:
+        if isinstance(obj, Note) and obj.id is not None:
+            deletes.append(obj.id)
+
+    if upserts or deletes:
+        SearchService.sync_notes(session.connection(), upserts, deletes)
@@ -0,0 +1,307 @@
+"""
+笔记统计服务
+
+统计数据保存在 user_note_stats 等汇总表中，由各写操作按变更前后状态增量更新，
+读取统计时只需查询少量汇总行。汇总行不存在时（如升级前的数据）自动全量重建。
+"""
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+import logging
+from sqlalchemy import and_, bindparam, desc, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.note import Note, Tag, Category, note_tags, note_categories
+from app.models.stats import UserNoteStats, UserDailyNoteStats, UserTagStats, UserCategoryStats
+
+logger = logging.getLogger(__name__)
+
+# 笔记对统计有影响的状态快照
+NoteState = namedtuple('NoteState', 'active day words has_content tag_ids category_ids')
+
+# 创建笔记时 created_at 和 updated_at 分别取当前时间，相差不超过该秒数视为未修改过
+UPDATE_TOLERANCE_SECONDS = 1
+
+
+def count_words(content):
+    """按空白分词统计字数"""
+    return len(content.split()) if content else 0
+
+
+def _updated_after_creation():
+    """笔记在创建之后又被修改过的条件（按数据库方言比较时间差）"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # SQLite 的时间保存为字符串，按儒略日之差比较
+        return func.julianday(Note.updated_at) - func.julianday(Note.created_at) > UPDATE_TOLERANCE_SECONDS / 86400
+    if dialect == 'mysql':
+        return Note.updated_at > func.date_add(Note.created_at, text(f'INTERVAL {UPDATE_TOLERANCE_SECONDS} SECOND'))
+    return Note.updated_at > Note.created_at + timedelta(seconds=UPDATE_TOLERANCE_SECONDS)
+
+
+def _insert_user_stats(user_id):
+    """插入用户的空汇总行，返回是否插入（其他请求已并发创建时忽略冲突并返回 False）"""
+    row = {'user_id': user_id, 'total_notes': 0, 'total_words': 0, 'notes_with_content': 0}
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return db.session.execute(sqlite_insert(UserNoteStats).values(row).on_conflict_do_nothing()).rowcount > 0
+    if dialect == 'mysql':
+        return db.session.execute(insert(UserNoteStats).values(row).prefix_with('IGNORE')).rowcount > 0
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(UserNoteStats).values(row))
+    except IntegrityError:
+        return False
+    return True
+
+
+class StatsService:
+    """统计服务类"""
+
+    @staticmethod
+    def capture(note):
+        """获取单篇笔记的统计状态"""
+        return StatsService.capture_many([note])[note.id]
+
+    @staticmethod
+    def capture_many(notes):
+        """批量获取笔记的统计状态，标签和分类ID一次查询"""
+        note_ids = [note.id for note in notes]
+        tag_ids = {note_id: set() for note_id in note_ids}
+        category_ids = {note_id: set() for note_id in note_ids}
+
+        if note_ids:
+            rows = db.session.execute(db.union_all(
+                db.select(note_tags.c.note_id, db.literal('tag'), note_tags.c.tag_id)
+                .where(note_tags.c.note_id.in_(note_ids)),
+                db.select(note_categories.c.note_id, db.literal('category'), note_categories.c.category_id)
+                .where(note_categories.c.note_id.in_(note_ids))
+            ))
+            for note_id, kind, target_id in rows:
+                (tag_ids if kind == 'tag' else category_ids)[note_id].add(target_id)
+
+        return {
+            note.id: NoteState(
+                active=not note.is_deleted,
+                day=(note.created_at or datetime.utcnow()).date(),
+                words=note.word_count if note.word_count is not None else count_words(note.content),
+                has_content=note.content is not None,
+                tag_ids=frozenset(tag_ids[note.id]),
+                category_ids=frozenset(category_ids[note.id])
+            )
+            for note in notes
+        }
+
+    @staticmethod
+    def record_change(user_id, before, after):
+        """根据变更前后状态增量更新统计，before/after 为 None 表示笔记不存在"""
+        StatsService.record_changes(user_id, [(before, after)])
+
+    @staticmethod
+    def record_changes(user_id, changes):
+        """批量记录多篇笔记的状态变化，changes 为 [(before, after), ...]"""
+        if not StatsService.ensure_user_stats(user_id):
+            # 刚完成全量重建，已包含本次变更
+            return
+
+        notes_delta = words_delta = content_delta = 0
+        daily = Counter()
+        tags = Counter()
+        categories = Counter()
+
+        for before, after in changes:
+            for state, sign in ((before, -1), (after, 1)):
+                if state is None or not state.active:
+                    continue
+                notes_delta += sign
+                words_delta += sign * state.words
+                content_delta += sign * int(state.has_content)
+                daily[state.day] += sign
+                for tag_id in state.tag_ids:
+                    tags[tag_id] += sign
+                for category_id in state.category_ids:
+                    categories[category_id] += sign
+
+        if notes_delta or words_delta or content_delta:
+            UserNoteStats.query.filter_by(user_id=user_id).update({
+                UserNoteStats.total_notes: UserNoteStats.total_notes + notes_delta,
+                UserNoteStats.total_words: UserNoteStats.total_words + words_delta,
+                UserNoteStats.notes_with_content: UserNoteStats.notes_with_content + content_delta,
+                UserNoteStats.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+
+        StatsService._increment_many(UserDailyNoteStats, 'day', 'created_count', user_id, daily)
+        StatsService._increment_many(UserTagStats, 'tag_id', 'note_count', user_id, tags)
+        StatsService._increment_many(UserCategoryStats, 'category_id', 'note_count', user_id, categories)
+
+    @staticmethod
+    def _increment_many(model, key_name, column_name, user_id, deltas):
+        """批量加减用户的计数器行，不存在的行批量插入（查询数与键数量无关）"""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        table = model.__table__
+        key_column = table.c[key_name]
+        column = table.c[column_name]
+        existing = set(db.session.scalars(
+            select(key_column).where(table.c.user_id == user_id, key_column.in_(list(deltas)))
+        ))
+
+        if existing:
+            db.session.execute(
+                update(table)
+                .where(table.c.user_id == bindparam('b_user_id'), key_column == bindparam('b_key'))
+                .values({column_name: column + bindparam('b_delta')}),
+                [{'b_user_id': user_id, 'b_key': key, 'b_delta': deltas[key]} for key in existing]
+            )
+
+        missing = [key for key in deltas if key not in existing]
+        if missing:
+            db.session.execute(insert(table), [
+                {'user_id': user_id, key_name: key, column_name: deltas[key]} for key in missing
+            ])
+
+    @staticmethod
+    def ensure_user_stats(user_id):
+        """确保用户的汇总行存在；不存在时全量重建并返回 False
+
+        汇总行以忽略冲突的方式插入，并发请求中只有插入成功的一个执行重建，
+        其余请求等待其提交后按增量更新
+        """
+        if db.session.get(UserNoteStats, user_id) is not None:
+            return True
+        if not _insert_user_stats(user_id):
+            return True
+        StatsService.rebuild_user_stats(user_id)
+        return False
+
+    @staticmethod
+    def rebuild_user_stats(user_id):
+        """全量重建用户统计（用于首次使用和数据修复），同时回填笔记字数"""
+        db.session.flush()
+
+        UserDailyNoteStats.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        UserTagStats.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        UserCategoryStats.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+        # 回填缺失的字数
+        for note in Note.query.filter_by(user_id=user_id, word_count=None).yield_per(500):
+            note.word_count = count_words(note.content)
+        db.session.flush()
+
+        active = and_(Note.user_id == user_id, Note.is_deleted == False)
+        total_notes, total_words, notes_with_content = db.session.query(
+            func.count(Note.id),
+            func.coalesce(func.sum(Note.word_count), 0),
+            func.count(Note.content)
+        ).filter(active).one()
+
+        stats = db.session.get(UserNoteStats, user_id) or UserNoteStats(user_id=user_id)
+        stats.total_notes = total_notes
+        stats.total_words = total_words
+        stats.notes_with_content = notes_with_content
+        db.session.add(stats)
+
+        daily_rows = db.session.query(
+            func.date(Note.created_at), func.count(Note.id)
+        ).filter(active).group_by(func.date(Note.created_at)).all()
+        db.session.add_all([
+            UserDailyNoteStats(user_id=user_id, day=_as_date(day), created_count=count)
+            for day, count in daily_rows if day is not None
+        ])
+
+        tag_rows = db.session.query(
+            note_tags.c.tag_id, func.count(Note.id)
+        ).join(Note, Note.id == note_tags.c.note_id).filter(active).group_by(note_tags.c.tag_id).all()
+        db.session.add_all([
+            UserTagStats(user_id=user_id, tag_id=tag_id, note_count=count) for tag_id, count in tag_rows
+        ])
+
+        category_rows = db.session.query(
+            note_categories.c.category_id, func.count(Note.id)
+        ).join(Note, Note.id == note_categories.c.note_id).filter(active).group_by(
+            note_categories.c.category_id
+        ).all()
+        db.session.add_all([
+            UserCategoryStats(user_id=user_id, category_id=category_id, note_count=count)
+            for category_id, count in category_rows
+        ])
+
+        db.session.flush()
+        logger.info(f"已重建用户 {user_id} 的统计数据")
+
+    @staticmethod
+    def get_stats(user_id, days=30):
+        """读取用户统计数据"""
+        if not StatsService.ensure_user_stats(user_id):
+            db.session.commit()
+
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=days-1)
+
+        stats = db.session.get(UserNoteStats, user_id)
+
+        daily_rows = UserDailyNoteStats.query.filter(
+            UserDailyNoteStats.user_id == user_id,
+            UserDailyNoteStats.day >= start_date,
+            UserDailyNoteStats.day <= end_date,
+            UserDailyNoteStats.created_count > 0
+        ).all()
+        daily_creation = {row.day.isoformat(): row.created_count for row in daily_rows}
+
+        # 最近更新的笔记数量（走 user_id + is_deleted + updated_at 索引的范围查询）
+        recent_updates = Note.query.filter(
+            Note.user_id == user_id,
+            Note.is_deleted == False,
+            Note.updated_at >= datetime.combine(start_date, datetime.min.time()),
+            Note.updated_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+            _updated_after_creation()  # 排除创建后未修改的笔记
+        ).count()
+
+        total_categories = Category.query.filter_by(user_id=user_id).count()
+
+        total_tags = UserTagStats.query.filter(
+            UserTagStats.user_id == user_id, UserTagStats.note_count > 0
+        ).count()
+
+        tag_rows = db.session.query(Tag.name, UserTagStats.note_count).join(
+            Tag, Tag.id == UserTagStats.tag_id
+        ).filter(
+            UserTagStats.user_id == user_id, UserTagStats.note_count > 0
+        ).order_by(desc(UserTagStats.note_count)).limit(10).all()
+
+        category_rows = db.session.query(Category.name, UserCategoryStats.note_count).join(
+            Category, Category.id == UserCategoryStats.category_id
+        ).filter(
+            UserCategoryStats.user_id == user_id, UserCategoryStats.note_count > 0
+        ).order_by(desc(UserCategoryStats.note_count)).limit(10).all()
+
+        avg_words_per_note = stats.total_words / stats.notes_with_content if stats.notes_with_content else 0
+
+        return {
+            'period': {
+                'days': days,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat()
+            },
+            'overview': {
+                'total_notes': stats.total_notes,
+                'total_categories': total_categories,
+                'total_tags': total_tags,
+                'recent_notes': sum(daily_creation.values()),
+                'recent_updates': recent_updates,
+                'total_words': stats.total_words,
+                'avg_words_per_note': round(avg_words_per_note, 1)
+            },
+            'daily_creation': daily_creation,
+            'category_distribution': [{'name': name, 'count': count} for name, count in category_rows],
+            'tag_distribution': [{'name': name, 'count': count} for name, count in tag_rows]
+        }
+
+
+def _as_date(value):
+    """SQLite 的 date() 返回字符串，统一转换为 date"""
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
@@ -0,0 +1,222 @@
+"""
+增量同步服务
+
+每次修改笔记、标签关联或分类时在 note_changes 中追加一条 (用户, 实体类型, 实体ID) 记录，
+与数据修改在同一事务中提交。客户端保存上次同步返回的令牌（变更日志ID），
+下次同步只读取该令牌之后的变更日志，按实体去重后查询实体的当前状态返回，
+因此同步成本只与变更数量有关。笔记在回收站或已被永久删除时以墓碑形式返回。
+ORM 对象的修改由 after_flush 钩子记录，集合式 SQL 修改由调用方显式记录。
+所有数据修改都经过这里，因此写入变更日志时同时标记当前请求修改了数据（g.notes_dirty），
+请求结束时只有被标记的请求才递增用户的数据版本号（见 routes/notes.py）。
+"""
+from datetime import datetime, timedelta
+import logging
+from flask import current_app, g, has_request_context
+from sqlalchemy import and_, event, func, insert, literal, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models.note import Note, Tag, Category, note_tags, note_categories
+from app.models.sync import NoteChange
+
+logger = logging.getLogger(__name__)
+
+ENTITY_NOTE = 'note'
+ENTITY_TAG = 'tag'
+ENTITY_CATEGORY = 'category'
+
+# 单条 IN 查询的最大参数数量
+CHUNK_SIZE = 500
+
+
+def _mark_dirty():
+    """标记当前请求修改了笔记、标签关联或分类"""
+    if has_request_context():
+        g.notes_dirty = True
+
+
+class SyncService:
+    """增量同步服务类"""
+
+    @staticmethod
+    def record(user_id, entity_type, entity_ids, connection=None):
+        """记录用户的实体变更"""
+        now = datetime.utcnow()
+        rows = [
+            {'user_id': user_id, 'entity_type': entity_type, 'entity_id': entity_id, 'created_at': now}
+            for entity_id in set(entity_ids)
+        ]
+        if rows:
+            (connection or db.session).execute(insert(NoteChange), rows)
+            _mark_dirty()
+
+    @staticmethod
+    def record_notes(note_ids):
+        """按笔记ID记录笔记变更（INSERT ... SELECT 取笔记所属用户，不加载笔记对象）"""
+        for start in range(0, len(note_ids), CHUNK_SIZE):
+            chunk = note_ids[start:start + CHUNK_SIZE]
+            SyncService._record_from_select(
+                select(Note.user_id, literal(ENTITY_NOTE), Note.id).where(Note.id.in_(chunk))
+            )
+
+    @staticmethod
+    def record_note_associations(note_ids):
+        """记录笔记关联的标签和分类的变更（在删除关联之前调用）"""
+        for start in range(0, len(note_ids), CHUNK_SIZE):
+            chunk = note_ids[start:start + CHUNK_SIZE]
+            SyncService._record_from_select(
+                select(Note.user_id, literal(ENTITY_TAG), note_tags.c.tag_id)
+                .join(Note, Note.id == note_tags.c.note_id).where(note_tags.c.note_id.in_(chunk))
+            )
+            SyncService._record_from_select(
+                select(Note.user_id, literal(ENTITY_CATEGORY), note_categories.c.category_id)
+                .join(Note, Note.id == note_categories.c.note_id).where(note_categories.c.note_id.in_(chunk))
+            )
+
+    @staticmethod
+    def record_category_notes(category_id):
+        """记录分类下所有笔记的变更（分类改名会影响笔记的返回内容）"""
+        SyncService._record_from_select(
+            select(Note.user_id, literal(ENTITY_NOTE), Note.id)
+            .join(note_categories, note_categories.c.note_id == Note.id)
+            .where(note_categories.c.category_id == category_id)
+        )
+
+    @staticmethod
+    def _record_from_select(query):
+        query = query.add_columns(literal(datetime.utcnow()))
+        result = db.session.execute(
+            insert(NoteChange).from_select(['user_id', 'entity_type', 'entity_id', 'created_at'], query)
+        )
+        if result.rowcount:
+            _mark_dirty()
+
+    @staticmethod
+    def current_token():
+        """当前最新的变更令牌"""
+        return db.session.scalar(select(func.max(NoteChange.id))) or 0
+
+    @staticmethod
+    def token_expired(since):
+        """令牌之后的变更日志是否可能已被清理（需要客户端全量同步）"""
+        oldest = db.session.scalar(select(func.min(NoteChange.id)))
+        return oldest is None or since < oldest - 1
+
+    @staticmethod
+    def get_changes(user_id, since, limit):
+        """读取令牌之后的变更，返回 ({实体类型: [实体ID]}, 新令牌, 是否还有更多)"""
+        query = select(NoteChange.id, NoteChange.entity_type, NoteChange.entity_id).where(
+            NoteChange.user_id == user_id, NoteChange.id > since
+        )
+        settle_seconds = current_app.config.get('SYNC_SETTLE_SECONDS', 0)
+        if settle_seconds:
+            # 自增ID与提交顺序不一致的数据库上，推迟返回刚写入的变更，避免跳过尚未提交的事务
+            query = query.where(NoteChange.created_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+        rows = db.session.execute(query.order_by(NoteChange.id).limit(limit + 1)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        changed = {ENTITY_NOTE: [], ENTITY_TAG: [], ENTITY_CATEGORY: []}
+        for _, entity_type, entity_id in rows:
+            ids = changed.setdefault(entity_type, [])
+            if entity_id not in ids:
+                ids.append(entity_id)
+
+        return changed, (rows[-1].id if rows else since), has_more
+
+    @staticmethod
+    def load_notes(user_id, note_ids):
+        """查询变更笔记的当前状态，返回 (未删除的笔记, 墓碑列表)"""
+        notes = []
+        for start in range(0, len(note_ids), CHUNK_SIZE):
+            chunk = note_ids[start:start + CHUNK_SIZE]
+            notes.extend(Note.query.filter(Note.id.in_(chunk), Note.user_id == user_id).all())
+
+        found = {note.id: note for note in notes}
+        active = [note for note in notes if not note.is_deleted]
+        tombstones = []
+        for note_id in note_ids:
+            note = found.get(note_id)
+            if note is None:
+                tombstones.append({'id': note_id, 'deleted': 'purged'})
+            elif note.is_deleted:
+                tombstones.append({
+                    'id': note_id,
+                    'deleted': 'trash',
+                    'deleted_at': note.deleted_at.isoformat() if note.deleted_at else None
+                })
+        return active, tombstones
+
+    @staticmethod
+    def load_tags(user_id, tag_ids=None):
+        """查询标签及其在用户笔记（含回收站，与标签列表接口一致）中的使用次数
+
+        tag_ids 为空时返回用户使用的全部标签；指定时不再被使用的标签计数为 0
+        """
+        query = select(Tag.id, Tag.name, func.count(Note.id)).select_from(Tag).outerjoin(
+            note_tags, note_tags.c.tag_id == Tag.id
+        ).outerjoin(
+            Note, and_(Note.id == note_tags.c.note_id, Note.user_id == user_id)
+        ).group_by(Tag.id, Tag.name)
+
+        if tag_ids is None:
+            rows = db.session.execute(query.having(func.count(Note.id) > 0)).all()
+        else:
+            rows = []
+            for start in range(0, len(tag_ids), CHUNK_SIZE):
+                rows.extend(db.session.execute(query.where(Tag.id.in_(tag_ids[start:start + CHUNK_SIZE]))).all())
+
+        return [{'id': tag_id, 'name': name, 'count': count} for tag_id, name, count in rows]
+
+    @staticmethod
+    def load_categories(user_id, category_ids=None):
+        """查询分类的当前状态，返回 (分类列表, 已删除的分类ID)；category_ids 为空时返回全部分类"""
+        if category_ids is not None and not category_ids:
+            return [], []
+
+        query = Category.query.filter_by(user_id=user_id)
+        categories = []
+        if category_ids is None:
+            categories = query.all()
+        else:
+            for start in range(0, len(category_ids), CHUNK_SIZE):
+                categories.extend(query.filter(Category.id.in_(category_ids[start:start + CHUNK_SIZE])).all())
+
+        notes_counts = Category.get_notes_counts(user_id)
+        found_ids = {category.id for category in categories}
+        deleted_ids = [category_id for category_id in category_ids or [] if category_id not in found_ids]
+        return [category.to_dict(notes_counts=notes_counts) for category in categories], deleted_ids
+
+    @staticmethod
+    def prune(retention_days=None):
+        """清理超过保留天数的变更日志（令牌早于保留范围的客户端需要全量同步），返回删除的条数"""
+        if retention_days is None:
+            retention_days = current_app.config.get('SYNC_LOG_RETENTION_DAYS', 90)
+        # 始终保留最新一条，避免表被清空后自增ID从头开始导致旧令牌跳过新变更
+        deleted = NoteChange.query.filter(
+            NoteChange.created_at < datetime.utcnow() - timedelta(days=retention_days),
+            NoteChange.id < SyncService.current_token()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_orm_changes(session, flush_context):
+    """记录通过 ORM 新增、修改和删除的笔记和分类"""
+    changes = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Note):
+            entity_type = ENTITY_NOTE
+        elif isinstance(obj, Category):
+            entity_type = ENTITY_CATEGORY
+        else:
+            continue
+        if obj.id is None or obj.user_id is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        changes.setdefault((obj.user_id, entity_type), set()).add(obj.id)
+
+    connection = session.connection()
+    for (user_id, entity_type), entity_ids in changes.items():
+        SyncService.record(user_id, entity_type, entity_ids, connection=connection)
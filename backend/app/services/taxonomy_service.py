@@ -0,0 +1,186 @@
+"""
+标签和分类名称解析服务
+
+将一组名称一次性解析为ID：先查进程内缓存，未命中的名称用一条 IN 查询获取，
+仍不存在的批量插入（并发插入同名标签时忽略唯一约束冲突后重新查询）。
+分类可被删除和重命名，缓存命中的分类ID在同一条查询中确认仍然有效。
+"""
+import logging
+from sqlalchemy import false, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.note import Tag, Category
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# 名称到ID的缓存；分类ID在使用前校验，其他进程删除或重命名分类后不会关联到失效的ID
+_cache = LRUCache(max_size=4096, ttl=60)
+
+
+def _tag_key(name):
+    return ('tag', name)
+
+
+def _category_key(user_id, name):
+    return ('category', user_id, name)
+
+
+def _insert_ignoring_conflicts(model, rows):
+    """批量插入，忽略唯一约束冲突（其他请求已插入同名记录）"""
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        db.session.execute(sqlite_insert(model).on_conflict_do_nothing(), rows)
+    elif dialect == 'mysql':
+        db.session.execute(insert(model).prefix_with('IGNORE'), rows)
+    else:
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(model), [row])
+            except IntegrityError:
+                logger.info(f"{model.__tablename__} 记录已被并发创建: {row}")
+
+
+def _match_names(names, rows):
+    """将查询到的 (名称, ID) 对应回输入名称，同名取第一条
+
+    不区分大小写的排序规则下 IN 查询会匹配到大小写不同的已有记录，此时按 casefold 对应回输入名称。
+    """
+    exact = {}
+    folded = {}
+    for name, record_id in rows:
+        exact.setdefault(name, record_id)
+        folded.setdefault(name.casefold(), record_id)
+
+    matched = {}
+    for name in names:
+        record_id = exact.get(name, folded.get(name.casefold()))
+        if record_id is not None:
+            matched[name] = record_id
+    return matched
+
+
+class TaxonomyService:
+    """标签和分类名称解析服务类"""
+
+    @staticmethod
+    def resolve_tag_ids(names, create=True):
+        """将标签名称解析为ID列表（保持输入顺序并去重），create 为 False 时忽略不存在的标签"""
+        return list(dict.fromkeys(TaxonomyService.resolve_tags(names, create).values()))
+
+    @staticmethod
+    def resolve_tags(names, create=True):
+        """将标签名称解析为 名称->ID 映射；多个名称可能对应同一个标签（如不区分大小写的排序规则）"""
+        names = list(dict.fromkeys(name for name in names if name))
+        resolved = {}
+        missing = []
+        for name in names:
+            tag_id = _cache.get(_tag_key(name))
+            if tag_id is None:
+                missing.append(name)
+            else:
+                resolved[name] = tag_id
+
+        if missing:
+            found = TaxonomyService._fetch_tags(missing)
+            # 只缓存已存在的记录，本事务新建的记录可能随回滚失效
+            for name, tag_id in found.items():
+                _cache.set(_tag_key(name), tag_id)
+            resolved.update(found)
+
+            not_found = [name for name in missing if name not in found]
+            if not_found and create:
+                _insert_ignoring_conflicts(Tag, [{'name': name} for name in not_found])
+                resolved.update(TaxonomyService._fetch_tags(not_found))
+
+        return {name: resolved[name] for name in names if name in resolved}
+
+    @staticmethod
+    def _fetch_tags(names):
+        rows = db.session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).all()
+        return _match_names(names, rows)
+
+    @staticmethod
+    def resolve_category_ids(user_id, names, create=True):
+        """将用户的分类名称解析为ID列表（保持输入顺序并去重）"""
+        return list(dict.fromkeys(TaxonomyService.resolve_categories(user_id, names, create).values()))
+
+    @staticmethod
+    def resolve_categories(user_id, names, create=True):
+        """将用户的分类名称解析为 名称->ID 映射，同名分类取最早创建的一个；不存在时创建为顶级分类
+
+        缓存按进程保存，其他进程删除或重命名分类后只清除自己的缓存，因此命中的ID在写入关联前
+        与未命中的名称在同一条查询中确认仍存在且名称未变，失效的条目按名称重新查询。
+        """
+        names = list(dict.fromkeys(name for name in names if name))
+        resolved = {}
+        cached = {}
+        missing = []
+        for name in names:
+            category_id = _cache.get(_category_key(user_id, name))
+            if category_id is None:
+                missing.append(name)
+            else:
+                cached[name] = category_id
+
+        if cached or missing:
+            found, current_names = TaxonomyService._fetch_categories(user_id, missing, list(cached.values()))
+            for name, category_id in cached.items():
+                if current_names.get(category_id) == name:
+                    resolved[name] = category_id
+                else:
+                    _cache.delete(_category_key(user_id, name))
+                    missing.append(name)
+            stale = [name for name in missing if name in cached]
+            if stale:
+                found.update(TaxonomyService._fetch_categories(user_id, stale)[0])
+
+            for name, category_id in found.items():
+                _cache.set(_category_key(user_id, name), category_id)
+            resolved.update(found)
+
+            not_found = [name for name in missing if name not in found]
+            if not_found and create:
+                db.session.execute(insert(Category), [
+                    {'name': name, 'user_id': user_id} for name in not_found
+                ])
+                resolved.update(TaxonomyService._fetch_categories(user_id, not_found)[0])
+
+        return {name: resolved[name] for name in names if name in resolved}
+
+    @staticmethod
+    def _fetch_categories(user_id, names, ids=()):
+        """按名称查询用户的分类（同名取最早的一个），同时查询指定ID的当前名称；返回 (名称->ID, ID->名称)"""
+        conditions = []
+        if names:
+            conditions.append(Category.name.in_(names))
+        if ids:
+            conditions.append(Category.id.in_(ids))
+        if not conditions:
+            return {}, {}
+
+        # 由数据库按自身排序规则标记哪些行是按名称匹配到的，按ID查询到的其他分类不参与名称对应
+        by_name = Category.name.in_(names) if names else false()
+        rows = db.session.execute(
+            select(Category.name, Category.id, by_name.label('by_name'))
+            .where(Category.user_id == user_id, or_(*conditions))
+            .order_by(Category.id)
+        ).all()
+        current_names = {row.id: row.name for row in rows}
+        found = _match_names(names, [(row.name, row.id) for row in rows if row.by_name])
+        return found, current_names
+
+    @staticmethod
+    def invalidate_categories(user_id):
+        """分类被修改或删除后清除该用户的分类缓存"""
+        _cache.delete_where(lambda key: key[0] == 'category' and key[1] == user_id)
+
+    @staticmethod
+    def cache_stats():
+        """获取缓存命中统计"""
+        return _cache.stats()
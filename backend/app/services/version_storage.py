@@ -0,0 +1,74 @@
+"""
+笔记版本存储编码
+
+版本内容以 zlib 压缩存储：每隔若干版本保存一个完整关键帧，
+其余版本只保存相对上一版本的按行差异，读取时从最近的关键帧向后还原。
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+
+FORMAT_FULL = 'full'
+FORMAT_DELTA = 'delta'
+
+# 默认每 20 个版本保存一个完整关键帧，限制还原时的差异链长度
+DEFAULT_KEYFRAME_INTERVAL = 20
+
+
+def compress_full(content):
+    """压缩完整内容"""
+    return zlib.compress((content or '').encode('utf-8'))
+
+
+def decompress_full(data):
+    """解压完整内容"""
+    return zlib.decompress(data).decode('utf-8')
+
+
+def make_delta(base, content):
+    """生成从 base 到 content 的按行差异
+
+    差异为操作列表：[起始行, 结束行] 表示复制 base 中的行区间，字符串表示插入的新文本。
+    """
+    base_lines = (base or '').splitlines(keepends=True)
+    new_lines = (content or '').splitlines(keepends=True)
+
+    ops = []
+    matcher = SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(new_lines[j1:j2]))
+
+    payload = json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(payload.encode('utf-8'))
+
+
+def apply_delta(base, data):
+    """将差异应用到 base 上还原内容"""
+    base_lines = (base or '').splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(data).decode('utf-8')):
+        if isinstance(op, list):
+            parts.extend(base_lines[op[0]:op[1]])
+        else:
+            parts.append(op)
+    return ''.join(parts)
+
+
+def encode_content(content, base_content=None, chain_length=0, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+    """选择存储方式并编码内容
+
+    base_content 为上一版本内容（无上一版本时为 None），chain_length 为上一版本距最近关键帧的差异数。
+    返回 (存储格式, 压缩数据)
+    """
+    full = compress_full(content)
+    if base_content is None or chain_length + 1 >= keyframe_interval:
+        return FORMAT_FULL, full
+
+    delta = make_delta(base_content, content)
+    if len(delta) >= len(full):
+        return FORMAT_FULL, full
+
+    return FORMAT_DELTA, delta
@@ -13,11 +13,112 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'hard-to-guess-string'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1小时过期
+
+    # 密码哈希算法及参数（Werkzeug 格式，需写全参数，如 'pbkdf2:sha256:600000' 或 'scrypt:32768:8:1'）和盐长度，
+    # 修改后已有用户在下次登录时自动按新参数重新计算；flask benchmark-password-hash 可测量每核每秒的登录数
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_SALT_LENGTH = 16
+    # 登录时校验密码的线程数、最多排队的登录请求数和排队等待秒数（超出时返回 503）
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    PASSWORD_HASH_MAX_PENDING = 32
+    PASSWORD_HASH_QUEUE_TIMEOUT = 5
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 数据库连接池：每个进程保持的连接数、高峰时额外允许的连接数、等待空闲连接的秒数，
+    # 以及 MySQL 连接的回收秒数（需小于服务端 wait_timeout）。未显式设置 SQLALCHEMY_ENGINE_OPTIONS 时
+    # 按数据库类型自动生成，flask benchmark-database 可测量并发读写吞吐量
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 20))
+    DATABASE_POOL_TIMEOUT = 30
+    DATABASE_POOL_RECYCLE = 3600
+
+    # SQLite 连接参数：写锁被占用时最多等待 SQLITE_BUSY_TIMEOUT 毫秒（与驱动默认的 5 秒一致）；
+    # 日志模式、同步级别、页缓存（KiB）、内存映射字节数和临时表存储为 None 时使用 SQLite 默认值，
+    # 生产环境的调优见 ProductionConfig
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    SQLITE_JOURNAL_MODE = None
+    SQLITE_SYNCHRONOUS = None
+    SQLITE_CACHE_SIZE_KB = None
+    SQLITE_MMAP_SIZE = None
+    SQLITE_TEMP_STORE = None
+
     # 文件上传配置
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
     UPLOAD_FOLDER = 'uploads'
+    UPLOAD_MAX_SIZE = 10 * 1024 * 1024  # 单次上传的文件大小上限
+
+    # 分片上传：建议的分片大小（单个分片请求同样受 MAX_CONTENT_LENGTH 限制）、文件大小上限、
+    # 未完成会话的保留小时数
+    UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+    CHUNKED_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+    UPLOAD_SESSION_EXPIRE_HOURS = 24
+
+    # 文件下载的客户端缓存时间（秒），文件名与内容一一对应，可长期缓存
+    FILE_CACHE_MAX_AGE = 365 * 24 * 3600
+    # 由前端服务器发送文件内容：'x-sendfile'（Apache/lighttpd）或 'x-accel'（nginx），为空时由应用发送
+    FILE_SENDFILE_MODE = os.environ.get('FILE_SENDFILE_MODE', '').lower()
+    USE_X_SENDFILE = FILE_SENDFILE_MODE == 'x-sendfile'
+    # X-Accel-Redirect 的内部路径前缀，需在 nginx 中配置为 internal 的 location 并指向上传目录
+    FILE_ACCEL_REDIRECT_PREFIX = os.environ.get('FILE_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+
+    # 图片缩略图尺寸（尺寸名 -> 最长边像素，通过 ?size= 访问）、WebP 质量、后台生成线程数
+    IMAGE_DERIVATIVE_SIZES = {'small': 160, 'medium': 480, 'large': 1280}
+    IMAGE_WEBP_QUALITY = 80
+    IMAGE_WORKERS = 2
+
+    # 接口响应缓存后端：memory（进程内 LRU）、redis（Redis 兼容服务，需安装 redis）或 none（关闭）
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory').lower()
+    RESPONSE_CACHE_TTL = 60  # 秒
+    RESPONSE_CACHE_MAX_SIZE = 2048  # 进程内缓存的最大条目数
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+    # 导出时每批读取的笔记数、导入时每批插入（每个事务）的笔记数，
+    # 以及导入的 Markdown 压缩包解压后的总大小上限（其中单个文件不超过 UPLOAD_MAX_SIZE）
+    EXPORT_BATCH_SIZE = 500
+    IMPORT_BATCH_SIZE = 1000
+    IMPORT_MAX_UNCOMPRESSED_SIZE = 1024 * 1024 * 1024
+
+    # 服务器推送事件：发布订阅后端（'memory' 仅同进程；多 worker 部署使用 'redis'）、每个连接的事件队列长度、
+    # 心跳间隔和单个连接的最长持续秒数（到期后客户端自动重连）。每个连接占用一个 worker 线程，
+    # 使用 gunicorn 时建议 gevent 等异步 worker 或 gthread 并调高线程数
+    EVENT_STREAM_BACKEND = os.environ.get('EVENT_STREAM_BACKEND', 'memory')
+    EVENT_STREAM_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    EVENT_STREAM_QUEUE_SIZE = 100
+    EVENT_STREAM_HEARTBEAT_SECONDS = 15
+    EVENT_STREAM_MAX_DURATION = 300
+
+    # 日历提醒调度器：第一个客户端连接事件流时在进程内启动，预先载入未来多少分钟内的提醒，
+    # 以及每隔多少秒重新载入（其他进程新建或修改的事件最迟在该间隔后被调度）
+    REMINDER_SCHEDULER_ENABLED = os.environ.get('REMINDER_SCHEDULER_ENABLED', 'true').lower() == 'true'
+    REMINDER_HORIZON_MINUTES = 60
+    REMINDER_REFRESH_SECONDS = 60
+
+    # 用户资料快照缓存时间（秒），0 表示每次查询数据库
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+
+    # 增量同步：单次最多读取的变更日志条数、变更日志保留天数，
+    # 以及推迟返回最近多少秒内的变更（MySQL 等自增ID可能与提交顺序不一致的数据库上建议设为数秒）
+    SYNC_BATCH_SIZE = 1000
+    SYNC_LOG_RETENTION_DAYS = 90
+    SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', 0))
+
+    # 游标分页每页最大数量
+    NOTES_MAX_PAGE_SIZE = 100
+
+    # 批量操作单次最多处理的笔记数
+    BULK_MAX_NOTES = 10000
+
+    # 回收站保留天数，超过后由 flask purge-trash 命令（需配置为定时任务）永久删除（0 表示不自动清理）
+    TRASH_RETENTION_DAYS = int(os.environ.get('TRASH_RETENTION_DAYS', 30))
+
+    # 版本历史每隔多少个版本保存一个完整关键帧，其余版本保存差异
+    VERSION_KEYFRAME_INTERVAL = 20
+
+    # 同一编辑会话在该分钟数内的连续保存合并为一个版本（0 表示不合并）
+    VERSION_COALESCE_MINUTES = 10
+    # 自动版本清理：超过该小时数的每小时保留一个，超过该天数的每天保留一个
+    VERSION_HOURLY_AFTER_HOURS = 24
+    VERSION_DAILY_AFTER_DAYS = 7
     
     @staticmethod
     def init_app(app):
@@ -40,6 +141,15 @@ class ProductionConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///data.db'
 
+    # SQLite 生产调优：WAL 模式下读写互不阻塞，synchronous=NORMAL 在 WAL 下只在检查点时刷盘
+    # （断电可能丢失最后几个事务，但不会损坏数据库），每个连接 64 MiB 页缓存和 256 MiB 内存映射读取；
+    # flask benchmark-database --config development 可与默认参数对比
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = 64 * 1024
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_TEMP_STORE = 'MEMORY'
+
 # 配置字典
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,50 @@
+"""add composite indexes for hot note queries
+
+基础表由 init_db.py (db.create_all) 创建，本迁移只为已有数据库补建索引；
+已存在的索引会被跳过，因此对新建数据库重复执行也是安全的。
+
+Revision ID: a1c3e5f7b901
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b901'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('notes', 'ix_notes_user_deleted_updated', ['user_id', 'is_deleted', 'updated_at']),
+    ('notes', 'ix_notes_user_deleted_deleted_at', ['user_id', 'is_deleted', 'deleted_at']),
+    ('notes', 'ix_notes_user_deleted_created', ['user_id', 'is_deleted', 'created_at']),
+    ('note_tags', 'ix_note_tags_tag_id', ['tag_id', 'note_id']),
+    ('note_categories', 'ix_note_categories_category_id', ['category_id', 'note_id']),
+    ('categories', 'ix_categories_user_parent_name', ['user_id', 'parent_id', 'name']),
+]
+
+
+def _existing_indexes(table_name):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table_name):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade():
+    for table_name, index_name, columns in INDEXES:
+        existing = _existing_indexes(table_name)
+        if existing is not None and index_name not in existing:
+            op.create_index(index_name, table_name, columns)
+
+
+def downgrade():
+    for table_name, index_name, columns in reversed(INDEXES):
+        existing = _existing_indexes(table_name)
+        if existing is not None and index_name in existing:
+            op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,41 @@
+"""add note change log for delta sync
+
+已有数据没有变更记录，客户端首次同步时获取全量数据。
+
+Revision ID: a7c9e1f3b567
+Revises: f6b8d0e2a456
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c9e1f3b567'
+down_revision = 'f6b8d0e2a456'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('note_changes'):
+        op.create_table(
+            'note_changes',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('entity_type', sa.String(length=20), nullable=False),
+            sa.Column('entity_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('ix_note_changes_user_id_id', 'note_changes', ['user_id', 'id'])
+        op.create_index('ix_note_changes_created_at', 'note_changes', ['created_at'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table('note_changes'):
+        op.drop_table('note_changes')
@@ -0,0 +1,99 @@
+"""store note versions as compressed keyframes and deltas
+
+新增压缩存储列；已有版本保持明文，可通过 flask compact-note-versions 转换。
+降级时先将压缩的关键帧和差异还原为明文写回 content 列，再删除压缩存储列。
+
+Revision ID: b2d4f6a8c012
+Revises: a1c3e5f7b901
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import logging
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c012'
+down_revision = 'a1c3e5f7b901'
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return [
+        sa.Column('storage_format', sa.String(length=10), nullable=True),
+        sa.Column('content_data', sa.LargeBinary(), nullable=True),
+        sa.Column('content_size', sa.Integer(), nullable=True),
+        sa.Column('base_version', sa.Integer(), nullable=True),
+        sa.Column('chain_length', sa.Integer(), nullable=True),
+    ]
+
+
+def _existing_columns():
+    inspector = sa.inspect(op.get_bind())
+    return {column['name'] for column in inspector.get_columns('note_versions')}
+
+
+def upgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table('note_versions') as batch_op:
+        for column in _columns():
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+
+def _inflate_versions(bind):
+    """逐篇笔记按版本号升序还原压缩的版本内容并写回 content 列"""
+    from app.services.version_storage import FORMAT_FULL, apply_delta, decompress_full
+
+    versions = sa.table(
+        'note_versions',
+        sa.column('id', sa.Integer), sa.column('note_id', sa.Integer), sa.column('version_number', sa.Integer),
+        sa.column('content', sa.Text), sa.column('storage_format', sa.String),
+        sa.column('content_data', sa.LargeBinary), sa.column('base_version', sa.Integer),
+    )
+    note_ids = bind.execute(
+        sa.select(versions.c.note_id).where(versions.c.storage_format.isnot(None)).distinct()
+    ).scalars().all()
+
+    for note_id in note_ids:
+        contents = {}
+        updates = []
+        for row in bind.execute(
+            sa.select(versions).where(versions.c.note_id == note_id).order_by(versions.c.version_number)
+        ):
+            if row.storage_format is None:
+                content = row.content
+            elif row.storage_format == FORMAT_FULL:
+                content = decompress_full(row.content_data)
+            else:
+                base = contents.get(row.base_version)
+                if base is None:
+                    logger.warning(f'笔记 {note_id} 的版本 {row.version_number} 缺少基准版本，无法还原')
+                    content = None
+                else:
+                    content = apply_delta(base, row.content_data)
+            contents[row.version_number] = content
+            if row.storage_format is not None and content is not None:
+                updates.append({'b_id': row.id, 'b_content': content})
+
+        if updates:
+            bind.execute(
+                versions.update().where(versions.c.id == sa.bindparam('b_id'))
+                .values(content=sa.bindparam('b_content')),
+                updates
+            )
+
+
+def downgrade():
+    existing = _existing_columns()
+    if {'storage_format', 'content_data'} <= existing:
+        _inflate_versions(op.get_bind())
+
+    with op.batch_alter_table('note_versions') as batch_op:
+        for column in reversed(_columns()):
+            if column.name in existing:
+                batch_op.drop_column(column.name)
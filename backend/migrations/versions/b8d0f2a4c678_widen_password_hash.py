@@ -0,0 +1,45 @@
+"""widen users.password_hash for configurable hash methods
+
+scrypt 等算法生成的哈希超过 128 个字符。
+
+Revision ID: b8d0f2a4c678
+Revises: a7c9e1f3b567
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d0f2a4c678'
+down_revision = 'a7c9e1f3b567'
+branch_labels = None
+depends_on = None
+
+
+def _password_hash_length(inspector):
+    for column in inspector.get_columns('users'):
+        if column['name'] == 'password_hash':
+            return getattr(column['type'], 'length', None)
+    return None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    length = _password_hash_length(inspector)
+
+    if length is not None and length < 256:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.alter_column('password_hash', existing_type=sa.String(length=length),
+                                  type_=sa.String(length=256))
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    length = _password_hash_length(inspector)
+
+    if length is not None and length > 128:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.alter_column('password_hash', existing_type=sa.String(length=length),
+                                  type_=sa.String(length=128))
@@ -0,0 +1,46 @@
+"""add version pinning and edit session columns
+
+已有版本全部视为固定版本，不会被合并或清理。
+
+Revision ID: c3e5a7b9d123
+Revises: b2d4f6a8c012
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d123'
+down_revision = 'b2d4f6a8c012'
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return [
+        sa.Column('is_pinned', sa.Boolean(), nullable=True, server_default=sa.true()),
+        sa.Column('edit_session', sa.String(length=64), nullable=True),
+    ]
+
+
+def _existing_columns():
+    inspector = sa.inspect(op.get_bind())
+    return {column['name'] for column in inspector.get_columns('note_versions')}
+
+
+def upgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table('note_versions') as batch_op:
+        for column in _columns():
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+
+def downgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table('note_versions') as batch_op:
+        for column in reversed(_columns()):
+            if column.name in existing:
+                batch_op.drop_column(column.name)
@@ -0,0 +1,80 @@
+"""add reminder delivery ledger and indexed remind_at for calendar events
+
+calendar_events 表存在时增加 remind_at 列、按已有数据回填并建立索引。
+
+Revision ID: c9e1a3b5d789
+Revises: b8d0f2a4c678
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from datetime import timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e1a3b5d789'
+down_revision = 'b8d0f2a4c678'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('reminder_deliveries'):
+        op.create_table(
+            'reminder_deliveries',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('event_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('remind_at', sa.DateTime(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=False),
+            sa.UniqueConstraint('event_id', 'remind_at', name='uq_reminder_deliveries_event_remind_at'),
+        )
+
+    if inspector.has_table('calendar_events'):
+        existing = {column['name'] for column in inspector.get_columns('calendar_events')}
+        if 'remind_at' not in existing:
+            with op.batch_alter_table('calendar_events') as batch_op:
+                batch_op.add_column(sa.Column('remind_at', sa.DateTime(), nullable=True))
+
+            events = sa.table(
+                'calendar_events',
+                sa.column('id', sa.Integer), sa.column('start_datetime', sa.DateTime),
+                sa.column('reminder_enabled', sa.Boolean), sa.column('reminder_minutes', sa.Integer),
+                sa.column('is_deleted', sa.Boolean), sa.column('remind_at', sa.DateTime),
+            )
+            rows = bind.execute(
+                sa.select(events.c.id, events.c.start_datetime, events.c.reminder_minutes).where(
+                    events.c.reminder_enabled == sa.true(), events.c.is_deleted == sa.false(),
+                    events.c.start_datetime.isnot(None)
+                )
+            ).all()
+            for event_id, start_datetime, reminder_minutes in rows:
+                bind.execute(
+                    events.update().where(events.c.id == event_id).values(
+                        remind_at=start_datetime - timedelta(minutes=reminder_minutes or 0)
+                    )
+                )
+
+        indexes = {index['name'] for index in inspector.get_indexes('calendar_events')}
+        if 'ix_calendar_events_remind_at' not in indexes:
+            op.create_index('ix_calendar_events_remind_at', 'calendar_events', ['remind_at'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table('calendar_events'):
+        indexes = {index['name'] for index in inspector.get_indexes('calendar_events')}
+        if 'ix_calendar_events_remind_at' in indexes:
+            op.drop_index('ix_calendar_events_remind_at', table_name='calendar_events')
+        existing = {column['name'] for column in inspector.get_columns('calendar_events')}
+        if 'remind_at' in existing:
+            with op.batch_alter_table('calendar_events') as batch_op:
+                batch_op.drop_column('remind_at')
+
+    if inspector.has_table('reminder_deliveries'):
+        op.drop_table('reminder_deliveries')
@@ -0,0 +1,34 @@
+"""create and backfill the per-user full-text search index
+
+SQLite 上创建 notes_fts（旧格式的索引表按当前格式重建），并按已有笔记回填；
+索引词的分词逻辑在应用代码中，因此直接调用 SearchService 重建。其他数据库使用 LIKE 查询，无需处理。
+
+Revision ID: d0f2b4c6e890
+Revises: c9e1a3b5d789
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0f2b4c6e890'
+down_revision = 'c9e1a3b5d789'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite' or not sa.inspect(bind).has_table('notes'):
+        return
+
+    from app.services.search_service import SearchService
+    SearchService.rebuild_index(connection=bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS notes_fts')
@@ -0,0 +1,73 @@
+"""add incrementally maintained note statistics tables
+
+汇总表首次读取或写入时按用户自动全量重建，迁移本身不回填数据。
+
+Revision ID: d4f6b8c0e234
+Revises: c3e5a7b9d123
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6b8c0e234'
+down_revision = 'c3e5a7b9d123'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if 'word_count' not in {column['name'] for column in inspector.get_columns('notes')}:
+        with op.batch_alter_table('notes') as batch_op:
+            batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+
+    if not inspector.has_table('user_note_stats'):
+        op.create_table(
+            'user_note_stats',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('total_notes', sa.Integer(), nullable=False),
+            sa.Column('total_words', sa.Integer(), nullable=False),
+            sa.Column('notes_with_content', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+
+    if not inspector.has_table('user_daily_note_stats'):
+        op.create_table(
+            'user_daily_note_stats',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('created_count', sa.Integer(), nullable=False),
+        )
+
+    if not inspector.has_table('user_tag_stats'):
+        op.create_table(
+            'user_tag_stats',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('tag_id', sa.Integer(), sa.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('note_count', sa.Integer(), nullable=False),
+        )
+
+    if not inspector.has_table('user_category_stats'):
+        op.create_table(
+            'user_category_stats',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id', ondelete='CASCADE'),
+                      primary_key=True),
+            sa.Column('note_count', sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table_name in ('user_category_stats', 'user_tag_stats', 'user_daily_note_stats', 'user_note_stats'):
+        if inspector.has_table(table_name):
+            op.drop_table(table_name)
+
+    if 'word_count' in {column['name'] for column in inspector.get_columns('notes')}:
+        with op.batch_alter_table('notes') as batch_op:
+            batch_op.drop_column('word_count')
@@ -0,0 +1,54 @@
+"""create calendar_events
+
+日历事件表不存在时创建（含带索引的 remind_at）；已有的表由 c9e1a3b5d789 补充 remind_at 列。
+
+Revision ID: e2b4d6f8a013
+Revises: d0f2b4c6e890
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b4d6f8a013'
+down_revision = 'd0f2b4c6e890'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('calendar_events'):
+        return
+
+    op.create_table(
+        'calendar_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('start_datetime', sa.DateTime(), nullable=False),
+        sa.Column('end_datetime', sa.DateTime(), nullable=False),
+        sa.Column('is_all_day', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('category', sa.String(length=50), nullable=True),
+        sa.Column('priority', sa.String(length=20), nullable=True),
+        sa.Column('color', sa.String(length=20), nullable=True),
+        sa.Column('is_recurring', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('recurrence_rule', sa.String(length=255), nullable=True),
+        sa.Column('reminder_enabled', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('reminder_minutes', sa.Integer(), nullable=True),
+        sa.Column('remind_at', sa.DateTime(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_calendar_events_remind_at', 'calendar_events', ['remind_at'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('calendar_events'):
+        op.drop_table('calendar_events')
@@ -0,0 +1,68 @@
+"""add content-addressed file storage tables
+
+已有的 uploads/<user_id>/<filename> 文件不迁移，仍按原路径提供访问。
+
+Revision ID: e5a7c9d1f345
+Revises: d4f6b8c0e234
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9d1f345'
+down_revision = 'd4f6b8c0e234'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('file_blobs'):
+        op.create_table(
+            'file_blobs',
+            sa.Column('sha256', sa.String(length=64), primary_key=True),
+            sa.Column('size', sa.BigInteger(), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+
+    if not inspector.has_table('user_files'):
+        op.create_table(
+            'user_files',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('filename', sa.String(length=64), nullable=False),
+            sa.Column('original_name', sa.String(length=255), nullable=True),
+            sa.Column('file_type', sa.String(length=20), nullable=True),
+            sa.Column('size', sa.BigInteger(), nullable=False),
+            sa.Column('blob_sha256', sa.String(length=64), sa.ForeignKey('file_blobs.sha256'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('user_id', 'filename', name='uq_user_files_user_filename'),
+        )
+        op.create_index('ix_user_files_blob_sha256', 'user_files', ['blob_sha256'])
+
+    if not inspector.has_table('upload_sessions'):
+        op.create_table(
+            'upload_sessions',
+            sa.Column('id', sa.String(length=32), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('original_name', sa.String(length=255), nullable=False),
+            sa.Column('total_size', sa.BigInteger(), nullable=False),
+            sa.Column('received_size', sa.BigInteger(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_upload_sessions_user_id', 'upload_sessions', ['user_id'])
+        op.create_index('ix_upload_sessions_updated_at', 'upload_sessions', ['updated_at'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table_name in ('upload_sessions', 'user_files', 'file_blobs'):
+        if inspector.has_table(table_name):
+            op.drop_table(table_name)
@@ -0,0 +1,38 @@
+"""add per-user notes data version for conditional list responses
+
+Revision ID: f6b8d0e2a456
+Revises: e5a7c9d1f345
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b8d0e2a456'
+down_revision = 'e5a7c9d1f345'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('users')}
+
+    with op.batch_alter_table('users') as batch_op:
+        if 'notes_version' not in existing:
+            batch_op.add_column(sa.Column('notes_version', sa.Integer(), nullable=False, server_default='0'))
+        if 'notes_modified_at' not in existing:
+            batch_op.add_column(sa.Column('notes_modified_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('users')}
+
+    with op.batch_alter_table('users') as batch_op:
+        if 'notes_modified_at' in existing:
+            batch_op.drop_column('notes_modified_at')
+        if 'notes_version' in existing:
+            batch_op.drop_column('notes_version')
@@ -1,4 +1,5 @@
 import os
+import click
 from app import create_app, db
 from flask_migrate import upgrade
 
@@ -10,5 +11,289 @@ def make_shell_context():
     """为Flask shell添加上下文"""
     return dict(app=app, db=db)
 
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """重建笔记全文索引"""
+    from app.services.search_service import SearchService
+    if SearchService.rebuild_index():
+        print('全文索引重建完成')
+    else:
+        print('当前数据库不支持全文索引，将使用 LIKE 查询')
+
+@app.cli.command('compact-note-versions')
+def compact_note_versions():
+    """将已有版本历史转换为压缩的关键帧加差异格式"""
+    from app.models import NoteVersion
+    note_ids = [row[0] for row in db.session.query(NoteVersion.note_id).distinct()]
+    total = 0
+    for note_id in note_ids:
+        total += NoteVersion.compact_note_versions(note_id)
+        db.session.commit()
+    print(f'已压缩 {len(note_ids)} 篇笔记的 {total} 个版本')
+
+@app.cli.command('prune-note-versions')
+def prune_note_versions():
+    """按保留策略清理自动保存产生的旧版本"""
+    from app.models import NoteVersion
+    note_ids = [row[0] for row in db.session.query(NoteVersion.note_id).distinct()]
+    total = 0
+    for note_id in note_ids:
+        total += NoteVersion.prune_note_versions(note_id)
+        db.session.commit()
+    print(f'已清理 {total} 个旧版本')
+
+@app.cli.command('purge-trash')
+def purge_trash():
+    """永久删除所有用户超过保留期的回收站笔记"""
+    from app.services.bulk_service import BulkNoteService
+    print(f'已清理 {BulkNoteService.purge_expired_trash()} 篇过期的回收站笔记')
+
+@app.cli.command('prune-sync-log')
+def prune_sync_log():
+    """清理超过保留期的增量同步变更日志"""
+    from app.services.sync_service import SyncService
+    print(f'已清理 {SyncService.prune()} 条变更日志')
+
+@app.cli.command('purge-file-storage')
+def purge_file_storage():
+    """删除不再被引用的文件数据块和过期的分片上传会话"""
+    from app.services.file_storage import FileStorageService
+    blobs, sessions = FileStorageService.purge_unused()
+    print(f'已清理 {blobs} 个未引用的数据块和 {sessions} 个过期上传会话')
+
+@app.cli.command('generate-image-derivatives')
+def generate_image_derivatives():
+    """为已上传的图片补充生成缩略图"""
+    from app.models import UserFile
+    from app.services.file_storage import FileStorageService
+    from app.services.image_derivatives import ImageDerivativeService, render_all
+    if not ImageDerivativeService.is_available():
+        print('未安装 Pillow，无法生成缩略图')
+        return
+    rows = db.session.query(UserFile.blob_sha256, db.func.min(UserFile.filename)).filter(
+        UserFile.file_type == 'images'
+    ).group_by(UserFile.blob_sha256).all()
+    total = 0
+    for sha256, filename in rows:
+        if ImageDerivativeService.supports(filename):
+            render_all(FileStorageService.blob_path(sha256), ImageDerivativeService.sizes(),
+                       app.config['IMAGE_WEBP_QUALITY'])
+            total += 1
+    print(f'已处理 {total} 张图片')
+
+@app.cli.command('import-notes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='导入到该用户名下')
+@click.option('--format', 'import_format', default=None, help='jsonl、markdown 或 enex，默认按扩展名识别')
+@click.option('--batch-size', default=None, type=int, help='每批（每个事务）导入的笔记数')
+def import_notes(path, username, import_format, batch_size):
+    """从 JSON Lines、Markdown 压缩包或 Evernote ENEX 文件批量导入笔记"""
+    import time
+    from app.models import User
+    from app.services.event_stream import EventStream, EVENT_NOTES_CHANGED
+    from app.services.import_service import ImportService
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        print(f'用户不存在: {username}')
+        return
+    import_format = ImportService.detect_format(path, import_format)
+    if import_format is None:
+        print('无法识别导入格式，请通过 --format 指定')
+        return
+
+    started = time.perf_counter()
+
+    def report(imported):
+        print(f'已导入 {imported} 篇（{imported / (time.perf_counter() - started):.0f} 篇/秒）')
+
+    with open(path, 'rb') as f:
+        imported = ImportService.import_notes(user.id, ImportService.parse(import_format, f, user.id),
+                                              batch_size, progress=report)
+    User.touch_notes(user.id)
+    db.session.commit()
+    EventStream.publish(user.id, EVENT_NOTES_CHANGED)
+    print(f'导入完成：{imported} 篇，用时 {time.perf_counter() - started:.1f} 秒')
+
+@app.cli.command('benchmark-auth')
+@click.option('--requests', 'total', default=1000, help='每种配置的请求次数')
+def benchmark_auth(total):
+    """测量 /api/auth/me 每个请求的耗时和 users 表查询次数（关闭与开启用户缓存对比）"""
+    import threading
+    import time
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+    from app.models import User
+    user = User.query.first()
+    if user is None:
+        print('数据库中没有用户')
+        return
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    client = app.test_client()
+    queries = []
+    results = []
+
+    def count_user_queries(conn, cursor, statement, *args):
+        if 'FROM users' in statement:
+            queries.append(statement)
+
+    def run_requests():
+        # 在新线程中发送请求，每个请求使用独立的应用上下文（与命令行所在的上下文隔离）
+        client.get('/api/auth/me', headers=headers)
+        queries.clear()
+        started = time.perf_counter()
+        for _ in range(total):
+            client.get('/api/auth/me', headers=headers)
+        results.append((time.perf_counter() - started, len(queries)))
+
+    event.listen(db.engine, 'before_cursor_execute', count_user_queries)
+    configured_ttl = app.config['USER_CACHE_TTL']
+    try:
+        for label, ttl in (('无缓存', 0), (f'缓存 {configured_ttl}s', configured_ttl)):
+            app.config['USER_CACHE_TTL'] = ttl
+            worker = threading.Thread(target=run_requests)
+            worker.start()
+            worker.join()
+            elapsed, user_queries = results.pop()
+            print(f'{label}: {elapsed / total * 1000:.3f} ms/请求, users 查询 {user_queries / total:.2f} 次/请求')
+    finally:
+        app.config['USER_CACHE_TTL'] = configured_ttl
+        event.remove(db.engine, 'before_cursor_execute', count_user_queries)
+
+@app.cli.command('benchmark-password-hash')
+@click.option('--seconds', default=3.0, help='每项测量的持续秒数')
+@click.option('--method', default=None, help='要评估的哈希算法及参数，默认使用 PASSWORD_HASH_METHOD')
+def benchmark_password_hash(seconds, method):
+    """测量密码校验吞吐量：单线程（每核）和全部校验线程并发时每秒可处理的登录数"""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.security import generate_password_hash, check_password_hash
+    method = method or app.config['PASSWORD_HASH_METHOD']
+    password_hash = generate_password_hash('benchmark-password', method=method,
+                                           salt_length=app.config['PASSWORD_SALT_LENGTH'])
+
+    def verify_for(duration):
+        count = 0
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            check_password_hash(password_hash, 'benchmark-password')
+            count += 1
+        return count
+
+    per_core = verify_for(seconds) / seconds
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        total = sum(executor.map(verify_for, [seconds] * workers)) / seconds
+    print(f'{method}: 单核 {per_core:.1f} 次登录/秒（每次 {1000 / per_core:.1f} ms），'
+          f'{workers} 个校验线程合计 {total:.1f} 次登录/秒')
+
+@app.cli.command('benchmark-database')
+@click.option('--threads', default=8, help='并发请求的线程数')
+@click.option('--seconds', default=10.0, help='测量的持续秒数')
+@click.option('--write-ratio', default=0.2, help='写请求（新建或修改笔记）所占比例')
+@click.option('--config', 'config_name', default='production',
+              type=click.Choice(['production', 'development', 'testing']), help='使用哪个环境的数据库连接参数')
+def benchmark_database(threads, seconds, write_ratio, config_name):
+    """并发读写压测：多个线程混合读取和修改笔记，统计吞吐量、延迟和数据库锁错误（关闭响应缓存）
+
+    压测在临时目录中新建的 SQLite 数据库上进行，结束后整个删除，不会读写当前配置的数据库；
+    --config development 使用 SQLite 默认参数，可作为 production 调优参数的对照
+    """
+    import random
+    import shutil
+    import tempfile
+    import threading
+    import time
+    from flask_jwt_extended import create_access_token
+    from app.models import User
+    from app.services.database_service import DatabaseService
+
+    scratch_dir = tempfile.mkdtemp(prefix='notes-benchmark-')
+    bench_app = create_app(config_name, {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(scratch_dir, 'benchmark.db')}",
+        'SQLALCHEMY_ENGINE_OPTIONS': None,
+        'UPLOAD_FOLDER': os.path.join(scratch_dir, 'uploads'),
+        'RESPONSE_CACHE_BACKEND': 'none',
+        'REMINDER_SCHEDULER_ENABLED': False,
+    })
+    note_ids = []
+    lock = threading.Lock()
+    results = []
+
+    def create(client, headers, number):
+        response = client.post('/api/notes/', headers=headers, json={
+            'title': f'压测笔记 {number}', 'content': 'benchmark ' * 50, 'tags': ['benchmark']
+        })
+        return response.status_code, response.get_json().get('id') if response.status_code == 201 else None
+
+    def run_requests(seed, headers):
+        # 每个线程使用独立的客户端和应用上下文，相当于 gunicorn 的一个 worker 线程
+        client = bench_app.test_client()
+        rng = random.Random(seed)
+        reads, writes, errors, latencies = 0, 0, 0, []
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    if rng.random() < 0.5:
+                        status, note_id = create(client, headers, rng.randrange(10 ** 6))
+                        if note_id:
+                            with lock:
+                                note_ids.append(note_id)
+                    else:
+                        status = client.put(f'/api/notes/{rng.choice(note_ids)}', headers=headers, json={
+                            'content': f'benchmark {rng.random()}'
+                        }).status_code
+                    writes += 1
+                elif rng.random() < 0.5:
+                    status = client.get(f'/api/notes/{rng.choice(note_ids)}', headers=headers).status_code
+                    reads += 1
+                else:
+                    status = client.get('/api/notes/?per_page=20', headers=headers).status_code
+                    reads += 1
+                if status >= 500:
+                    errors += 1
+            except Exception:
+                # 调试模式下未处理的异常（如 database is locked）会直接抛出
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        results.append((reads, writes, errors, latencies))
+
+    try:
+        with bench_app.app_context():
+            db.create_all()
+            user = User(username='benchmark', email='benchmark@localhost')
+            user.password = os.urandom(16).hex()
+            db.session.add(user)
+            db.session.commit()
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+            print(DatabaseService.stats(db.engine))
+
+            seed_client = bench_app.test_client()
+            for number in range(50):
+                note_ids.append(create(seed_client, headers, number)[1])
+            db.session.remove()
+
+            workers = [threading.Thread(target=run_requests, args=(seed, headers)) for seed in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    reads = sum(result[0] for result in results)
+    writes = sum(result[1] for result in results)
+    errors = sum(result[2] for result in results)
+    latencies = sorted(latency for result in results for latency in result[3])
+    if not latencies:
+        return
+    print(f'{threads} 个线程 {seconds:.0f} 秒：读 {reads / seconds:.1f} 次/秒，写 {writes / seconds:.1f} 次/秒，'
+          f'错误 {errors} 次；延迟 p50 {latencies[len(latencies) // 2] * 1000:.1f} ms，'
+          f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms，'
+          f'最大 {latencies[-1] * 1000:.1f} ms')
+
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True) 
@@ -0,0 +1,96 @@
+"""
+测试夹具：每个测试使用独立的内存 SQLite 数据库和应用实例
+"""
+import os
+from contextlib import contextmanager
+
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+
+import pytest
+from flask import g
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import User
+from app.services import auth_service, search_service, taxonomy_service
+from app.services.event_stream import EventStream
+from app.services.reminder_service import ReminderService
+from app.services.response_cache import ResponseCache
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+
+    @app.before_request
+    def reset_request_globals():
+        # 用例在同一个应用上下文中发送多个请求，g 需在每个请求开始时清空（生产环境每个请求的应用上下文都是新的）
+        for name in list(g):
+            g.pop(name)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        ReminderService.stop_scheduler()
+        db.session.remove()
+        db.drop_all()
+
+    # 进程内缓存以用户ID等为键，每个测试的数据库都从ID 1 开始，需清空以免读到上一个测试的数据
+    auth_service._cache.clear()
+    taxonomy_service._cache.clear()
+    search_service._ready_engines.clear()
+    ResponseCache._backend = None
+    EventStream._broker = None
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='alice', email='alice@example.com')
+    user.password = 'password123'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+@pytest.fixture
+def create_notes(client, auth_headers):
+    """通过接口创建笔记，返回笔记ID列表"""
+    def create(count, **fields):
+        note_ids = []
+        for number in range(count):
+            response = client.post('/api/notes/', headers=auth_headers, json={
+                'title': f'笔记 {number}', 'content': f'searchable content {number}', **fields
+            })
+            assert response.status_code == 201
+            note_ids.append(response.get_json()['id'])
+        return note_ids
+    return create
+
+
+@pytest.fixture
+def count_queries(app):
+    """统计代码块内执行的 SQL 语句：with count_queries() as statements: ..."""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return counter
@@ -0,0 +1,21 @@
+"""
+批量操作：回收站中的笔记不参与标签和分类的批量修改
+"""
+from app import db
+from app.models import Note, UserTagStats
+
+
+def test_bulk_tagging_skips_trashed_notes(client, auth_headers, create_notes):
+    active_id, trashed_id = create_notes(2)
+    client.get('/api/notes/stats', headers=auth_headers)
+    response = client.post('/api/notes/bulk/delete', headers=auth_headers, json={'ids': [trashed_id]})
+    assert response.status_code == 200
+
+    response = client.post('/api/notes/bulk/tags/add', headers=auth_headers,
+                           json={'ids': [active_id, trashed_id], 'tags': ['工作']})
+    body = response.get_json()
+    assert body['results'] == {str(active_id): 'ok', str(trashed_id): 'not_found'}
+    assert body['success_count'] == 1
+
+    assert [tag.name for tag in db.session.get(Note, trashed_id).tags] == []
+    assert [stats.note_count for stats in UserTagStats.query.all()] == [1]
@@ -0,0 +1,47 @@
+"""
+列表接口的条件请求：数据未变化时返回 304
+"""
+from app.models import User
+
+
+def test_list_stays_not_modified_after_unchanged_save(client, auth_headers, create_notes):
+    note_id = create_notes(2)[0]
+    response = client.get('/api/notes/', headers=auth_headers)
+    assert response.status_code == 200
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+    response = client.put(f'/api/notes/{note_id}', headers=auth_headers, json={'title': '笔记 0'})
+    assert response.status_code == 200
+
+    response = client.get('/api/notes/', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    response = client.get('/api/notes/', headers={**auth_headers, 'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+    response = client.put(f'/api/notes/{note_id}', headers=auth_headers, json={'title': '已修改'})
+    assert response.status_code == 200
+
+    response = client.get('/api/notes/', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_etag_and_cached_body_share_one_version_read(client, auth_headers, create_notes, monkeypatch):
+    create_notes(1)
+    reads = []
+    get_notes_version = User.get_notes_version
+
+    def counting_get_notes_version(user_id):
+        reads.append(user_id)
+        return get_notes_version(user_id)
+
+    monkeypatch.setattr(User, 'get_notes_version', staticmethod(counting_get_notes_version))
+
+    first = client.get('/api/notes/', headers=auth_headers)
+    second = client.get('/api/notes/', headers=auth_headers)
+
+    # 每个请求只读取一次版本号，缓存键与 ETag 由同一个值生成
+    assert len(reads) == 2
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.get_data() == first.get_data()
@@ -0,0 +1,29 @@
+"""
+SQLite 连接参数：调优的 PRAGMA 只在生产配置中启用
+"""
+from app import create_app, db
+from app.services.database_service import DatabaseService
+
+
+def _pragmas(config_name, path):
+    app = create_app(config_name, {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        pragmas = DatabaseService.stats(db.engine)['pragmas']
+        db.engine.dispose()
+    return pragmas
+
+
+def test_development_and_testing_keep_sqlite_defaults(tmp_path):
+    for config_name in ('development', 'testing'):
+        pragmas = _pragmas(config_name, tmp_path / f'{config_name}.db')
+        assert pragmas['journal_mode'] == 'delete'
+        assert pragmas['mmap_size'] == 0
+        assert pragmas['busy_timeout'] == 5000
+
+
+def test_production_enables_wal_profile(tmp_path):
+    pragmas = _pragmas('production', tmp_path / 'production.db')
+    assert pragmas['journal_mode'] == 'wal'
+    assert pragmas['synchronous'] == 1
+    assert pragmas['cache_size'] == -64 * 1024
+    assert pragmas['mmap_size'] == 256 * 1024 * 1024
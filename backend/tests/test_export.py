@@ -0,0 +1,71 @@
+"""
+笔记导出：Markdown 压缩包和 JSON Lines 导出后可重新导入，XLSX 工作表带表头
+"""
+import io
+import json
+import zipfile
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import Note, User
+
+
+def _export(client, auth_headers, export_format, **options):
+    response = client.post('/api/export/notes', headers=auth_headers, json={'format': export_format, **options})
+    assert response.status_code == 200
+    return response.get_data()
+
+
+def _other_user_headers():
+    other = User(username='bob', email='bob@example.com')
+    other.password = 'password123'
+    db.session.add(other)
+    db.session.commit()
+    return other, {'Authorization': f'Bearer {create_access_token(identity=str(other.id))}'}
+
+
+def _snapshot(user_id):
+    notes = Note.query.filter_by(user_id=user_id).order_by(Note.title).all()
+    return [(
+        note.title, note.content, sorted(tag.name for tag in note.tags),
+        sorted(category.name for category in note.categories)
+    ) for note in notes]
+
+
+@pytest.fixture
+def exported_notes(client, auth_headers, create_notes):
+    create_notes(1, title='周报', content='# 本周\n\n- 完成导出\n- 修复: 冒号', tags=['工作', '周报'], categories=['项目'])
+    create_notes(1, title='读书笔记', content='第一行\n第二行', tags=['阅读'])
+
+
+def _round_trip(client, auth_headers, user, export_format, filename):
+    data = _export(client, auth_headers, export_format)
+    other, other_headers = _other_user_headers()
+    response = client.post('/api/notes/import', headers=other_headers, content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(data), filename)})
+    assert response.status_code == 201
+    assert response.get_json()['imported'] == 2
+    assert _snapshot(other.id) == _snapshot(user.id)
+    return data
+
+
+def test_markdown_zip_export_imports_back(client, auth_headers, user, exported_notes):
+    data = _round_trip(client, auth_headers, user, 'markdown', 'notes.zip')
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert all(name.endswith('.md') for name in archive.namelist())
+
+
+def test_jsonl_export_imports_back(client, auth_headers, user, exported_notes):
+    data = _round_trip(client, auth_headers, user, 'jsonl', 'notes.jsonl')
+    assert [json.loads(line)['title'] for line in data.decode().splitlines()] == ['周报', '读书笔记']
+
+
+def test_xlsx_export_has_header_row(client, auth_headers, exported_notes):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.load_workbook(io.BytesIO(_export(client, auth_headers, 'xlsx')), read_only=True)
+    rows = list(workbook['笔记'].values)
+    assert rows[0] == ('ID', '标题', '内容', '标签', '分类', '创建时间', '更新时间', '已删除')
+    assert [row[1] for row in rows[1:]] == ['周报', '读书笔记']
+    assert rows[1][3] == '工作, 周报'
@@ -0,0 +1,56 @@
+"""
+内容寻址文件存储：引用计数与清理任务并发时数据块文件保持存在
+"""
+import io
+import os
+
+import pytest
+
+from app import db
+from app.models import FileBlob
+from app.services.file_storage import FileStorageService
+
+
+@pytest.fixture
+def storage(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    return tmp_path
+
+
+def _upload(user, content):
+    user_file = FileStorageService.save_upload(user.id, io.BytesIO(content), 'a.txt', 'documents')
+    db.session.commit()
+    return user_file
+
+
+def test_upload_restores_blob_removed_by_concurrent_purge(storage, user, monkeypatch):
+    first = _upload(user, b'same content')
+    blob_path = FileStorageService.blob_path(first.blob_sha256)
+    FileStorageService.delete_user_file(first)
+    db.session.commit()
+
+    # 清理任务在新上传看到数据块文件之后、写入引用计数之前删除了文件
+    increment = FileStorageService._increment_ref_count
+
+    def purge_then_increment(sha256, delta=1):
+        if os.path.exists(blob_path):
+            os.remove(blob_path)
+        return increment(sha256, delta)
+
+    monkeypatch.setattr(FileStorageService, '_increment_ref_count', staticmethod(purge_then_increment))
+    second = _upload(user, b'same content')
+
+    assert db.session.get(FileBlob, second.blob_sha256).ref_count == 1
+    assert FileStorageService.resolve_path(user.id, second.filename) == blob_path
+
+
+def test_purge_removes_unreferenced_blobs_only(storage, user):
+    kept = _upload(user, b'kept')
+    removed = _upload(user, b'removed')
+    FileStorageService.delete_user_file(removed)
+    db.session.commit()
+
+    assert FileStorageService.purge_unused() == (1, 0)
+    assert db.session.get(FileBlob, removed.blob_sha256) is None
+    assert not os.path.exists(FileStorageService.blob_path(removed.blob_sha256))
+    assert FileStorageService.resolve_path(user.id, kept.filename) is not None
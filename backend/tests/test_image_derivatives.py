@@ -0,0 +1,79 @@
+"""
+图片缩略图：?size= 返回 WebP 衍生图，无效尺寸报错，非图片文件回退到原文件，已生成的衍生图直接复用
+"""
+import io
+
+import pytest
+
+from app import db
+from app.services import image_derivatives
+from app.services.file_storage import FileStorageService
+
+Image = pytest.importorskip('PIL.Image')
+
+
+@pytest.fixture
+def storage(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    return tmp_path
+
+
+def _upload(user, content, filename, file_type):
+    user_file = FileStorageService.save_upload(user.id, io.BytesIO(content), filename, file_type)
+    db.session.commit()
+    return user_file
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _get(client, auth_headers, user_file, size):
+    return client.get(f'/api/notes/files/{user_file.user_id}/{user_file.filename}',
+                      headers=auth_headers, query_string={'size': size})
+
+
+def test_valid_size_returns_webp_thumbnail(app, storage, client, user, auth_headers):
+    user_file = _upload(user, _png(800, 400), 'photo.png', 'images')
+
+    response = _get(client, auth_headers, user_file, 'small')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    assert response.get_etag()[0] == f'{user_file.blob_sha256}-small'
+    with Image.open(io.BytesIO(response.get_data())) as thumbnail:
+        assert thumbnail.format == 'WEBP'
+        assert thumbnail.size == (160, 80)
+
+
+def test_invalid_size_is_rejected(storage, client, user, auth_headers):
+    user_file = _upload(user, _png(100, 100), 'photo.png', 'images')
+
+    response = _get(client, auth_headers, user_file, 'huge')
+    assert response.status_code == 400
+    assert 'small' in response.get_json()['error']
+
+
+def test_non_image_file_ignores_size(storage, client, user, auth_headers):
+    user_file = _upload(user, b'plain text', 'notes.txt', 'documents')
+
+    response = _get(client, auth_headers, user_file, 'small')
+    assert response.status_code == 200
+    assert response.get_data() == b'plain text'
+    assert response.get_etag()[0] == user_file.blob_sha256
+
+
+def test_cached_derivative_is_reused(storage, client, user, auth_headers, monkeypatch):
+    user_file = _upload(user, _png(800, 400), 'photo.png', 'images')
+    first = _get(client, auth_headers, user_file, 'medium')
+    assert first.status_code == 200
+
+    def fail_render(*args, **kwargs):
+        raise AssertionError('已生成的衍生图不应重新生成')
+
+    monkeypatch.setattr(image_derivatives, 'render_derivative', fail_render)
+    second = _get(client, auth_headers, user_file, 'medium')
+    assert second.status_code == 200
+    assert second.mimetype == 'image/webp'
+    assert second.get_data() == first.get_data()
@@ -0,0 +1,65 @@
+"""
+Markdown 压缩包导入：解压大小受限，超限时不写入任何笔记
+"""
+import io
+import zipfile
+
+from app.models import Note
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def _import(client, auth_headers, files):
+    return client.post('/api/notes/import', headers=auth_headers, content_type='multipart/form-data',
+                       data={'file': (_zip(files), 'notes.zip')})
+
+
+def test_markdown_zip_imports_notes(client, auth_headers):
+    response = _import(client, auth_headers, {'a.md': '# 标题\n正文', 'b.md': '正文'})
+    assert response.status_code == 201
+    assert response.get_json()['imported'] == 2
+
+
+def test_markdown_zip_rejects_oversized_note(app, client, auth_headers):
+    app.config['UPLOAD_MAX_SIZE'] = 1024
+    response = _import(client, auth_headers, {'a.md': 'small', 'big.md': 'x' * 4096})
+    assert response.status_code == 400
+    assert 'big.md' in response.get_json()['error']
+    assert Note.query.count() == 0
+
+
+def test_markdown_zip_rejects_large_total_size(app, client, auth_headers):
+    app.config['IMPORT_MAX_UNCOMPRESSED_SIZE'] = 8 * 1024
+    files = {f'{number}.md': 'x' * 1024 for number in range(10)}
+    response = _import(client, auth_headers, files)
+    assert response.status_code == 400
+    assert Note.query.count() == 0
+
+
+def test_batch_import_pairs_returned_ids_by_row_content(app, user, monkeypatch):
+    """RETURNING 的行顺序不保证与输入一致，标签仍关联到各自的笔记"""
+    from app import db
+    from app.services.import_service import ImportService, _record
+
+    execute = db.session.execute
+
+    def reversed_returning(statement, *args, **kwargs):
+        result = execute(statement, *args, **kwargs)
+        if getattr(statement, '_returning', None) and statement.table.name == 'notes':
+            return list(reversed(result.all()))
+        return result
+
+    monkeypatch.setattr(db.session, 'execute', reversed_returning)
+    records = [_record(title=f'笔记{number}', content='正文', tags=[f'标签{number}']) for number in range(3)]
+    assert ImportService.import_notes(user.id, records) == 3
+    monkeypatch.undo()
+
+    for note in Note.query.all():
+        assert [tag.name for tag in note.tags] == [note.title.replace('笔记', '标签')]
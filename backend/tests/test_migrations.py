@@ -0,0 +1,45 @@
+"""
+迁移：模型与最新迁移一致，自动生成迁移时不把全文索引表当作多余的表删除
+"""
+import os
+
+from flask_migrate import check, downgrade, stamp
+
+from app import db
+from app.models import Note
+from app.services.search_service import SearchService
+
+
+def test_autogenerate_ignores_search_index_tables(app):
+    assert SearchService.rebuild_index()
+    assert db.session.execute(db.text(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name LIKE 'notes_fts%'"
+    )).scalar() > 1
+
+    directory = os.path.join(app.root_path, '..', 'migrations')
+    stamp(directory=directory)
+    # 检测到待生成的迁移操作时 flask_migrate.check 以 SystemExit 退出
+    check(directory=directory)
+
+
+def test_version_compression_downgrade_restores_plain_content(app, user):
+    note = Note(title='草稿', content='第一行\n', user_id=user.id)
+    db.session.add(note)
+    db.session.flush()
+    texts = []
+    for number in range(5):
+        note.content = ''.join(f'第 {line} 行\n' for line in range(number + 3))
+        texts.append(note.content)
+        note.create_version()
+        db.session.flush()
+    db.session.commit()
+    assert {version.storage_format for version in note.versions} == {'full', 'delta'}
+
+    directory = os.path.join(app.root_path, '..', 'migrations')
+    stamp(directory=directory)
+    downgrade(directory=directory, revision='a1c3e5f7b901')
+
+    rows = db.session.execute(db.text(
+        'SELECT content FROM note_versions WHERE note_id = :note_id ORDER BY version_number'
+    ), {'note_id': note.id}).scalars().all()
+    assert rows == texts
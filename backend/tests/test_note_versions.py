@@ -0,0 +1,94 @@
+"""
+版本历史：清理和重新压缩后剩余版本仍还原为原始内容；同一会话的连续自动保存合并为一个版本
+"""
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import Note, NoteVersion
+
+
+def _stored_contents(note_id):
+    """从数据库重新读取版本并还原内容，返回 版本号 -> 内容"""
+    db.session.expire_all()
+    versions = NoteVersion.query.filter_by(note_id=note_id).order_by(NoteVersion.version_number).all()
+    return {version.version_number: version.get_content() for version in versions}
+
+
+def test_versions_decode_after_prune_and_compaction(app, user):
+    app.config['VERSION_KEYFRAME_INTERVAL'] = 3
+    now = datetime.utcnow()
+    note = Note(title='草稿', content='', user_id=user.id)
+    db.session.add(note)
+    db.session.flush()
+
+    # 12 个自动版本分布在两天前的两个小时内，其中第 5 个为固定版本
+    expected = {}
+    for number in range(1, 13):
+        note.content = '\n'.join(f'第 {line} 行：{"修改" if line == number else "原文"}' for line in range(50))
+        version = note.create_version(pinned=number == 5)
+        version.created_at = now - timedelta(days=2, hours=2 if number <= 6 else 1, minutes=60 - number)
+        db.session.flush()
+        expected[number] = note.content
+    db.session.commit()
+
+    versions = NoteVersion.query.filter_by(note_id=note.id).order_by(NoteVersion.version_number)
+    assert [version.storage_format for version in versions] == ['full', 'delta', 'delta'] * 4
+    assert _stored_contents(note.id) == expected
+
+    removed = NoteVersion.prune_note_versions(note.id, now=now)
+    db.session.commit()
+    assert removed > 0
+
+    remaining = _stored_contents(note.id)
+    assert 5 in remaining and 12 in remaining
+    assert len(remaining) == len(expected) - removed
+    assert remaining == {number: expected[number] for number in remaining}
+
+    NoteVersion.compact_note_versions(note.id)
+    db.session.commit()
+    assert _stored_contents(note.id) == remaining
+
+
+def _save(client, headers, note_id, content):
+    response = client.put(f'/api/notes/{note_id}', headers=headers, json={'content': content})
+    assert response.status_code == 200
+
+
+def _versions(client, headers, note_id):
+    response = client.get(f'/api/notes/{note_id}/versions', headers=headers)
+    return sorted(response.get_json()['versions'], key=lambda version: version['version_number'])
+
+
+def test_autosaves_in_one_session_coalesce(client, auth_headers, create_notes):
+    note_id, = create_notes(1)
+    initial = _versions(client, auth_headers, note_id)
+
+    for number in range(5):
+        _save(client, auth_headers, note_id, f'自动保存 {number}')
+
+    # 连续保存只保留第一次保存前的内容
+    versions = _versions(client, auth_headers, note_id)
+    assert len(versions) == len(initial) + 1
+    assert versions[-1]['content'] == 'searchable content 0'
+
+
+def test_autosave_starts_new_version_after_window_or_new_session(app, client, user, auth_headers, create_notes):
+    note_id, = create_notes(1)
+    _save(client, auth_headers, note_id, '第一次')
+    count = len(_versions(client, auth_headers, note_id))
+
+    # 超过合并窗口
+    latest = NoteVersion.query.filter_by(note_id=note_id).order_by(NoteVersion.version_number.desc()).first()
+    latest.created_at -= timedelta(minutes=app.config['VERSION_COALESCE_MINUTES'] + 1)
+    db.session.commit()
+    _save(client, auth_headers, note_id, '第二次')
+    assert len(_versions(client, auth_headers, note_id)) == count + 1
+
+    # 另一个登录会话（不同的令牌）
+    other_headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    _save(client, other_headers, note_id, '第三次')
+    versions = _versions(client, auth_headers, note_id)
+    assert len(versions) == count + 2
+    assert [version['content'] for version in versions[-3:]] == ['searchable content 0', '第一次', '第二次']
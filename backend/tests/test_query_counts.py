@@ -0,0 +1,38 @@
+"""
+列表接口的查询次数不随笔记数量增长（避免 N+1 查询）
+"""
+import pytest
+
+
+def _query_count(client, count_queries, url, headers):
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+@pytest.mark.parametrize('url', ['/api/notes/', '/api/notes/search?q=searchable'])
+def test_note_lists_use_constant_queries(client, auth_headers, create_notes, count_queries, url):
+    create_notes(1, tags=['a', 'b'], categories=['工作'])
+    single, _ = _query_count(client, count_queries, url, auth_headers)
+
+    create_notes(49, tags=['a', 'b'], categories=['工作'])
+    many, body = _query_count(client, count_queries, url, auth_headers)
+
+    assert len(body['notes']) >= 20
+    assert many == single
+
+
+def test_trash_uses_constant_queries(client, auth_headers, create_notes, count_queries):
+    def trash(note_ids):
+        response = client.post('/api/notes/bulk/delete', headers=auth_headers, json={'ids': note_ids})
+        assert response.status_code == 200
+
+    trash(create_notes(1, tags=['a'], categories=['工作']))
+    single, _ = _query_count(client, count_queries, '/api/notes/trash', auth_headers)
+
+    trash(create_notes(49, tags=['a'], categories=['工作']))
+    many, body = _query_count(client, count_queries, '/api/notes/trash', auth_headers)
+
+    assert len(body['notes']) >= 20
+    assert many == single
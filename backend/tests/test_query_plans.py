@@ -0,0 +1,63 @@
+"""
+热点接口的查询在迁移后的数据库上走索引（EXPLAIN QUERY PLAN 中没有全表扫描）
+"""
+import os
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import event, text
+
+from app import db
+
+# 迁移 a1c3e5f7b901 补建的索引：先删除以模拟迁移前的数据库，再执行迁移
+HOT_INDEXES = [
+    'ix_notes_user_deleted_updated', 'ix_notes_user_deleted_deleted_at', 'ix_notes_user_deleted_created',
+    'ix_note_tags_tag_id', 'ix_note_categories_category_id', 'ix_categories_user_parent_name',
+]
+
+
+@pytest.fixture
+def migrated(app):
+    for name in HOT_INDEXES:
+        db.session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    db.session.commit()
+    upgrade(directory=os.path.join(app.root_path, '..', 'migrations'))
+
+
+def _plans(client, url, headers):
+    """请求接口并返回其中每条 SELECT 语句的查询计划"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+
+    with db.engine.connect() as connection:
+        return [
+            (statement, [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)])
+            for statement, parameters in statements
+        ]
+
+
+def test_hot_routes_use_indexes(migrated, client, auth_headers, create_notes):
+    note_ids = create_notes(5, tags=['a'], categories=['工作'])
+    client.put(f'/api/notes/{note_ids[0]}', headers=auth_headers, json={'content': 'edited'})
+    client.post('/api/notes/bulk/delete', headers=auth_headers, json={'ids': note_ids[-2:]})
+
+    urls = ['/api/notes/', '/api/notes/trash', f'/api/notes/{note_ids[0]}/versions', '/api/notes/categories']
+    for url in urls:
+        plans = _plans(client, url, auth_headers)
+        assert plans, url
+        for statement, plan in plans:
+            for detail in plan:
+                if detail.startswith(('SCAN', 'SEARCH')):
+                    assert 'USING INDEX' in detail or 'USING COVERING INDEX' in detail \
+                        or 'USING INTEGER PRIMARY KEY' in detail, f'{url}: {detail}\n{statement}'
+                    assert not detail.startswith('SCAN notes'), f'{url}: {detail}\n{statement}'
@@ -0,0 +1,155 @@
+"""
+日历提醒：存储的提醒时间、发送记录和进程内调度器
+"""
+import json
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import CalendarEvent, ReminderDelivery
+from app.services.event_stream import EventStream, EVENT_REMINDER
+from app.services.reminder_service import ReminderScheduler, ReminderService
+
+
+def _event(user, minutes_until_reminder, **fields):
+    start = datetime.now() + timedelta(minutes=15 + minutes_until_reminder)
+    event = CalendarEvent(user_id=user.id, title='周会', start_datetime=start, end_datetime=start + timedelta(hours=1),
+                          reminder_enabled=True, reminder_minutes=15, **fields)
+    db.session.add(event)
+    db.session.commit()
+    return event
+
+
+def _text(chunk):
+    return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+
+def test_remind_at_follows_event_changes(user):
+    event = _event(user, 10)
+    assert event.remind_at == event.start_datetime - timedelta(minutes=15)
+
+    event.start_datetime += timedelta(hours=1)
+    db.session.commit()
+    assert event.remind_at == event.start_datetime - timedelta(minutes=15)
+
+    event.reminder_enabled = False
+    db.session.commit()
+    assert event.remind_at is None
+
+
+def test_pending_reminders_use_delivery_ledger(user):
+    event = _event(user, -1)
+    assert [item['event_id'] for item in ReminderService.get_user_pending_reminders(user.id)] == [event.id]
+
+    assert ReminderService.mark_reminder_sent(event.id, user.id)
+    assert ReminderService.mark_reminder_sent(event.id, user.id)
+    assert ReminderService.get_user_pending_reminders(user.id) == []
+    assert ReminderDelivery.query.count() == 1
+
+    # 改期后的新提醒时间可再次提醒
+    event.start_datetime += timedelta(seconds=30)
+    db.session.commit()
+    assert [item['event_id'] for item in ReminderService.get_user_pending_reminders(user.id)] == [event.id]
+
+
+def test_scheduler_heap_skips_rescheduled_and_cancelled():
+    scheduler = ReminderScheduler(callback=None)
+    now = datetime.now()
+    scheduler.schedule(1, now - timedelta(seconds=5))
+    scheduler.schedule(2, now - timedelta(seconds=3))
+    scheduler.schedule(3, now + timedelta(minutes=5))
+    scheduler.schedule(1, now + timedelta(minutes=1))
+    scheduler.cancel(2)
+
+    assert scheduler.pop_due(now) == []
+    assert scheduler.next_due() == now + timedelta(minutes=1)
+    assert scheduler.pop_due(now + timedelta(minutes=2)) == [1]
+
+
+def test_scheduler_delivers_due_reminders(app, user):
+    event = _event(user, 0)
+    subscription = EventStream.broker().subscribe(user.id)
+
+    ReminderService.start_scheduler(app)
+    message = subscription.get(timeout=5)
+    subscription.close()
+
+    assert message['event'] == EVENT_REMINDER
+    assert message['data']['event_id'] == event.id
+    assert ReminderDelivery.query.filter_by(event_id=event.id).count() == 1
+
+
+def test_event_stream_starts_scheduler(client, auth_headers):
+    assert ReminderService.scheduler is None
+    response = client.get('/api/notes/events', headers=auth_headers, buffered=False)
+    assert response.status_code == 200
+    assert ReminderService.scheduler is not None
+    response.close()
+
+
+def test_reminder_is_pushed_over_event_stream(app, client, user):
+    app.config['EVENT_STREAM_HEARTBEAT_SECONDS'] = 0.2
+    event = _event(user, 0)
+    token = create_access_token(identity=str(user.id))
+
+    # 与前端 EventSource 相同：令牌通过查询参数传递
+    response = client.get(f'/api/notes/events?jwt={token}', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    chunks = iter(response.response)
+    assert 'event: ready' in _text(next(chunks))
+    for _ in range(50):
+        chunk = _text(next(chunks))
+        if chunk.startswith('event: reminder'):
+            break
+    else:
+        raise AssertionError('未收到提醒事件')
+    response.close()
+
+    data = json.loads(chunk.split('data: ', 1)[1])
+    assert data['event_id'] == event.id
+    assert data['reminder_time'] == event.remind_at.isoformat()
+    assert ReminderDelivery.query.filter_by(event_id=event.id).count() == 1
+
+
+def test_reminder_without_listener_is_left_for_polling(user):
+    event = _event(user, 0)
+
+    ReminderService.deliver(event.id)
+    assert ReminderDelivery.query.count() == 0
+    assert [item['event_id'] for item in ReminderService.get_user_pending_reminders(user.id)] == [event.id]
+
+    subscription = EventStream.broker().subscribe(user.id)
+    ReminderService.deliver(event.id)
+    assert subscription.get(timeout=0)['data']['event_id'] == event.id
+    assert ReminderDelivery.query.count() == 1
+
+    # 已记录的提醒不再重复推送
+    ReminderService.deliver(event.id)
+    assert subscription.get(timeout=0) is None
+    subscription.close()
+
+
+def test_event_writes_update_running_scheduler(user, monkeypatch):
+    scheduler = ReminderScheduler(callback=None)
+    monkeypatch.setattr(ReminderService, 'scheduler', scheduler)
+
+    event = _event(user, 30)
+    assert scheduler.next_due() == event.remind_at
+
+    # 提前的提醒立即生效
+    event.start_datetime -= timedelta(minutes=20)
+    db.session.commit()
+    assert scheduler.next_due() == event.remind_at
+
+    # 回滚的修改不影响调度器
+    event.start_datetime += timedelta(minutes=5)
+    db.session.flush()
+    db.session.rollback()
+    assert scheduler.next_due() == event.remind_at
+
+    db.session.delete(event)
+    db.session.commit()
+    assert scheduler.next_due() is None
@@ -0,0 +1,78 @@
+"""
+只有修改了数据的请求才递增用户的数据版本号，内容未变的保存不影响缓存
+"""
+from io import BytesIO
+
+from app import db
+from app.models import Note, User
+from app.services.event_stream import EventStream
+from app.services.response_cache import ResponseCache
+
+
+def test_unchanged_save_keeps_cached_responses(client, user, auth_headers, create_notes):
+    note_id = create_notes(1)[0]
+    assert client.get('/api/notes/', headers=auth_headers).status_code == 200
+    version = User.get_notes_version(user.id).notes_version
+    subscription = EventStream.broker().subscribe(user.id)
+    hits = ResponseCache.hits
+
+    response = client.put(f'/api/notes/{note_id}', headers=auth_headers, json={
+        'title': '笔记 0', 'content': 'searchable content 0'
+    })
+    assert response.status_code == 200
+    assert client.get('/api/notes/', headers=auth_headers).status_code == 200
+
+    assert ResponseCache.hits == hits + 1
+    assert User.get_notes_version(user.id).notes_version == version
+    assert subscription.get(timeout=0) is None
+
+    response = client.put(f'/api/notes/{note_id}', headers=auth_headers, json={'title': '已修改'})
+    assert response.status_code == 200
+    body = client.get('/api/notes/', headers=auth_headers).get_json()
+
+    assert body['notes'][0]['title'] == '已修改'
+    assert ResponseCache.hits == hits + 1
+    assert User.get_notes_version(user.id).notes_version == version + 1
+    assert subscription.get(timeout=0) is not None
+    subscription.close()
+
+
+def test_file_upload_keeps_cached_responses(app, client, user, auth_headers, create_notes, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    create_notes(1)
+    version = User.get_notes_version(user.id).notes_version
+
+    response = client.post('/api/notes/upload', headers=auth_headers,
+                           data={'file': (BytesIO(b'hello'), 'hello.txt')})
+    assert response.status_code < 400
+    assert User.get_notes_version(user.id).notes_version == version
+
+
+def test_unchanged_save_issues_no_writes(client, auth_headers, create_notes, count_queries):
+    note_id = create_notes(1, tags=['a', 'b'], categories=['工作'])[0]
+
+    with count_queries() as statements:
+        response = client.put(f'/api/notes/{note_id}', headers=auth_headers, json={
+            'title': '笔记 0', 'content': 'searchable content 0', 'tags': ['b', 'a'], 'categories': ['工作']
+        })
+    assert response.status_code == 200
+
+    writes = [statement for statement in statements
+              if statement.lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+    assert writes == []
+
+
+def test_write_in_another_worker_invalidates_cache(client, user, auth_headers, create_notes):
+    note_id = create_notes(1)[0]
+    assert client.get('/api/notes/', headers=auth_headers).headers['X-Cache'] == 'MISS'
+    assert client.get('/api/notes/', headers=auth_headers).headers['X-Cache'] == 'HIT'
+
+    # 另一个 worker 进程修改笔记并递增数据库中的版本号，本进程的缓存未收到任何通知
+    note = db.session.get(Note, note_id)
+    note.title = '其他进程修改'
+    User.touch_notes(user.id)
+    db.session.commit()
+
+    response = client.get('/api/notes/', headers=auth_headers)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['notes'][0]['title'] == '其他进程修改'
@@ -0,0 +1,70 @@
+"""
+全文检索：按用户划分的索引、分页和迁移回填
+"""
+import os
+
+from flask_jwt_extended import create_access_token
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from app import db
+from app.models import User
+from app.services.search_service import FTS_TABLE, SearchService
+
+
+def _other_user_headers():
+    other = User(username='bob', email='bob@example.com')
+    other.password = 'password123'
+    db.session.add(other)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=str(other.id))}'}
+
+
+def test_search_only_matches_own_notes(client, auth_headers, create_notes):
+    own_ids = create_notes(2, content='全文检索 shared term')
+    other_headers = _other_user_headers()
+    response = client.post('/api/notes/', headers=other_headers, json={'title': 'x', 'content': '全文检索 shared term'})
+    assert response.status_code == 201
+
+    for q in ('全文检索', 'shared', 'sha'):
+        body = client.get(f'/api/notes/search?q={q}', headers=auth_headers).get_json()
+        assert sorted(note['id'] for note in body['notes']) == sorted(own_ids)
+
+    # 索引词带用户前缀，其他用户的同一个词不在该用户的倒排列表中
+    row = db.session.execute(text(f"SELECT content, user_id FROM {FTS_TABLE} WHERE rowid = :id"),
+                             {'id': own_ids[0]}).one()
+    assert row.user_id == 1
+    assert row.content.split()[0].startswith('u1x')
+
+
+def test_search_is_paginated(client, auth_headers, create_notes):
+    create_notes(25)
+
+    body = client.get('/api/notes/search?q=searchable&per_page=10', headers=auth_headers).get_json()
+    assert len(body['notes']) == 10
+    assert body['pagination']['has_next'] is True
+    assert '<mark>searchable</mark>' in body['notes'][0]['snippet']
+
+    body = client.get('/api/notes/search?q=searchable&per_page=10&page=3&with_total=true',
+                      headers=auth_headers).get_json()
+    assert len(body['notes']) == 5
+    assert body['pagination']['has_next'] is False
+    assert body['pagination']['total'] == 25
+
+
+def test_migration_backfills_index(app, client, auth_headers, create_notes):
+    note_ids = create_notes(3)
+    # 模拟升级前的数据库：没有索引表或为旧格式
+    db.session.execute(text(f"DROP TABLE {FTS_TABLE}"))
+    db.session.execute(text(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, content)"))
+    db.session.commit()
+    from app.services import search_service
+    search_service._ready_engines.clear()
+    assert not SearchService.index_ready(db.session.connection())
+
+    upgrade(directory=os.path.join(app.root_path, '..', 'migrations'))
+
+    assert SearchService.index_ready(db.session.connection())
+    assert SearchService.ranked_matches(1, 'searchable') is not None
+    body = client.get('/api/notes/search?q=searchable', headers=auth_headers).get_json()
+    assert sorted(note['id'] for note in body['notes']) == sorted(note_ids)
@@ -0,0 +1,45 @@
+"""
+笔记统计：最近更新数与汇总行的并发创建
+"""
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Note, UserNoteStats
+from app.services.stats_service import StatsService
+
+
+def _overview(client, auth_headers):
+    response = client.get('/api/notes/stats', headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()['overview']
+
+
+def test_recent_updates_ignore_creation_timestamps(client, auth_headers, create_notes):
+    note_ids = create_notes(3)
+    assert _overview(client, auth_headers)['recent_updates'] == 0
+
+    created_at = datetime.utcnow() - timedelta(hours=1)
+    Note.query.filter(Note.id == note_ids[0]).update({Note.created_at: created_at}, synchronize_session=False)
+    db.session.commit()
+    response = client.put(f'/api/notes/{note_ids[0]}', headers=auth_headers, json={'content': '修改后的内容'})
+    assert response.status_code == 200
+
+    assert _overview(client, auth_headers)['recent_updates'] == 1
+
+
+def test_ensure_user_stats_tolerates_concurrent_creation(user, create_notes, monkeypatch):
+    create_notes(2)
+    UserNoteStats.query.delete()
+    db.session.commit()
+    assert StatsService.ensure_user_stats(user.id) is False
+    db.session.commit()
+
+    # 另一个请求在本请求检查之后已创建汇总行
+    get = db.session.get
+    monkeypatch.setattr(db.session, 'get', lambda model, ident, **kw: None if model is UserNoteStats
+                        else get(model, ident, **kw))
+    assert StatsService.ensure_user_stats(user.id) is True
+    monkeypatch.undo()
+
+    db.session.commit()
+    assert db.session.get(UserNoteStats, user.id).total_notes == 2
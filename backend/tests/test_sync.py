@@ -0,0 +1,84 @@
+"""
+增量同步：删除墓碑、无效或过期令牌时的全量同步、分页继续同步
+"""
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import NoteChange
+from app.services.sync_service import SyncService
+
+
+def _sync(client, auth_headers, **params):
+    response = client.get('/api/notes/sync', headers=auth_headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_full_sync_returns_active_notes_and_token(client, auth_headers, create_notes):
+    note_ids = create_notes(3)
+    client.delete(f'/api/notes/{note_ids[0]}', headers=auth_headers)
+
+    data = _sync(client, auth_headers)
+    assert data['reset'] is True
+    assert sorted(note['id'] for note in data['notes']) == note_ids[1:]
+    assert data['since'] == SyncService.current_token()
+
+    # 全量同步之后没有新的变更
+    data = _sync(client, auth_headers, since=data['since'])
+    assert data['reset'] is False
+    assert data['notes'] == [] and data['deleted_notes'] == []
+
+
+def test_incremental_sync_returns_delete_tombstones(client, auth_headers, create_notes):
+    trashed_id, purged_id, kept_id = create_notes(3)
+    since = _sync(client, auth_headers)['since']
+
+    client.delete(f'/api/notes/{trashed_id}', headers=auth_headers)
+    client.delete(f'/api/notes/{purged_id}', headers=auth_headers)
+    assert client.delete(f'/api/notes/trash/{purged_id}', headers=auth_headers).status_code == 200
+    client.put(f'/api/notes/{kept_id}', headers=auth_headers, json={'content': '新内容'})
+
+    data = _sync(client, auth_headers, since=since)
+    assert data['reset'] is False
+    assert [note['id'] for note in data['notes']] == [kept_id]
+    tombstones = {tombstone['id']: tombstone['deleted'] for tombstone in data['deleted_notes']}
+    assert tombstones == {trashed_id: 'trash', purged_id: 'purged'}
+
+
+def test_invalid_token_falls_back_to_full_sync(client, auth_headers, create_notes):
+    note_ids = create_notes(2)
+    for since in ('abc', '-5'):
+        data = _sync(client, auth_headers, since=since)
+        assert data['reset'] is True
+        assert sorted(note['id'] for note in data['notes']) == note_ids
+
+
+def test_expired_token_falls_back_to_full_sync(app, client, auth_headers, create_notes):
+    first_id, = create_notes(1)
+    since = _sync(client, auth_headers)['since']
+    create_notes(2)
+
+    # 令牌之后的变更日志超过保留期被清理（最新一条始终保留）
+    NoteChange.query.update({NoteChange.created_at: datetime.utcnow() - timedelta(days=100)})
+    db.session.commit()
+    assert SyncService.prune(retention_days=90) > 0
+
+    data = _sync(client, auth_headers, since=since)
+    assert data['reset'] is True
+    assert len(data['notes']) == 3
+    assert first_id in {note['id'] for note in data['notes']}
+
+
+def test_incremental_sync_pages_with_has_more(client, auth_headers, create_notes):
+    since = _sync(client, auth_headers)['since']
+    note_ids = create_notes(3)
+
+    seen = []
+    for _ in range(10):
+        data = _sync(client, auth_headers, since=since, limit=1)
+        seen.extend(note['id'] for note in data['notes'])
+        since = data['since']
+        if not data['has_more']:
+            break
+    assert sorted(set(seen)) == note_ids
+    assert data['has_more'] is False
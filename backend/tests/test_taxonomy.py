@@ -0,0 +1,38 @@
+"""
+分类名称解析：其他进程删除或重命名分类后不使用缓存中失效的ID
+"""
+from app import db
+from app.models import Category
+from app.services.taxonomy_service import TaxonomyService
+
+
+def _resolve(user, names):
+    category_ids = TaxonomyService.resolve_category_ids(user.id, names)
+    db.session.commit()
+    return category_ids
+
+
+def test_cached_category_deleted_elsewhere_is_recreated(user):
+    work_id, = _resolve(user, ['工作'])
+    assert _resolve(user, ['工作']) == [work_id]
+
+    # 另一个进程删除分类，本进程的缓存未被清除
+    Category.query.filter_by(id=work_id).delete()
+    db.session.commit()
+
+    # 新建的分类（SQLite 可能复用同一个ID）确实存在
+    new_id, = _resolve(user, ['工作'])
+    assert db.session.get(Category, new_id).name == '工作'
+
+
+def test_cached_category_renamed_elsewhere_is_not_reused(user):
+    work_id, home_id = _resolve(user, ['工作', '生活'])
+    assert _resolve(user, ['工作', '生活']) == [work_id, home_id]
+
+    Category.query.filter_by(id=work_id).update({Category.name: '项目'})
+    db.session.commit()
+
+    new_work_id, same_home_id = _resolve(user, ['工作', '生活'])
+    assert same_home_id == home_id
+    assert new_work_id != work_id
+    assert _resolve(user, ['项目']) == [work_id]
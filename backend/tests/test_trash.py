@@ -0,0 +1,44 @@
+"""
+回收站：列表接口只读，超过保留期的笔记由 purge-trash 命令清理
+"""
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Note, User
+from app.services.bulk_service import BulkNoteService
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def _trash_expired(client, auth_headers, note_ids):
+    response = client.post('/api/notes/bulk/delete', headers=auth_headers, json={'ids': note_ids})
+    assert response.status_code == 200
+    expired_at = datetime.utcnow() - timedelta(days=31)
+    Note.query.filter(Note.id.in_(note_ids)).update({Note.deleted_at: expired_at}, synchronize_session=False)
+    db.session.commit()
+
+
+def test_trash_list_does_not_purge(client, auth_headers, create_notes, count_queries):
+    note_ids = create_notes(2)
+    _trash_expired(client, auth_headers, note_ids)
+
+    with count_queries() as statements:
+        response = client.get('/api/notes/trash', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['notes']) == 2
+    assert not [statement for statement in statements if statement.lstrip().upper().startswith(WRITES)]
+
+
+def test_purge_expired_trash_bumps_notes_version(client, user, auth_headers, create_notes):
+    expired_ids = create_notes(2)
+    _trash_expired(client, auth_headers, expired_ids)
+    recent_id, = create_notes(1)
+    client.post('/api/notes/bulk/delete', headers=auth_headers, json={'ids': [recent_id]})
+    version = User.get_notes_version(user.id).notes_version
+
+    assert BulkNoteService.purge_expired_trash() == 2
+    assert Note.query.filter(Note.id.in_(expired_ids)).count() == 0
+    assert db.session.get(Note, recent_id) is not None
+    assert User.get_notes_version(user.id).notes_version == version + 1
+    assert BulkNoteService.purge_expired_trash() == 0
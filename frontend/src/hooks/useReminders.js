@@ -15,6 +15,7 @@ const useReminders = (isAuthenticated = false) => {
   // 使用 ref 来存储已显示的提醒，避免重复显示
   const shownReminders = useRef(new Set());
   const intervalRef = useRef(null);
+  const eventSourceRef = useRef(null);
 
   /**
    * 获取待提醒事件
@@ -74,7 +75,7 @@ const useReminders = (isAuthenticated = false) => {
   /**
    * 显示提醒通知
    */
-  const showReminderNotification = useCallback((reminder) => {
+  const showReminderNotification = useCallback((reminder, alreadySent = false) => {
     // 优先使用浏览器原生通知
     if (notificationService.hasPermission()) {
       notificationService.showEventReminder(reminder);
@@ -83,8 +84,10 @@ const useReminders = (isAuthenticated = false) => {
       notificationService.showInAppNotification(reminder);
     }
 
-    // 标记提醒已发送
-    markReminderSent(reminder.event_id);
+    // 标记提醒已发送（服务器推送的提醒已由服务器记录）
+    if (!alreadySent) {
+      markReminderSent(reminder.event_id);
+    }
   }, []);
 
   /**
@@ -136,6 +139,60 @@ const useReminders = (isAuthenticated = false) => {
     }
   }, []);
 
+  /**
+   * 连接服务器推送事件流：连接成功后停止轮询，提醒到期时由服务器推送；
+   * 连接断开时 EventSource 自动重连，无法重连时恢复轮询
+   */
+  const connectReminderStream = useCallback(() => {
+    const token = localStorage.getItem('token');
+    if (!token || typeof window.EventSource === 'undefined') {
+      return false;
+    }
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close();
+    }
+
+    const source = new window.EventSource(`${api.defaults.baseURL}/notes/events?jwt=${encodeURIComponent(token)}`);
+    eventSourceRef.current = source;
+
+    source.addEventListener('ready', () => {
+      stopReminderPolling();
+      setError(null);
+    });
+
+    source.addEventListener('reminder', (event) => {
+      const reminder = JSON.parse(event.data);
+      const reminderId = `${reminder.event_id}-${reminder.reminder_time}`;
+
+      setReminders(prev => [...prev.filter(item => item.event_id !== reminder.event_id), reminder]);
+      setLastCheck(new Date());
+      if (!shownReminders.current.has(reminderId)) {
+        showReminderNotification(reminder, true);
+        shownReminders.current.add(reminderId);
+      }
+    });
+
+    source.onerror = () => {
+      if (source.readyState === window.EventSource.CLOSED) {
+        console.warn('提醒推送连接已关闭，恢复轮询');
+        eventSourceRef.current = null;
+        startReminderPolling();
+      }
+    };
+
+    return true;
+  }, [showReminderNotification, startReminderPolling, stopReminderPolling]);
+
+  /**
+   * 断开服务器推送事件流
+   */
+  const disconnectReminderStream = useCallback(() => {
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close();
+      eventSourceRef.current = null;
+    }
+  }, []);
+
   /**
    * 清理已显示的提醒记录
    */
@@ -153,13 +210,15 @@ const useReminders = (isAuthenticated = false) => {
   // 当认证状态改变时，管理轮询
   useEffect(() => {
     if (isAuthenticated) {
-      // 用户登录时开始轮询
+      // 用户登录时开始轮询，推送连接建立后停止轮询
       startReminderPolling();
+      connectReminderStream();
       // 同时获取即将到来的事件
       fetchUpcomingEvents();
     } else {
-      // 用户登出时停止轮询
+      // 用户登出时停止轮询并断开推送
       stopReminderPolling();
+      disconnectReminderStream();
       setReminders([]);
       setUpcomingEvents([]);
       clearShownReminders();
@@ -168,15 +227,18 @@ const useReminders = (isAuthenticated = false) => {
     // 清理函数
     return () => {
       stopReminderPolling();
+      disconnectReminderStream();
     };
-  }, [isAuthenticated, startReminderPolling, stopReminderPolling, fetchUpcomingEvents, clearShownReminders]);
+  }, [isAuthenticated, startReminderPolling, stopReminderPolling, connectReminderStream, disconnectReminderStream,
+      fetchUpcomingEvents, clearShownReminders]);
 
   // 组件卸载时清理
   useEffect(() => {
     return () => {
       stopReminderPolling();
+      disconnectReminderStream();
     };
-  }, [stopReminderPolling]);
+  }, [stopReminderPolling, disconnectReminderStream]);
 
   return {
     // 状态
@@ -192,6 +254,8 @@ const useReminders = (isAuthenticated = false) => {
     requestNotificationPermission,
     startReminderPolling,
     stopReminderPolling,
+    connectReminderStream,
+    disconnectReminderStream,
     checkReminders,
     clearShownReminders,
     